@@ -1,7 +1,8 @@
+import os
 import sys
 from observability.logging import setup_logging
 from observability.setup import setup_observability
-from pipelines.sec.rss import RssWatcher
+from pipelines.sec.rss import RssWatcher, PollScheduler
 from lakehouse.db import Database
 import logging
 import time
@@ -9,16 +10,26 @@ import time
 def ingest_rss_loop():
     """
     Continuous loop to monitor SEC RSS.
+    Each cycle catches up to the stored cursor; the sleep between cycles
+    follows the observed filing arrival rate.
     """
     watcher = RssWatcher()
+    settings = watcher.settings
+    scheduler = PollScheduler(
+        settings.RSS_POLL_MIN_SECONDS,
+        settings.RSS_POLL_MAX_SECONDS,
+        settings.RSS_POLL_TARGET_ENTRIES,
+    )
     logging.info("Starting SEC RSS Ingestion Loop... (Ctrl+C to stop)")
     
     while True:
         try:
             logging.info("Running RSS Watcher Cycle...")
-            watcher.run_cycle()
-            logging.info("Cycle complete. Sleeping for 10 minutes...")
-            time.sleep(600) # 10 minutes
+            new_entries = watcher.run_cycle()
+            scheduler.observe(new_entries, time.monotonic())
+            interval = scheduler.next_interval()
+            logging.info(f"Cycle complete ({new_entries} new). Sleeping for {interval:.0f}s...")
+            time.sleep(interval)
         except KeyboardInterrupt:
             logging.info("Stopping...")
             break
@@ -38,6 +49,13 @@ def main():
         print("Usage: python -m apps.cli [command]")
         print("Commands:")
         print("  ingest-rss   Start monitoring SEC RSS feed")
+        print("  reconcile-backfill  Backfill filings from EDGAR daily/quarterly indexes")
+        print("  ingest-xbrl  Load XBRL facts (--tickers A,B or --bulk [companyfacts.zip]; --full to rewrite)")
+        print("  ingest-frames  Load cross-sectional XBRL frames (--years 2020-2024)")
+        print("  ingest-submissions  Load full filing history for tickers (--tickers A,B)")
+        print("  parse-backlog  Parse DOWNLOADED filings across a process pool (--workers N, --batch N, --limit N)")
+        print("  storage-gc   Delete unreferenced content-addressed blobs (--grace SECONDS, --dry-run)")
+        print("  storage-train-dict  Train a zstd dictionary for small objects (--prefix edgar/)")
         return
 
     command = sys.argv[1]
@@ -45,8 +63,29 @@ def main():
     if command == "ingest-rss":
         ingest_rss_loop()
     
+    elif command == "reconcile-backfill":
+        # python -m apps.cli reconcile-backfill --start 20230101 --end 20231231 [--quarterly]
+        from pipelines.tasks import SessionLocal
+        from pipelines.reconcile import Reconciler
+
+        start = _parse_arg("--start")
+        end = _parse_arg("--end") or start
+        if not start:
+            print("Usage: python -m apps.cli reconcile-backfill --start YYYYMMDD [--end YYYYMMDD] [--quarterly]")
+            return
+        granularity = "quarterly" if "--quarterly" in sys.argv else "daily"
+
+        session = SessionLocal()
+        try:
+            added = Reconciler(session).reconcile_backfill(start, end, granularity=granularity)
+            logging.info(f"Backfill complete. Added {added} filings.")
+        finally:
+            session.close()
+
     elif command == "ingest-xbrl":
         # python -m apps.cli ingest-xbrl --tickers AAPL,MSFT
+        # python -m apps.cli ingest-xbrl --bulk [PATH]   (whole universe from companyfacts.zip)
+        # Facts are merged incrementally by default; --full rewrites each company's history.
         from pipelines.xbrl.metadata import CompanyMetadataFetcher
         from pipelines.xbrl.facts import XbrlFactsFetcher
         
@@ -56,6 +95,16 @@ def main():
         
         # 2. Fetch Facts
         facts_fetcher = XbrlFactsFetcher()
+        incremental = "--full" not in sys.argv
+
+        if "--bulk" in sys.argv:
+            path = _parse_arg("--bulk")
+            if not path or path.startswith("--"):
+                path = os.path.join(db.settings.DATA_DIR, "companyfacts.zip")
+            if not os.path.exists(path):
+                facts_fetcher.download_bulk(path)
+            facts_fetcher.ingest_bulk(path, incremental=incremental)
+            return
         
         # Parse args manually for simplicity or use argparse properly
         # Ideally we refactor to argparse, but let's do simple argv check
@@ -77,13 +126,51 @@ def main():
             if res:
                 cik = res[0] # String
                 try:
-                    facts_fetcher.fetch_facts(cik)
+                    facts_fetcher.fetch_facts(cik, incremental=incremental)
                 except Exception as e:
                     logging.error(f"Failed to ingest XBRL for {t}: {e}")
             else:
                 logging.warning(f"Ticker {t} not found in companies table.")
         conn.close()
 
+    elif command == "ingest-frames":
+        # python -m apps.cli ingest-frames --years 2020-2024
+        # Cross-sectional snapshots of the concepts the features use, for every company at once.
+        from datetime import datetime
+        from pipelines.xbrl.frames import XbrlFramesFetcher, calendar_frames
+
+        years = _parse_arg("--years")
+        if years:
+            first, _, last = years.partition("-")
+            start_year, end_year = int(first), int(last or first)
+        else:
+            end_year = datetime.utcnow().year
+            start_year = end_year - 2
+        XbrlFramesFetcher().fetch_frames(calendar_frames(start_year, end_year))
+
+    elif command == "ingest-submissions":
+        # python -m apps.cli ingest-submissions --tickers AAPL,MSFT
+        # Full filing history (with acceptance times and primary documents) per company.
+        from pipelines.sec.submissions import SubmissionsFetcher
+
+        fetcher = SubmissionsFetcher()
+        conn = db.get_connection()
+        try:
+            ciks = {}
+            for t in _parse_tickers_arg():
+                res = conn.execute("SELECT cik FROM companies WHERE ticker = ?", [t]).fetchone()
+                if res:
+                    ciks[t] = res[0]
+                else:
+                    logging.warning(f"Ticker {t} not found in companies table. Run ingest-xbrl first.")
+        finally:
+            conn.close()
+        for t, cik in ciks.items():
+            try:
+                fetcher.fetch_history(cik)
+            except Exception as e:
+                logging.error(f"Failed to ingest submissions for {t}: {e}")
+
     elif command == "ingest-market":
         from pipelines.market.client import MarketDataFetcher
         tickers = _parse_tickers_arg()
@@ -104,11 +191,11 @@ def main():
         from pipelines.rag.processor import DocumentProcessor
         from pipelines.rag.embedder import Embedder
         from pipelines.rag.store import VectorBooster
-        import os
 
         
         tickers = _parse_tickers_arg()
         client = SecClient()
+        resolver = FilingResolver(client)
         db = Database()
         processor = DocumentProcessor()
         embedder = Embedder()
@@ -132,10 +219,13 @@ def main():
             # Ideally we check what we downloaded in Sprint 1.
             filing_row = conn.execute(f"SELECT accession_number, filing_date, form_type, report_period FROM filings WHERE cik='{cik}' ORDER BY filing_date DESC LIMIT 1").fetchone()
             if not filing_row:
-                logging.warning(f"No filings found in DB for {t}. Run ingest-rss first or wait for history backfill.")
-                # Fallback: Try to ingest RSS specifically for this ticker? 
-                # S1 was RSS watcher. If AAPL not in recent RSS, we have no entry.
-                # For this demo, user might need to have run RSS.
+                # New ticker: load its full history from the submissions API instead of waiting for RSS
+                from pipelines.sec.submissions import SubmissionsFetcher
+                logging.info(f"No filings found in DB for {t}. Fetching history from submissions API...")
+                SubmissionsFetcher().fetch_history(cik)
+                filing_row = conn.execute(f"SELECT accession_number, filing_date, form_type, report_period FROM filings WHERE cik='{cik}' ORDER BY filing_date DESC LIMIT 1").fetchone()
+            if not filing_row:
+                logging.warning(f"No filings found for {t}.")
                 continue
                 
             accession = filing_row[0]
@@ -147,21 +237,29 @@ def main():
             base_dir = f"data/filings/{cik}/{accession}"
             index_path = f"{base_dir}/index.html"
             primary_path = f"{base_dir}/primary_doc.html"
-            
-            if not os.path.exists(index_path):
-                logging.warning(f"Index file missing: {index_path}")
-                continue
-                
-            # Resolve Primary Doc
-            with open(index_path, "r", encoding="utf-8") as f:
-                index_html = f.read()
-                
-            resolution = FilingResolver.resolve_primary_doc_url(index_html, "")
-            if not resolution:
+            os.makedirs(base_dir, exist_ok=True)
+
+            # Resolve Primary Doc from the directory's index.json (cached as manifest.json).
+            # Submissions-sourced rows already name the primary document.
+            known_url = conn.execute("SELECT primary_doc_url FROM filings WHERE accession_number = ?", [accession]).fetchone()[0]
+            primary_document = None
+            if known_url and "-index.htm" not in known_url:
+                primary_document = known_url.rsplit("/", 1)[-1]
+            manifest = resolver.manifest(cik, accession, primary_document=primary_document)
+
+            if manifest and manifest["primary_doc_url"]:
+                doc_url = manifest["primary_doc_url"]
+            elif os.path.exists(index_path):
+                # Legacy: index page saved by older RSS runs
+                with open(index_path, "r", encoding="utf-8") as f:
+                    resolution = FilingResolver.resolve_primary_doc_url(f.read(), "")
+                if not resolution:
+                    logging.warning(f"Could not resolve primary doc for {accession}")
+                    continue
+                doc_url = resolution[0]
+            else:
                 logging.warning(f"Could not resolve primary doc for {accession}")
                 continue
-                
-            doc_url, filename = resolution
             logging.info(f"Resolved primary doc: {doc_url}")
             
             # Download Primary Doc if not exists
@@ -223,7 +321,6 @@ def main():
     elif command == "build-graph":
         from rag.graphrag.extractor import GraphExtractor
         from pipelines.rag.processor import DocumentProcessor
-        import os
         
         tickers = _parse_tickers_arg()
         extractor = GraphExtractor()
@@ -257,6 +354,38 @@ def main():
                 logging.warning(f"Primary doc not found for {t} ({accession})")
         conn.close()
 
+    elif command == "parse-backlog":
+        # python -m apps.cli parse-backlog [--workers 16] [--batch 128] [--limit 10000]
+        # Safe to run on several hosts at once: batches are claimed with SKIP LOCKED.
+        from pipelines.tasks import SessionLocal
+        from pipelines.backlog import BacklogParser
+
+        workers, batch, limit = _parse_arg("--workers"), _parse_arg("--batch"), _parse_arg("--limit")
+        stats = BacklogParser(
+            SessionLocal,
+            workers=int(workers) if workers else None,
+            batch_size=int(batch) if batch else None,
+        ).run(limit=int(limit) if limit else None)
+        logging.info(
+            f"Parse backlog done: {stats['filings']} filings ({stats['failed']} failed), {stats['facts']} facts "
+            f"in {stats['seconds']}s ({stats['filings_per_sec']} filings/s, {stats['facts_per_sec']} facts/s)"
+        )
+
+    elif command == "storage-gc":
+        from pipelines.storage import MinIOClient
+        grace = _parse_arg("--grace")
+        stats = MinIOClient().gc(
+            grace_seconds=int(grace) if grace else None,
+            dry_run="--dry-run" in sys.argv,
+        )
+        logging.info(f"Storage GC: {stats}")
+
+    elif command == "storage-train-dict":
+        from pipelines.storage import MinIOClient
+        prefix = _parse_arg("--prefix") or "edgar/"
+        dict_id = MinIOClient().train_zstd_dictionary(prefix)
+        logging.info(f"Trained zstd dictionary {dict_id}; set STORAGE_ZSTD_DICT_ID={dict_id} to use it")
+
     elif command == "run-eval":
         from eval.run_eval import run_eval
         run_eval()
@@ -264,6 +393,13 @@ def main():
     else:
         print(f"Unknown command: {command}")
 
+def _parse_arg(flag: str) -> str | None:
+    if flag in sys.argv:
+        idx = sys.argv.index(flag)
+        if idx + 1 < len(sys.argv):
+            return sys.argv[idx+1]
+    return None
+
 def _parse_tickers_arg() -> list[str]:
     tickers = []
     if "--tickers" in sys.argv:
@@ -0,0 +1,135 @@
+"""
+Compares the inline XBRL parse engines (streaming lxml vs BeautifulSoup).
+
+    python -m benchmarks.xbrl path/to/aapl-20230930.htm [more.htm ...]
+    python -m benchmarks.xbrl 0000320193-23-000106   # stored filing's XBRL document
+    python -m benchmarks.xbrl           # synthetic ~40 MB 10-K-like document
+
+Each engine runs in a fresh process so peak RSS is per engine; "parse memory"
+is peak RSS minus RSS once the file is loaded. It includes the returned fact
+list; "stream-iter" consumes XBRLParser.iter_facts() one fact at a time, as
+FactWriter does in process_filing_task and parse-backlog, which is the
+parser's own footprint.
+"""
+import re
+import sys
+import time
+import logging
+import tempfile
+import resource
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+def _rss_kb() -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def _run(engine: str, path: str) -> dict:
+    from pipelines.parse.xbrl import XBRLParser
+    content = Path(path).read_bytes()
+    before = _rss_kb()
+    started = time.perf_counter()
+    if engine == "stream-iter":
+        facts = numeric = 0
+        for fact in XBRLParser().iter_facts(content):
+            facts += 1
+            numeric += fact["kind"] == "numeric"
+    else:
+        parsed = XBRLParser(engine=engine).parse(content)
+        facts = len(parsed)
+        numeric = sum(1 for f in parsed if f.get("kind", "numeric") == "numeric")
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss # KiB on Linux
+    return {"seconds": elapsed, "parse_mb": max(peak - before, 0) / 1024, "facts": facts, "numeric": numeric, "mb": len(content) / 1e6}
+
+
+def _synthetic(path: Path, rows: int = 60_000) -> None:
+    """
+    Roughly the shape of a large 10-K: a hidden ix:header defining the contexts
+    and unit, then styled tables of tagged numbers plus narrative. Every fact
+    resolves as it is read, as in EDGAR filings.
+    """
+    contexts = "".join(
+        f'<xbrli:context id="c{c}"><xbrli:entity><xbrli:identifier scheme="http://www.sec.gov/CIK">0000320193'
+        f"</xbrli:identifier></xbrli:entity><xbrli:period><xbrli:startDate>{2012 + c}-01-01</xbrli:startDate>"
+        f"<xbrli:endDate>{2012 + c}-12-31</xbrli:endDate></xbrli:period></xbrli:context>"
+        for c in range(12)
+    )
+    head = (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<html xmlns="http://www.w3.org/1999/xhtml" xmlns:ix="http://www.xbrl.org/2013/inlineXBRL"'
+        ' xmlns:xbrli="http://www.xbrl.org/2003/instance" xmlns:iso4217="http://www.xbrl.org/2003/iso4217">\n<body>\n'
+        '<div style="display:none"><ix:header><ix:resources>'
+        + contexts
+        + '<xbrli:unit id="usd"><xbrli:measure>iso4217:USD</xbrli:measure></xbrli:unit>'
+        "</ix:resources></ix:header></div>\n"
+    )
+    cell = (
+        '<td style="padding:2px 1pt;text-align:right;vertical-align:bottom;font-family:Helvetica,sans-serif">'
+        '<span style="color:#000000;font-size:9pt;font-weight:400;line-height:120%">'
+        '<ix:nonFraction name="us-gaap:Concept{i}" contextRef="c{c}" unitRef="usd" decimals="-6" scale="6">{v:,}</ix:nonFraction>'
+        "</span></td>"
+    )
+    with open(path, "w") as f:
+        f.write(head)
+        for i in range(rows):
+            if i % 500 == 0:
+                f.write("<p>" + "Management's discussion of results of operations. " * 40 + "</p><table>")
+            f.write("<tr>" + cell.format(i=i % 900, c=i % 12, v=i * 1013) + cell.format(i=(i + 1) % 900, c=i % 12, v=i * 7) + "</tr>\n")
+            if i % 500 == 499:
+                f.write("</table>")
+        if rows % 500:
+            f.write("</table>")
+        f.write("</body></html>\n")
+
+
+def _fetch(accession: str) -> Path:
+    """Copies a downloaded filing's XBRL document out of object storage."""
+    from pipelines.documents import load_manifest, xbrl_document
+    from pipelines.storage import MinIOClient
+    storage = MinIOClient()
+    manifest = load_manifest(storage, accession)
+    doc = xbrl_document(manifest) if manifest else None
+    if not doc:
+        raise SystemExit(f"{accession}: no split documents in storage (download it first)")
+    if doc["type"] == "EX-101.INS":
+        raise SystemExit(f"{accession}: XBRL is a standalone instance, not inline; nothing to compare")
+    path = Path(tempfile.gettempdir()) / f"benchmark_{accession}{Path(doc['key']).suffix}"
+    if not path.exists():
+        path.write_bytes(storage.get_object(doc["key"]))
+    return path
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    paths = sys.argv[1:]
+    if not paths:
+        synthetic = Path(tempfile.gettempdir()) / "benchmark_ixbrl.htm"
+        _synthetic(synthetic)
+        paths = [str(synthetic)]
+    paths = [str(_fetch(p)) if re.fullmatch(r"\d{10}-\d{2}-\d{6}", p) else p for p in paths]
+
+    for path in paths:
+        results = {}
+        for engine in ("soup", "stream", "stream-iter"):
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                results[engine] = pool.submit(_run, engine, path).result()
+        soup, stream, streamed = results["soup"], results["stream"], results["stream-iter"]
+        logger.info(f"{Path(path).name} ({stream['mb']:.1f} MB)")
+        for engine, r in results.items():
+            logger.info(f"  {engine:11s} {r['seconds']:7.2f}s  {r['parse_mb']:8.1f} MB  {r['facts']} facts ({r['numeric']} numeric)")
+        logger.info(
+            f"  speedup {soup['seconds'] / max(stream['seconds'], 1e-9):.1f}x, "
+            f"memory {soup['parse_mb'] / max(stream['parse_mb'], 1e-3):.1f}x less "
+            f"({soup['parse_mb'] / max(streamed['parse_mb'], 1e-3):.0f}x when facts are consumed as they stream)"
+        )
+
+
+if __name__ == "__main__":
+    main()
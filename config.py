@@ -9,6 +9,18 @@ class Settings(BaseSettings):
     
     # SEC Config
     SEC_USER_AGENT: str = "EDGAR-AlphaOps-Research/0.1 (contact@example.com)"
+    SEC_MAX_CONNECTIONS: int = 10 # keep-alive pool size per process
+    SEC_MAX_CONCURRENCY: int = 8 # in-flight requests for SecClient.get_many
+    SEC_TIMEOUT: float = 20.0
+    SEC_MAX_RPS: float = 10.0 # SEC fair-access ceiling; AIMD never exceeds it
+    SEC_MIN_RPS: float = 1.0 # AIMD floor after repeated 429/503s
+    SEC_HTTP_CACHE_DIR: Optional[str] = None # defaults to {DATA_DIR}/http_cache
+    SEC_HTTP_CACHE_MAX_BYTES: int = 2 * 1024**3
+    RSS_PAGE_SIZE: int = 100 # getcurrent feed maximum
+    RSS_MAX_PAGES: int = 20 # catch-up depth per cycle before leaving the gap to reconcile
+    RSS_POLL_MIN_SECONDS: float = 15.0
+    RSS_POLL_MAX_SECONDS: float = 600.0
+    RSS_POLL_TARGET_ENTRIES: float = 5.0 # aim for about this many new entries per poll
     
     # Data Storage
     DATA_DIR: str = "./data"
@@ -39,6 +51,20 @@ class Settings(BaseSettings):
     MINIO_SECRET_KEY: str = "minioadmin"
     MINIO_BUCKET_RAW: str = "sec-raw"
     MINIO_BUCKET_ARTIFACTS: str = "artifacts"
+    MINIO_PART_SIZE: int = 8 * 1024 * 1024 # multipart part size for streamed uploads
+    MINIO_MAX_CONNECTIONS: int = 32 # shared S3 client pool size (per process)
+    MINIO_TRANSFER_CONCURRENCY: int = 8 # parts moved in parallel per multipart upload/download
+    STORAGE_CAS: bool = False # store bodies once under cas/sha256/..., logical keys become small pointers
+    STORAGE_CAS_GC_GRACE_SECONDS: int = 24 * 3600 # unreferenced blobs younger than this are kept
+    STORAGE_COMPRESSION: Optional[str] = None # "zstd" or "none"; unset = zstd if the zstandard extra is installed (pip install .[compression])
+    STORAGE_COMPRESSION_LEVEL: int = 3
+    STORAGE_ZSTD_DICT_ID: int = 0 # trained dictionary for small bodies (storage-train-dict); 0 = none
+    STORAGE_ZSTD_DICT_MAX_BODY: int = 64 * 1024 # bodies up to this size are compressed with the dictionary
+    STORAGE_CACHE_ENABLED: bool = True # host-local read-through cache for MinIOClient.get_object
+    STORAGE_CACHE_DIR: Optional[str] = None # defaults to {DATA_DIR}/object_cache
+    STORAGE_CACHE_MAX_BYTES: int = 4 * 1024**3
+    STORAGE_CACHE_MAX_OBJECT_BYTES: int = 256 * 1024**2 # larger objects are never cached
+    STORAGE_CACHE_FRESH_SECONDS: int = 60 # served without revalidation for this long after a check
     
     # Queue/Cache (Valkey/Redis)
     REDIS_HOST: str = "localhost"
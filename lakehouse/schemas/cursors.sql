@@ -0,0 +1,7 @@
+-- High-water marks for incremental feeds (e.g. the SEC "getcurrent" RSS feed)
+CREATE TABLE IF NOT EXISTS ingest_cursors (
+    name VARCHAR PRIMARY KEY,
+    last_accession VARCHAR,
+    last_updated TIMESTAMP, -- UTC
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
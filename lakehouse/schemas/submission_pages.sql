@@ -0,0 +1,10 @@
+-- Overflow files of the submissions API already loaded into filings (they never change once published)
+CREATE TABLE IF NOT EXISTS submission_pages (
+    cik VARCHAR NOT NULL,
+    name VARCHAR NOT NULL, -- e.g. CIK0000320193-submissions-001.json
+    filing_count INTEGER,
+    filing_from DATE,
+    filing_to DATE,
+    fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (cik, name)
+);
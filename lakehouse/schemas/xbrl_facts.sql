@@ -1,5 +1,5 @@
 CREATE TABLE IF NOT EXISTS xbrl_facts (
-    id VARCHAR, -- validation_id or similar unique ID if needed, else composite PK
+    id VARCHAR, -- md5 content hash of the fact (see pipelines/xbrl/facts.py)
     cik VARCHAR NOT NULL,
     taxonomy VARCHAR NOT NULL, -- us-gaap, dei
     tag VARCHAR NOT NULL, -- RevenueFromContractWithCustomerExcludingAssessedTax, NetIncomeLoss
@@ -21,3 +21,10 @@ CREATE TABLE IF NOT EXISTS xbrl_facts (
 CREATE INDEX IF NOT EXISTS idx_xbrl_cik_tag ON xbrl_facts(cik, tag);
 -- Index for time-series range
 CREATE INDEX IF NOT EXISTS idx_xbrl_period_end ON xbrl_facts(period_end);
+
+-- Latest filed_date loaded per company; incremental refreshes only diff facts filed since
+CREATE TABLE IF NOT EXISTS xbrl_watermarks (
+    cik VARCHAR PRIMARY KEY,
+    max_filed_date DATE,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,19 @@
+-- Cross-sectional XBRL snapshots from the frames API (one value per company per concept per period)
+CREATE TABLE IF NOT EXISTS xbrl_frames (
+    taxonomy VARCHAR NOT NULL, -- us-gaap
+    tag VARCHAR NOT NULL, -- Revenues, NetIncomeLoss
+    unit VARCHAR NOT NULL, -- USD
+    frame VARCHAR NOT NULL, -- CY2023 (annual), CY2023Q4 (quarter), CY2023Q4I (instant)
+    cik VARCHAR NOT NULL,
+    entity_name VARCHAR,
+    loc VARCHAR, -- e.g. US-CA
+    accession_number VARCHAR, -- Filing the value was taken from
+    period_start DATE,
+    period_end DATE,
+    value DOUBLE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (taxonomy, tag, unit, frame, cik)
+);
+
+-- Screens read one frame across all companies
+CREATE INDEX IF NOT EXISTS idx_xbrl_frames_frame ON xbrl_frames(frame, tag);
@@ -0,0 +1,122 @@
+import os
+import time
+import logging
+from multiprocessing import Pool
+from typing import Callable, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from pipelines.models import Filing, FilingState
+from pipelines.storage import MinIOClient
+from pipelines.documents import load_manifest, xbrl_document
+from pipelines.parse.xbrl import XBRLParser
+from pipelines.facts import FactWriter, fact_rows
+
+logger = logging.getLogger(__name__)
+
+# Worker processes are recycled after this many filings so lxml/allocator
+# fragmentation from a few huge instances doesn't accumulate.
+_MAX_TASKS_PER_WORKER = 200
+
+
+def parse_filing(job: Tuple[str, str, Optional[str]]) -> Tuple[str, Optional[List[tuple]], Optional[str]]:
+    """
+    Pool worker: fetches a filing's XBRL document and parses it.
+    Returns (accession, fact rows, None) or (accession, None, error).
+    Facts are streamed from the parser straight into fact_rows() tuples (numeric
+    only, all FactWriter stores), so no fact dicts pile up and pickling is cheap.
+    """
+    accession, form_type, s3_path = job
+    try:
+        # Shares the per-process S3 client; each filing is read once, so bypass
+        # the host cache rather than evict the hot objects in it
+        storage = MinIOClient(cache=False)
+        manifest = load_manifest(storage, accession)
+        doc = xbrl_document(manifest, form_type) if manifest else None
+        content = storage.get_object(doc["key"] if doc else s3_path)
+        return accession, list(fact_rows(XBRLParser().iter_facts(content))), None
+    except Exception as e:
+        return accession, None, f"{type(e).__name__}: {e}"
+
+
+class BacklogParser:
+    """
+    Drains DOWNLOADED filings across a process pool.
+
+    Each batch is claimed with SELECT ... FOR UPDATE SKIP LOCKED and stays
+    locked for the length of its transaction, so several parse-backlog runs
+    (or hosts) can work the same backlog without overlap, and a crashed run
+    just releases its rows. Results are written as they arrive (imap_unordered)
+    through FactWriter; the batch's state changes commit together with its facts.
+    workers <= 1 parses in-process.
+    """
+    def __init__(self, session_factory: Callable[[], Session], workers: Optional[int] = None, batch_size: Optional[int] = None):
+        self.session_factory = session_factory
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size or self.workers * 8
+
+    def _claim(self, session: Session) -> List[Tuple[str, str, Optional[str]]]:
+        rows = (
+            session.query(Filing.accession_number, Filing.form_type, Filing.s3_path)
+            .filter(Filing.state == FilingState.DOWNLOADED)
+            .order_by(Filing.filed_at)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        return [tuple(row) for row in rows]
+
+    def run(self, limit: Optional[int] = None) -> dict:
+        stats = {"filings": 0, "failed": 0, "facts": 0}
+        started = time.perf_counter()
+
+        pool = Pool(self.workers, maxtasksperchild=_MAX_TASKS_PER_WORKER) if self.workers > 1 else None
+        imap = pool.imap_unordered if pool else map
+        try:
+            while limit is None or stats["filings"] + stats["failed"] < limit:
+                session = self.session_factory()
+                try:
+                    jobs = self._claim(session)
+                    if limit is not None:
+                        jobs = jobs[:limit - stats["filings"] - stats["failed"]]
+                    if not jobs:
+                        break
+
+                    writer = FactWriter(session)
+                    done, failed, facts = [], [], 0
+                    for accession, rows, error in imap(parse_filing, jobs):
+                        if error:
+                            logger.error(f"Processing Failed {accession}: {error}")
+                            failed.append(accession)
+                            continue
+                        facts += writer.replace_rows(accession, rows)
+                        done.append(accession)
+
+                    for accessions, state in ((done, FilingState.PROCESSED), (failed, FilingState.FAILED)):
+                        if accessions:
+                            session.query(Filing).filter(Filing.accession_number.in_(accessions)).update(
+                                {Filing.state: state}, synchronize_session=False
+                            )
+                    session.commit()
+                except Exception:
+                    session.rollback()
+                    raise
+                finally:
+                    session.close()
+
+                stats["filings"] += len(done)
+                stats["failed"] += len(failed)
+                stats["facts"] += facts
+                elapsed = time.perf_counter() - started
+                logger.info(
+                    f"Parsed {stats['filings']} filings ({stats['failed']} failed), {stats['facts']} facts: "
+                    f"{stats['filings'] / elapsed:.1f} filings/s, {stats['facts'] / elapsed:.0f} facts/s"
+                )
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+
+        elapsed = time.perf_counter() - started
+        stats["seconds"] = round(elapsed, 2)
+        stats["filings_per_sec"] = round(stats["filings"] / elapsed, 2) if elapsed else 0.0
+        stats["facts_per_sec"] = round(stats["facts"] / elapsed, 1) if elapsed else 0.0
+        return stats
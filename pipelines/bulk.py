@@ -0,0 +1,53 @@
+import io
+import logging
+from datetime import date, datetime
+from typing import Any, Iterable, Sequence
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+
+
+def _copy_value(value: Any) -> str:
+    # PostgreSQL COPY text format: \N is NULL; backslash, tab and newlines escaped.
+    if value is None:
+        return "\\N"
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def copy_rows(connection: Connection, table: str, columns: Sequence[str], rows: Iterable[Sequence[Any]]) -> int:
+    """
+    Bulk-loads rows into table inside the connection's current transaction.
+    PostgreSQL: a single COPY ... FROM STDIN through psycopg2.
+    Other dialects (SQLite in tests): one executemany INSERT.
+    Returns the number of rows sent.
+    """
+    cols = ", ".join(columns)
+    if connection.dialect.name == "postgresql":
+        buf = io.StringIO()
+        count = 0
+        for row in rows:
+            buf.write("\t".join(_copy_value(v) for v in row))
+            buf.write("\n")
+            count += 1
+        buf.seek(0)
+        cursor = connection.connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY {table} ({cols}) FROM STDIN", buf)
+        finally:
+            cursor.close()
+        return count
+
+    params = [dict(zip(columns, row)) for row in rows]
+    if params:
+        placeholders = ", ".join(f":{c}" for c in columns)
+        connection.execute(text(f"INSERT INTO {table} ({cols}) VALUES ({placeholders})"), params)
+    return len(params)
@@ -0,0 +1,136 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError: # Windows: no cross-process locking, renames still keep entries whole
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Size estimate per cache directory, shared by every cache instance in the
+# process (one per SecClient / MinIOClient) so only the first store scans the
+# directory. Other processes write to it too, so the estimate is re-synced by
+# a scan every _RESCAN_SECONDS.
+_RESCAN_SECONDS = 300
+_sizes: Dict[Path, Tuple[int, float]] = {}
+_sizes_lock = threading.Lock()
+
+
+def _scan(root: Path) -> List[Tuple[Path, int, float]]:
+    """(body, size, mtime) per entry; entries another process removes mid-scan are skipped."""
+    entries = []
+    for body in root.glob("*/*.body"):
+        try:
+            st = body.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((body, st.st_size, st.st_mtime))
+    return entries
+
+
+class DiskCache:
+    """
+    Size-bounded on-disk LRU store shared by every process on a host; the base
+    of HttpCache and ObjectCache, which decide what is cached and what goes in
+    an entry's metadata. Entries are written then renamed so readers never see
+    a torn one, and least-recently-used entries are evicted first (file mtime =
+    last use). Files can vanish at any time under another process's eviction;
+    readers treat that as a miss.
+    Layout: {root}/{sha[:2]}/{sha}.body + {sha}.json
+    """
+    name = "Disk cache" # for log lines
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+
+    def _paths(self, cache_key: str) -> Tuple[Path, Path]:
+        digest = hashlib.sha256(cache_key.encode("utf-8")).hexdigest()
+        directory = self.root / digest[:2]
+        return directory / f"{digest}.body", directory / f"{digest}.json"
+
+    def _read_entry(self, body_path: Path, meta_path: Path) -> Optional[Tuple[Dict[str, Any], int]]:
+        """(metadata, body size), or None if the entry is missing or half-evicted."""
+        try:
+            meta = json.loads(meta_path.read_text())
+            size = body_path.stat().st_size
+        except (FileNotFoundError, ValueError):
+            return None
+        return meta, size
+
+    def _touch(self, body_path: Path, now: float) -> bool:
+        """Marks an entry as recently used. False if it has been evicted."""
+        try:
+            os.utime(body_path, (now, now))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _store(self, body_path: Path, meta_path: Path, data: bytes, meta: Dict[str, Any]) -> None:
+        body_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = body_path.with_suffix(f".tmp{os.getpid()}.{threading.get_ident()}")
+        tmp.write_bytes(data)
+        os.replace(tmp, body_path)
+        self._write_meta(meta_path, meta)
+        self._maybe_evict(len(data))
+
+    def _write_meta(self, meta_path: Path, meta: Dict[str, Any]) -> None:
+        tmp = meta_path.with_suffix(f".tmp{os.getpid()}.{threading.get_ident()}")
+        tmp.write_text(json.dumps(meta))
+        os.replace(tmp, meta_path)
+
+    @contextmanager
+    def _evicting(self) -> Iterator[bool]:
+        # One evictor per host at a time; others skip rather than queue up.
+        if fcntl is None:
+            yield True
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / ".evict.lock", "a+b") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _maybe_evict(self, added: int) -> None:
+        now = time.time()
+        with _sizes_lock:
+            size, scanned_at = _sizes.get(self.root, (None, 0.0))
+            if size is None or now - scanned_at > _RESCAN_SECONDS:
+                size, scanned_at = sum(s for _, s, _ in _scan(self.root)), now
+            else:
+                size += added
+            _sizes[self.root] = (size, scanned_at)
+            if size <= self.max_bytes:
+                return
+
+            with self._evicting() as owner:
+                if not owner:
+                    return
+                entries = sorted(_scan(self.root), key=lambda e: e[2])
+                total = sum(s for _, s, _ in entries)
+                target = int(self.max_bytes * 0.9)
+                evicted = 0
+                for body, size, _ in entries:
+                    if total <= target:
+                        break
+                    # Metadata first: a lookup in between sees a clean miss
+                    body.with_suffix(".json").unlink(missing_ok=True)
+                    body.unlink(missing_ok=True)
+                    total -= size
+                    evicted += 1
+                _sizes[self.root] = (total, time.time())
+                logger.info(f"{self.name} evicted {evicted} entries ({total / 1e6:.1f} MB kept)")
@@ -0,0 +1,101 @@
+import json
+import logging
+from typing import Any, Dict, List, Optional
+from botocore.exceptions import ClientError
+from pipelines.parse.sgml import SgmlDocument
+from pipelines.storage import MinIOClient
+
+logger = logging.getLogger(__name__)
+
+# Per-filing document layout in MinIO:
+#   edgar/{accession}/raw.txt              full submission (as downloaded)
+#   edgar/{accession}/docs/{seq}-{name}    one object per text document
+#   edgar/{accession}/documents.json       manifest (type, sequence, filename, key, size, sha256)
+
+
+def manifest_key(accession: str) -> str:
+    return f"edgar/{accession}/documents.json"
+
+
+def document_key(accession: str, doc: SgmlDocument) -> str:
+    seq = doc.sequence if doc.sequence is not None else 0
+    name = doc.filename or f"{doc.type or 'document'}.txt"
+    return f"edgar/{accession}/docs/{seq:03d}-{name}"
+
+
+class FilingDocumentWriter:
+    """
+    on_document sink for SubmissionDemuxer: uploads each text document as its
+    own object and records it in the filing's manifest.
+    """
+    def __init__(self, storage: MinIOClient, accession: str):
+        self.storage = storage
+        self.accession = accession
+        self.entries: List[Dict[str, Any]] = []
+
+    def __call__(self, doc: SgmlDocument) -> None:
+        entry = {
+            "sequence": doc.sequence,
+            "type": doc.type,
+            "filename": doc.filename,
+            "description": doc.description,
+            "size": doc.size,
+            "binary": doc.is_binary,
+            "key": None,
+            "sha256": None,
+        }
+        if doc.body is not None:
+            key = document_key(self.accession, doc)
+            result = self.storage.put_stream(key, iter(lambda: doc.body.read(1024 * 1024), b""))
+            entry["key"] = key
+            entry["sha256"] = result["sha256"]
+        self.entries.append(entry)
+
+    def write_manifest(self) -> str:
+        key = manifest_key(self.accession)
+        self.storage.put_object(key, json.dumps({"accession": self.accession, "documents": self.entries}).encode("utf-8"))
+        logger.info(f"Split {self.accession} into {sum(1 for e in self.entries if e['key'])} documents")
+        return key
+
+
+def load_manifest(storage: MinIOClient, accession: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Returns the filing's document list, or None if it was never split.
+    A manifest that exists but can't be fetched or parsed raises.
+    """
+    key = manifest_key(accession)
+    # One GET instead of HEAD + GET: no extra round trip, no window in between
+    try:
+        body = storage.get_object(key)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+            return None
+        raise
+    try:
+        return json.loads(body)["documents"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Unreadable document manifest {key}: {e}") from e
+
+
+def primary_document(manifest: List[Dict[str, Any]], form_type: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """The main report: the document whose type matches the form, else sequence 1."""
+    stored = [d for d in manifest if d.get("key")]
+    if form_type:
+        for d in stored:
+            if d["type"] == form_type:
+                return d
+    for d in stored:
+        if d["sequence"] == 1:
+            return d
+    return stored[0] if stored else None
+
+
+def xbrl_document(manifest: List[Dict[str, Any]], form_type: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    The document to parse for facts: a standalone instance (EX-101.INS, pre-2019
+    filings) when present, otherwise the primary document (inline XBRL).
+    """
+    for d in manifest:
+        if d.get("key") and d["type"] == "EX-101.INS":
+            return d
+    return primary_document(manifest, form_type)
@@ -0,0 +1,78 @@
+import json
+import logging
+from datetime import date, datetime
+from typing import Iterable, Iterator, Sequence
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from pipelines.bulk import copy_rows
+
+logger = logging.getLogger(__name__)
+
+FACT_COLUMNS = [
+    "filing_accession", "concept", "value", "unit",
+    "period_start", "period_end", "is_dimensional", "dimensions",
+]
+
+
+def _as_datetime(value):
+    # Parsed periods are dates; the facts columns are timestamps
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day)
+    return value
+
+
+def fact_columns(item: dict) -> dict:
+    """Parser fact dict -> Fact column values."""
+    dimensions = item.get("dimensions")
+    return {
+        "concept": item["concept"],
+        "value": item["value"],
+        "unit": item["unit"],
+        "period_start": _as_datetime(item.get("period_start")),
+        "period_end": _as_datetime(item.get("period_end")),
+        "is_dimensional": bool(item.get("is_dimensional")),
+        "dimensions": json.dumps(dimensions, sort_keys=True) if dimensions else None,
+    }
+
+
+def fact_rows(facts: Iterable[dict]) -> Iterator[tuple]:
+    """Numeric parser facts -> fact_columns() value tuples, converted as they stream."""
+    for item in facts:
+        if item.get("kind", "numeric") == "numeric":
+            yield tuple(fact_columns(item).values())
+
+
+class FactWriter:
+    """
+    Set-based persistence of parsed facts, bypassing the ORM unit of work.
+    replace() deletes a filing's facts and loads the new ones (COPY on
+    Postgres, executemany INSERT elsewhere) on the session's connection, so
+    the swap commits or rolls back with whatever else the caller does in
+    that transaction (e.g. marking the filing PROCESSED). Re-running a filing
+    therefore never duplicates its facts.
+
+    Only numeric facts (kind "numeric") are stored. Text facts from
+    ix:nonNumeric or unit-less instance elements (dei:DocumentType, policy
+    and note text blocks) are deliberately skipped: the facts table feeds
+    numeric features, and text blocks would multiply its size. They remain
+    available in the XBRLParser output for callers that need them.
+    fact_columns() must stay in FACT_COLUMNS order (after filing_accession).
+    """
+    def __init__(self, session: Session):
+        self.session = session
+
+    def replace(self, accession: str, facts: Iterable[dict]) -> int:
+        """
+        Replaces the stored numeric facts of accession (text facts are skipped).
+        facts may be a generator such as XBRLParser.iter_facts(): it is consumed
+        once, one fact at a time. Returns the number written.
+        """
+        return self.replace_rows(accession, fact_rows(facts))
+
+    def replace_rows(self, accession: str, rows: Iterable[Sequence]) -> int:
+        """replace() for facts already converted by fact_rows() (e.g. in a worker process)."""
+        conn = self.session.connection()
+        conn.execute(text("DELETE FROM facts WHERE filing_accession = :accession"), {"accession": accession})
+        count = copy_rows(conn, "facts", FACT_COLUMNS, ([accession, *row] for row in rows))
+        logger.debug(f"Wrote {count} facts for {accession}")
+        return count
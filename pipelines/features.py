@@ -49,6 +49,7 @@ class FeatureStore:
         # Load market data from MinIO (Wildcard)
         # Assuming market/*.csv
         market_path = f"s3://{settings.MINIO_BUCKET_RAW}/market/*.csv"
+        # Plain CSV: StooqClient never compresses these (see StooqClient.__init__)
         
         query = f"""
         CREATE OR REPLACE TABLE features AS
@@ -65,10 +66,11 @@ class FeatureStore:
                 f.cik,
                 fact.period_end as date,
                 fact.concept,
-                CAST(fact.value AS DOUBLE) as val
+                TRY_CAST(fact.value AS DOUBLE) as val
             FROM pg.facts fact
             JOIN pg.filings f ON fact.filing_accession = f.accession_number
             WHERE fact.period_end IS NOT NULL
+              AND NOT fact.is_dimensional -- company totals only, not segment breakdowns
         ),
         pivoted_funds AS (
             SELECT 
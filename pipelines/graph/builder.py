@@ -4,6 +4,7 @@ import networkx as nx
 from sqlalchemy.orm import Session
 from pipelines.models import Filing, Company
 from pipelines.storage import MinIOClient
+from pipelines.documents import load_manifest, primary_document
 from pipelines.graph.extractor import EntityExtractor
 
 logger = logging.getLogger(__name__)
@@ -12,7 +13,7 @@ class GraphBuilder:
     def __init__(self, db: Session):
         self.db = db
         self.extractor = EntityExtractor()
-        self.storage = MinIOClient()
+        self.storage = MinIOClient(cache=False) # each filing is read once
         self.graph = nx.DiGraph()
 
     def build_graph(self, limit: int = 50):
@@ -21,6 +22,7 @@ class GraphBuilder:
         
         # 1. Fetch Filings
         filings = self.db.query(Filing).filter(Filing.state == "PROCESSED").limit(limit).all()
+        failed = 0
         
         for f in filings:
             # Identify Source Node
@@ -34,7 +36,14 @@ class GraphBuilder:
             # We read text (first 20k chars usually contains Intro/Competition)
             if f.s3_path:
                 try:
-                    data = self.storage.get_object(f.s3_path)
+                    try:
+                        manifest = load_manifest(self.storage, f.accession_number)
+                    except Exception as e:
+                        # Broken manifest: the full submission still has the text
+                        logger.error(f"Document manifest for {f.accession_number} unreadable, using full submission: {e}")
+                        manifest = None
+                    doc = primary_document(manifest, f.form_type) if manifest else None
+                    data = self.storage.get_object(doc["key"] if doc else f.s3_path)
                     # Decode
                     text = data.decode("utf-8", errors="ignore")[:20000] 
                     
@@ -49,9 +58,12 @@ class GraphBuilder:
                             self.graph.add_edge(source_label, target, relation="MENTIONS")
                             
                 except Exception as e:
-                    logger.warning(f"Failed to process graph for {f.accession_number}: {e}")
+                    logger.error(f"Failed to process graph for {f.accession_number}: {e}")
+                    failed += 1
                     continue
         
+        if failed:
+            logger.error(f"Graph incomplete: {failed} of {len(filings)} filings could not be read")
         logger.info(f"Graph Built: {self.graph.number_of_nodes()} Nodes, {self.graph.number_of_edges()} Edges")
         return self.graph
 
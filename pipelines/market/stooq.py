@@ -8,7 +8,10 @@ logger = logging.getLogger(__name__)
 
 class StooqClient:
     def __init__(self):
-        self.storage = MinIOClient()
+        # market/*.csv is also read directly by DuckDB (FeatureStore), which
+        # knows nothing of our object metadata: plain CSV bodies, never CAS
+        # pointers, never compressed.
+        self.storage = MinIOClient(cas=False, compression="none")
     
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
     def download_daily_ohlc(self, ticker: str) -> bool:
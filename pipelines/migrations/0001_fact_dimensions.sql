@@ -0,0 +1,6 @@
+-- Fact.is_dimensional / Fact.dimensions (context and dimension resolution).
+-- create_all() only creates missing tables, so databases from before these
+-- columns existed need them added here.
+ALTER TABLE facts ADD COLUMN IF NOT EXISTS is_dimensional BOOLEAN NOT NULL DEFAULT FALSE;
+ALTER TABLE facts ADD COLUMN IF NOT EXISTS dimensions TEXT; -- JSON {axis: member}
+CREATE INDEX IF NOT EXISTS ix_facts_is_dimensional ON facts (is_dimensional);
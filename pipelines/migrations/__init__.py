@@ -0,0 +1,62 @@
+import logging
+from pathlib import Path
+from typing import List, Set
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).parent
+# Serializes concurrent appliers (workers starting together); any constant works
+_LOCK_KEY = 0x6564676172
+
+
+def apply_migrations(engine: Engine, directory: Path = MIGRATIONS_DIR) -> int:
+    """
+    Brings existing Postgres tables up to the current models: runs each
+    migrations/*.sql not yet recorded in schema_migrations, in name order,
+    in one transaction, and records it. This runs at every startup right after
+    create_all(), which only creates missing tables, so the common case must
+    be cheap: it is one catalog lookup and one SELECT. ALTER TABLE takes an
+    ACCESS EXCLUSIVE lock even when IF NOT EXISTS turns it into a no-op, so
+    applied files are never re-run. Other dialects (SQLite in tests) always
+    get fresh tables from create_all().
+    Returns the number of files applied.
+    """
+    if engine.dialect.name != "postgresql":
+        return 0
+    files = sorted(directory.glob("*.sql"))
+    with engine.connect() as conn:
+        if not [f for f in files if f.name not in _applied(conn)]:
+            return 0
+
+    with engine.begin() as conn:
+        _lock(conn)
+        conn.exec_driver_sql(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "name TEXT PRIMARY KEY, applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+        )
+        # Another process may have applied them while we waited for the lock
+        pending = [f for f in files if f.name not in _applied(conn)]
+        for sql_file in pending:
+            logger.info(f"Applying migration: {sql_file.name}")
+            for statement in _statements(sql_file.read_text()):
+                conn.exec_driver_sql(statement)
+            conn.execute(text("INSERT INTO schema_migrations (name) VALUES (:name)"), {"name": sql_file.name})
+    return len(pending)
+
+
+def _applied(conn: Connection) -> Set[str]:
+    if not inspect(conn).has_table("schema_migrations"):
+        return set()
+    return {row[0] for row in conn.exec_driver_sql("SELECT name FROM schema_migrations")}
+
+
+def _lock(conn: Connection) -> None:
+    # Released when the transaction ends
+    conn.exec_driver_sql(f"SELECT pg_advisory_xact_lock({_LOCK_KEY})")
+
+
+def _statements(sql: str) -> List[str]:
+    lines = [line.split("--", 1)[0] for line in sql.splitlines()]
+    return [s.strip() for s in "\n".join(lines).split(";") if s.strip()]
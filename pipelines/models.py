@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEnum, ForeignKey, Text, Float
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, Enum as SQLEnum, ForeignKey, Text, Float
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import expression, func
 import enum
 from datetime import datetime
 
@@ -42,7 +42,11 @@ class Fact(Base):
     value = Column(String) # Store as string to preserve precision/formatting initially? Or Decimal.
     unit = Column(String) # USD, shares
     period_start = Column(DateTime(timezone=True), nullable=True)
-    period_end = Column(DateTime(timezone=True), nullable=True)
+    period_end = Column(DateTime(timezone=True), nullable=True) # instant facts: the instant
+    # Facts on a dimension (segment, geography, ...) rather than the whole entity;
+    # indexed so company-level feature queries can skip them cheaply.
+    is_dimensional = Column(Boolean, default=False, server_default=expression.false(), nullable=False, index=True)
+    dimensions = Column(Text, nullable=True) # JSON {axis: member}
     
     # Metadata
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -73,5 +77,10 @@ class Company(Base):
     
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+class ReconcileCheckpoint(Base):
+    __tablename__ = "reconcile_checkpoints"
 
-
+    # e.g. "daily:20240103" or "quarterly:2024Q1:20240101-20240331"
+    index_key = Column(String, primary_key=True)
+    filings_added = Column(Integer, default=0)
+    completed_at = Column(DateTime(timezone=True), server_default=func.now())
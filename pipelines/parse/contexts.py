@@ -0,0 +1,159 @@
+import logging
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+XBRLI_NS = "http://www.xbrl.org/2003/instance"
+
+
+def local_name(tag) -> str:
+    """"{ns}startDate" (XML parser) or "xbrli:startdate" (HTML parser) -> "startdate"."""
+    if not isinstance(tag, str):
+        return ""
+    return tag.rpartition("}")[2].rpartition(":")[2].lower()
+
+
+def _text(el) -> str:
+    return (el.text or "").strip()
+
+
+def _date(value: str) -> Optional[date]:
+    # xs:date, occasionally xs:dateTime ("2023-09-30T00:00:00")
+    try:
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        return None
+
+
+def _short_measure(measure: str) -> str:
+    # "iso4217:USD" -> "USD", "xbrli:shares" -> "shares"
+    return measure.rpartition(":")[2]
+
+
+@dataclass(frozen=True)
+class Context:
+    id: str
+    entity: Optional[str]
+    start: Optional[date]
+    end: Optional[date]
+    instant: Optional[date]
+    # (axis, member) pairs sorted by axis; typed members carry their value
+    dimensions: Tuple[Tuple[str, str], ...] = field(default_factory=tuple)
+
+    @property
+    def is_dimensional(self) -> bool:
+        return bool(self.dimensions)
+
+    @property
+    def period_end(self) -> Optional[date]:
+        # Instants are stored as period_end so balance-sheet and flow facts share a date column
+        return self.end or self.instant
+
+
+class ContextMap:
+    """
+    xbrli:context elements of one document, indexed by id.
+    Built once while the document streams past; every fact then resolves its
+    contextRef with a dict lookup. Works on elements from the XML parser
+    (namespaced) and from the HTML parser (prefixed, lowercased).
+    """
+    def __init__(self):
+        self._contexts: Dict[str, Context] = {}
+
+    def __len__(self) -> int:
+        return len(self._contexts)
+
+    def __contains__(self, context_id: str) -> bool:
+        return context_id in self._contexts
+
+    def get(self, context_id: Optional[str]) -> Optional[Context]:
+        return self._contexts.get(context_id) if context_id else None
+
+    def add_element(self, el) -> Optional[Context]:
+        context_id = el.get("id")
+        if not context_id:
+            return None
+        entity = start = end = instant = None
+        dimensions = []
+        for child in el.iter():
+            name = local_name(child.tag)
+            if name == "identifier":
+                entity = _text(child)
+            elif name == "startdate":
+                start = _date(_text(child))
+            elif name == "enddate":
+                end = _date(_text(child))
+            elif name == "instant":
+                instant = _date(_text(child))
+            elif name == "explicitmember":
+                dimensions.append((child.get("dimension"), _text(child)))
+            elif name == "typedmember":
+                # <xbrldi:typedMember dimension="x:Axis"><x:Dom>value</x:Dom></...>
+                value = " ".join(t.strip() for t in child.itertext() if t.strip())
+                dimensions.append((child.get("dimension"), value))
+        context = Context(context_id, entity, start, end, instant, tuple(sorted(dimensions, key=lambda d: d[0] or "")))
+        self._contexts[context_id] = context
+        return context
+
+
+class UnitMap:
+    """xbrli:unit elements by id, as short measures: "USD", "shares", "USD/shares"."""
+    def __init__(self):
+        self._units: Dict[str, str] = {}
+
+    def get(self, unit_id: Optional[str]) -> Optional[str]:
+        return self._units.get(unit_id) if unit_id else None
+
+    def add_element(self, el) -> Optional[str]:
+        unit_id = el.get("id")
+        if not unit_id:
+            return None
+        numerator, denominator = [], []
+        for child in el.iter():
+            if local_name(child.tag) != "measure":
+                continue
+            in_denominator = any(local_name(a.tag) == "unitdenominator" for a in child.iterancestors())
+            (denominator if in_denominator else numerator).append(_short_measure(_text(child)))
+        unit = "*".join(numerator)
+        if denominator:
+            unit = f"{unit}/{'*'.join(denominator)}"
+        self._units[unit_id] = unit
+        return unit
+
+
+def resolve_fact(fact: dict, contexts: ContextMap, units: UnitMap) -> dict:
+    """
+    Adds period, dimension and unit columns to a parsed fact in place.
+    Output schema shared by the inline and XML instance parsers:
+    period_start / period_end (instants: period_end only) / period_instant,
+    dimensions ({axis: member} or None), is_dimensional, unit (resolved measure).
+    """
+    context = contexts.get(fact.get("period_db_ref"))
+    if context is None:
+        fact.update(period_start=None, period_end=None, period_instant=None, dimensions=None, is_dimensional=False)
+    else:
+        fact.update(
+            period_start=context.start,
+            period_end=context.period_end,
+            period_instant=context.instant,
+            dimensions=dict(context.dimensions) if context.dimensions else None,
+            is_dimensional=context.is_dimensional,
+        )
+    unit_ref = fact.get("unit")
+    if unit_ref:
+        fact["unit"] = units.get(unit_ref) or unit_ref
+    return fact
+
+
+def resolve_all(facts: Iterable[dict], contexts: ContextMap, units: UnitMap) -> int:
+    """Resolves facts whose context appeared after them. Returns how many stayed unresolved."""
+    missing = 0
+    for fact in facts:
+        resolve_fact(fact, contexts, units)
+        if fact.get("period_db_ref") and fact["period_db_ref"] not in contexts:
+            missing += 1
+    if missing:
+        logger.warning(f"{missing} facts reference undefined contexts")
+    return missing
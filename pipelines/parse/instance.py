@@ -0,0 +1,84 @@
+import logging
+import lxml.etree as etree
+from typing import BinaryIO, Iterator, List
+from pipelines.parse.contexts import XBRLI_NS, ContextMap, UnitMap, resolve_all, resolve_fact
+
+logger = logging.getLogger(__name__)
+
+XSI_NIL = "{http://www.w3.org/2001/XMLSchema-instance}nil"
+_CONTEXT = f"{{{XBRLI_NS}}}context"
+_UNIT = f"{{{XBRLI_NS}}}unit"
+
+
+class XbrlInstanceReader:
+    """
+    Streaming reader for standalone XBRL instance documents (pre-2019 EX-101.INS
+    filings, *_htm.xml). Every element carrying a contextRef is a fact: with a
+    unitRef it is numeric, otherwise text. Top-level elements are cleared as
+    soon as they end, so memory stays flat on multi-hundred-MB instances.
+    Facts come out in the same schema as InlineXbrlReader, resolved against
+    the document's contexts and units (self.contexts / self.units).
+    """
+    def __init__(self):
+        self.contexts = ContextMap()
+        self.units = UnitMap()
+
+    def iter_facts(self, source: BinaryIO) -> Iterator[dict]:
+        unresolved: List[dict] = []
+        for _, el in etree.iterparse(source, events=("end",), huge_tree=True, resolve_entities=False, no_network=True):
+            tag = el.tag
+            if not isinstance(tag, str):
+                continue
+            if tag == _CONTEXT:
+                self.contexts.add_element(el)
+            elif tag == _UNIT:
+                self.units.add_element(el)
+            else:
+                context_ref = el.get("contextRef")
+                if context_ref is not None:
+                    fact = self._fact(el, context_ref)
+                    if fact is not None:
+                        unit_ref = fact["unit"]
+                        if context_ref in self.contexts and (not unit_ref or self.units.get(unit_ref)):
+                            yield resolve_fact(fact, self.contexts, self.units)
+                        else:
+                            unresolved.append(fact)
+
+            parent = el.getparent()
+            if parent is not None and parent.getparent() is None:
+                # Top-level element (fact, tuple, context, footnote link) done: free it
+                el.clear()
+                while el.getprevious() is not None:
+                    del parent[0]
+
+        resolve_all(unresolved, self.contexts, self.units)
+        yield from unresolved
+
+    def _fact(self, el, context_ref: str):
+        qname = etree.QName(el)
+        concept = f"{el.prefix}:{qname.localname}" if el.prefix else qname.localname
+        unit_ref = el.get("unitRef")
+        nil = el.get(XSI_NIL) == "true"
+        text = el.text or ""
+
+        if unit_ref is not None:
+            if nil:
+                return None
+            try:
+                value = str(float(text.strip()))
+            except ValueError:
+                logger.debug(f"Non-numeric value for {concept} in {context_ref}: {text[:40]!r}")
+                return None
+            kind = "numeric"
+        else:
+            value = None if nil else " ".join(text.split())
+            kind = "text"
+
+        return {
+            "concept": concept,
+            "value": value,
+            "unit": unit_ref,
+            "period_db_ref": context_ref,
+            "decimals": el.get("decimals"),
+            "kind": kind,
+        }
@@ -0,0 +1,192 @@
+import logging
+import lxml.etree as etree
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+from pipelines.parse.contexts import XBRLI_NS, ContextMap, UnitMap, local_name, resolve_all, resolve_fact
+
+logger = logging.getLogger(__name__)
+
+IX_NAMESPACES = {
+    "http://www.xbrl.org/2013/inlineXBRL",
+    "http://www.xbrl.org/2008/inlineXBRL",
+}
+XSI_NIL = "{http://www.w3.org/2001/XMLSchema-instance}nil"
+_FACT_ELEMENTS = ("nonFraction", "nonNumeric", "continuation")
+# iterparse tag filters: XML mode sees {ns}localName, the HTML parser ix:lowercase
+# plus the xbrli:context / xbrli:unit definitions in ix:resources.
+_XML_TAGS = [f"{{{ns}}}{local}" for ns in IX_NAMESPACES for local in _FACT_ELEMENTS] + [
+    f"{{{XBRLI_NS}}}context", f"{{{XBRLI_NS}}}unit",
+]
+_HTML_TAGS = [f"ix:{local.lower()}" for local in _FACT_ELEMENTS] + [
+    "xbrli:context", "xbrli:unit", "context", "unit",
+]
+# Elements whose text (minus ix:exclude) is a fact value, so their subtree must
+# stay intact until their end tag.
+_XML_CAPTURED = [f"{{{ns}}}{local}" for ns in IX_NAMESPACES for local in ("nonNumeric", "continuation")]
+_HTML_CAPTURED = ["ix:nonnumeric", "ix:continuation"]
+# Attribute names as each parser reports them
+_XML_ATTRS = {
+    "name": "name", "contextref": "contextRef", "unitref": "unitRef", "decimals": "decimals",
+    "scale": "scale", "sign": "sign", "format": "format", "continuedat": "continuedAt",
+    "id": "id", "nil": XSI_NIL,
+}
+_HTML_ATTRS = {k: ("xsi:nil" if k == "nil" else k) for k in _XML_ATTRS}
+# ixt transformation formats where the decimal separator is a comma ("1.234,56")
+_COMMA_DECIMAL = {"numcommadecimal", "numspacecomma", "numdotcomma", "numcomma"}
+_ZERO_FORMATS = {"zerodash", "fixedzero", "numdash"}
+
+
+def ix_name(tag) -> Optional[str]:
+    """Lowercased local name if tag is an inline XBRL element, else None."""
+    if not isinstance(tag, str): # comments, processing instructions
+        return None
+    if tag[:1] == "{":
+        ns, _, local = tag[1:].partition("}")
+        return local.lower() if ns in IX_NAMESPACES else None
+    if tag.startswith("ix:"): # HTML parser: prefix kept in the name, lowercased
+        return tag[3:]
+    return None
+
+
+def ix_text(el) -> str:
+    """Text content of el, skipping ix:exclude subtrees and comments."""
+    parts = [el.text or ""] if isinstance(el.tag, str) else []
+    for child in el:
+        if isinstance(child.tag, str) and ix_name(child.tag) != "exclude":
+            parts.append(ix_text(child))
+        parts.append(child.tail or "")
+    return "".join(parts)
+
+
+def _squash(text: str) -> str:
+    return " ".join(text.split())
+
+
+def numeric_value(text: str, fmt: Optional[str], scale: Optional[str], sign: Optional[str]) -> Optional[float]:
+    """Applies the ixt format, scale and sign of an ix:nonFraction. None if unparseable."""
+    fmt_name = (fmt or "").rpartition(":")[2].lower().replace("-", "")
+    if fmt_name in _ZERO_FORMATS:
+        val = 0.0
+    else:
+        cleaned = "".join(text.split())
+        if fmt_name in _COMMA_DECIMAL:
+            cleaned = cleaned.replace(".", "").replace(",", ".")
+        else:
+            cleaned = cleaned.replace(",", "")
+        if not cleaned:
+            return None
+        try:
+            val = float(cleaned)
+        except ValueError:
+            return None
+    if sign == "-":
+        val = -val
+    if scale:
+        val = val * (10 ** int(scale))
+    return val
+
+
+class InlineXbrlReader:
+    """
+    Streaming inline XBRL fact reader built on lxml iterparse.
+
+    Only ix fact elements produce events. At each one that isn't nested in a
+    text fact, the element is cleared and everything before it in the tree is
+    dropped, so memory is bounded by the largest ix:nonNumeric block (or
+    untagged stretch between two facts) rather than by the document. Handles
+    ix:nonFraction, ix:nonNumeric (ix:exclude removed from the text) and
+    ix:continuation chains, which are resolved once the document ends.
+    Contexts and units from ix:resources are indexed as they pass
+    (self.contexts / self.units) and each fact is resolved against them; the
+    rare fact that precedes its context is held until the end.
+    html=True uses libxml2's HTML parser for documents that aren't
+    well-formed XHTML.
+    """
+    def __init__(self):
+        self.contexts = ContextMap()
+        self.units = UnitMap()
+
+    def iter_facts(self, source: BinaryIO, html: bool = False) -> Iterator[dict]:
+        for fact in self._iter_raw(source, html):
+            if (fact["period_db_ref"] in self.contexts) and (not fact["unit"] or self.units.get(fact["unit"])):
+                yield resolve_fact(fact, self.contexts, self.units)
+            else:
+                self._unresolved.append(fact)
+        resolve_all(self._unresolved, self.contexts, self.units)
+        yield from self._unresolved
+
+    def _iter_raw(self, source: BinaryIO, html: bool) -> Iterator[dict]:
+        self._unresolved: List[dict] = []
+        waiting: List[Tuple[dict, str]] = [] # nonNumeric facts with continuedAt
+        continuations: Dict[str, Tuple[str, Optional[str]]] = {}
+
+        if html:
+            options = {"html": True, "tag": _HTML_TAGS}
+            captured_tags, a = _HTML_CAPTURED, _HTML_ATTRS
+        else:
+            options = {"tag": _XML_TAGS, "huge_tree": True, "resolve_entities": False, "no_network": True}
+            captured_tags, a = _XML_CAPTURED, _XML_ATTRS
+
+        for _, el in etree.iterparse(source, events=("end",), **options):
+            name = ix_name(el.tag)
+            get = el.get
+            if name == "nonfraction":
+                if get(a["nil"]) != "true":
+                    val = numeric_value(ix_text(el), get(a["format"]), get(a["scale"]), get(a["sign"]))
+                    if val is not None:
+                        yield {
+                            "concept": get(a["name"]),
+                            "value": str(val),
+                            "unit": get(a["unitref"]),
+                            "period_db_ref": get(a["contextref"]),
+                            "decimals": get(a["decimals"]),
+                            "kind": "numeric",
+                        }
+            elif name == "nonnumeric":
+                fact = {
+                    "concept": get(a["name"]),
+                    "value": None if get(a["nil"]) == "true" else _squash(ix_text(el)),
+                    "unit": None,
+                    "period_db_ref": get(a["contextref"]),
+                    "decimals": None,
+                    "kind": "text",
+                }
+                continued_at = get(a["continuedat"])
+                if continued_at:
+                    waiting.append((fact, continued_at))
+                else:
+                    yield fact
+            elif name == "continuation":
+                continuations[get(a["id"], "")] = (ix_text(el), get(a["continuedat"]))
+            elif name is None:
+                tag = local_name(el.tag)
+                if tag == "context":
+                    self.contexts.add_element(el)
+                elif tag == "unit":
+                    self.units.add_element(el)
+
+            if next(el.iterancestors(*captured_tags), None) is None:
+                # Nothing still open reads this subtree: free it and all that came before
+                el.clear(keep_tail=True)
+                node = el
+                while node is not None:
+                    parent = node.getparent()
+                    if parent is not None:
+                        while node.getprevious() is not None:
+                            del parent[0]
+                    node = parent
+
+        for fact, continued_at in waiting:
+            yield self._continue(fact, continued_at, continuations)
+
+    def _continue(self, fact: dict, continued_at: str, continuations: Dict[str, Tuple[str, Optional[str]]]) -> dict:
+        parts = [fact["value"] or ""]
+        seen = set()
+        while continued_at and continued_at not in seen:
+            seen.add(continued_at)
+            if continued_at not in continuations:
+                logger.warning(f"ix:continuation {continued_at} for {fact['concept']} not found")
+                break
+            text, continued_at = continuations[continued_at]
+            parts.append(_squash(text))
+        fact["value"] = " ".join(p for p in parts if p)
+        return fact
@@ -0,0 +1,200 @@
+import re
+import logging
+import tempfile
+from collections import deque
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Deque, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Header tags inside a <DOCUMENT> block, e.g. "<TYPE>10-K"
+_HEADER_TAG = re.compile(rb"^<(TYPE|SEQUENCE|FILENAME|DESCRIPTION)>(.*)$")
+# Wrappers SEC puts around some document bodies (<XBRL>...</XBRL> for EX-101 instances).
+_WRAPPERS = {b"<XBRL>": b"</XBRL>", b"<XML>": b"</XML>"}
+# A line this long can't be a tag, so inside <TEXT> it is flushed without waiting for "\n".
+_MAX_PENDING_LINE = 64 * 1024
+
+
+@dataclass
+class SgmlDocument:
+    type: str
+    sequence: Optional[int]
+    filename: Optional[str]
+    description: Optional[str]
+    body: Optional[BinaryIO] # rewound spooled file; None for skipped binary parts
+    size: int
+    is_binary: bool
+
+    def read(self) -> bytes:
+        return self.body.read() if self.body else b""
+
+
+class SubmissionDemuxer:
+    """
+    Streaming splitter for EDGAR full-submission .txt files.
+
+    The submission is an SGML envelope: a <SEC-HEADER> followed by one
+    <DOCUMENT> block per file (<TYPE>, <SEQUENCE>, <FILENAME>, <DESCRIPTION>,
+    then the body between <TEXT> and </TEXT>). Push bytes with feed(); each
+    document is handed to on_document as soon as its </DOCUMENT> is seen.
+    Bodies are spooled (memory up to spool_size, then a temp file), and
+    uuencoded binaries (graphics, PDFs, zips) are skipped, so memory stays
+    bounded by spool_size no matter how large the submission is.
+    Bodies are closed once on_document returns unless close_bodies=False.
+    """
+    def __init__(
+        self,
+        on_document: Callable[[SgmlDocument], None],
+        skip_binary: bool = True,
+        spool_size: int = 8 * 1024 * 1024,
+        close_bodies: bool = True,
+    ):
+        self.on_document = on_document
+        self.skip_binary = skip_binary
+        self.close_bodies = close_bodies
+        self.spool_size = spool_size
+        self.documents_seen = 0
+        self._pending = b""
+        self._pending_is_continuation = False
+        self._reset_document()
+        self._state = "OUT"
+
+    def _reset_document(self) -> None:
+        self._meta = {}
+        self._body: Optional[BinaryIO] = None
+        self._size = 0
+        self._is_binary = False
+        self._first_body_line = True
+        self._closing_wrapper: Optional[bytes] = None
+        self._last_line_offset = 0
+        self._last_line = b""
+
+    def feed(self, chunk: bytes) -> None:
+        data = self._pending + chunk
+        lines = data.split(b"\n")
+        self._pending = lines.pop()
+        for line in lines:
+            self._handle_line(line + b"\n", self._pending_is_continuation)
+            self._pending_is_continuation = False
+
+        # Very long body lines (single-line HTML) are written out in pieces.
+        if self._state == "TEXT" and len(self._pending) > _MAX_PENDING_LINE:
+            self._handle_line(self._pending, self._pending_is_continuation)
+            self._pending = b""
+            self._pending_is_continuation = True
+
+    def close(self) -> None:
+        if self._pending:
+            self._handle_line(self._pending, self._pending_is_continuation)
+            self._pending = b""
+        if self._state != "OUT":
+            logger.warning("Submission ended inside a <DOCUMENT> block; emitting it truncated.")
+            self._emit()
+
+    def _handle_line(self, line: bytes, continuation: bool) -> None:
+        stripped = line.strip() if not continuation else b""
+
+        if self._state == "OUT":
+            if stripped == b"<DOCUMENT>":
+                self._reset_document()
+                self._state = "HEADER"
+            return
+
+        if self._state == "HEADER":
+            if stripped == b"<TEXT>":
+                self._state = "TEXT"
+                return
+            if stripped == b"</DOCUMENT>":
+                self._emit()
+                return
+            match = _HEADER_TAG.match(stripped)
+            if match:
+                self._meta[match.group(1).decode().lower()] = match.group(2).decode("utf-8", errors="ignore").strip()
+            return
+
+        if self._state == "TEXT":
+            if stripped == b"</TEXT>":
+                self._finish_body()
+                self._state = "AFTER_TEXT"
+                return
+            self._write_body(line, stripped, continuation)
+            return
+
+        if self._state == "AFTER_TEXT" and stripped == b"</DOCUMENT>":
+            self._emit()
+
+    def _write_body(self, line: bytes, stripped: bytes, continuation: bool) -> None:
+        if self._first_body_line and not continuation:
+            if not stripped:
+                return
+            self._first_body_line = False
+            if stripped.startswith(b"begin ") or stripped == b"<PDF>":
+                self._is_binary = True
+            if stripped in _WRAPPERS:
+                self._closing_wrapper = _WRAPPERS[stripped]
+                return
+        self._first_body_line = False
+
+        if self._is_binary and self.skip_binary:
+            self._size += len(line)
+            return
+
+        if self._body is None:
+            self._body = tempfile.SpooledTemporaryFile(max_size=self.spool_size)
+        if not continuation:
+            self._last_line_offset = self._size
+            self._last_line = stripped
+        self._body.write(line)
+        self._size += len(line)
+
+    def _finish_body(self) -> None:
+        # Drop the closing wrapper tag (e.g. </XBRL>) that precedes </TEXT>.
+        if self._body is not None and self._closing_wrapper and self._last_line == self._closing_wrapper:
+            self._body.truncate(self._last_line_offset)
+            self._size = self._last_line_offset
+
+    def _emit(self) -> None:
+        if self._body is not None:
+            self._body.seek(0)
+        sequence = self._meta.get("sequence")
+        doc = SgmlDocument(
+            type=self._meta.get("type", ""),
+            sequence=int(sequence) if sequence and sequence.isdigit() else None,
+            filename=self._meta.get("filename"),
+            description=self._meta.get("description"),
+            body=self._body if not (self._is_binary and self.skip_binary) else None,
+            size=self._size,
+            is_binary=self._is_binary,
+        )
+        self.documents_seen += 1
+        try:
+            self.on_document(doc)
+        finally:
+            if doc.body is not None and self.close_bodies:
+                doc.body.close()
+            self._reset_document()
+            self._state = "OUT"
+
+
+def iter_documents(chunks: Iterable[bytes], skip_binary: bool = True) -> Iterator[SgmlDocument]:
+    """
+    Pull-style wrapper around SubmissionDemuxer.
+    Each yielded document's body is only valid until the next iteration.
+    """
+    ready: Deque[SgmlDocument] = deque()
+    demuxer = SubmissionDemuxer(ready.append, skip_binary=skip_binary, close_bodies=False)
+
+    def _drain() -> Iterator[SgmlDocument]:
+        while ready:
+            doc = ready.popleft()
+            try:
+                yield doc
+            finally:
+                if doc.body is not None:
+                    doc.body.close()
+
+    for chunk in chunks:
+        demuxer.feed(chunk)
+        yield from _drain()
+    demuxer.close()
+    yield from _drain()
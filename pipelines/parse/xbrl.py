@@ -1,23 +1,66 @@
 
 import logging
+from io import BytesIO
 from bs4 import BeautifulSoup
 import lxml.etree as etree
 import re
+from typing import Iterator
+from pipelines.parse.ixbrl import InlineXbrlReader
+from pipelines.parse.instance import XbrlInstanceReader
 
 logger = logging.getLogger(__name__)
 
 class XBRLParser:
+    """
+    engine="stream" (default) parses inline XBRL with the streaming lxml reader
+    (nonFraction, nonNumeric, continuations); engine="soup" is the original
+    BeautifulSoup implementation (nonFraction only), kept for comparison.
+    """
+    def __init__(self, engine: str = "stream"):
+        if engine not in ("stream", "soup"):
+            raise ValueError(f"Unknown XBRL parse engine: {engine}")
+        self.engine = engine
+
     def parse(self, content: bytes) -> list[dict]:
         """
         Parses XBRL content (Inline XBRL or XML) and returns a list of facts.
         """
+        return list(self.iter_facts(content))
+
+    def iter_facts(self, content: bytes) -> Iterator[dict]:
+        """
+        Same facts as parse(), yielded as they are read so callers that
+        consume them one at a time (FactWriter) never hold the whole list.
+        """
         # Detection
         if b"<html" in content[:1000].lower() or b"xmlns:ix" in content[:2000].lower():
-            return self._parse_ixbrl(content)
+            return self._iter_ixbrl(content)
         else:
-            return self._parse_xml(content)
+            return self._iter_xml(content)
+
+    def _iter_ixbrl(self, content: bytes) -> Iterator[dict]:
+        if self.engine == "soup":
+            yield from self._parse_ixbrl_soup(content)
+            return
+
+        # Well-formed XHTML (what EDGAR requires) goes through the XML parser;
+        # un-namespaced or sloppy HTML through libxml2's forgiving HTML parser.
+        done = 0
+        if b"xmlns:ix" in content[:4000]:
+            try:
+                for fact in InlineXbrlReader().iter_facts(BytesIO(content)):
+                    yield fact
+                    done += 1
+                return
+            except etree.XMLSyntaxError as e:
+                logger.info(f"iXBRL is not well-formed XML ({e}); re-parsing as HTML")
+        # Facts before the syntax error were already yielded; the HTML parse
+        # reads the same prefix in the same order, so skip that many.
+        for i, fact in enumerate(InlineXbrlReader().iter_facts(BytesIO(content), html=True)):
+            if i >= done:
+                yield fact
 
-    def _parse_ixbrl(self, content: bytes) -> list[dict]:
+    def _parse_ixbrl_soup(self, content: bytes) -> list[dict]:
         facts = []
         soup = BeautifulSoup(content, "lxml")
         
@@ -60,7 +103,10 @@ class XBRLParser:
                 
         return facts
 
-    def _parse_xml(self, content: bytes) -> list[dict]:
-        # Placeholder for Legacy XML support
-        logger.info("XML XBRL Parsing not yet implemented")
-        return []
+    def _iter_xml(self, content: bytes) -> Iterator[dict]:
+        """Standalone XBRL instance (EX-101.INS, *_htm.xml): streamed, same fact schema as iXBRL."""
+        try:
+            yield from XbrlInstanceReader().iter_facts(BytesIO(content))
+        except etree.XMLSyntaxError as e:
+            # e.g. a raw SGML submission when the filing was never split into documents
+            logger.warning(f"Not an XBRL instance document ({e}); no further facts extracted")
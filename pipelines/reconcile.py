@@ -1,10 +1,13 @@
-
-import requests
+import httpx
 import logging
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
 from pipelines.sec.client import SecClient
-from pipelines.models import Filing, FilingState
+from pipelines.models import FilingState, ReconcileCheckpoint
+from sqlalchemy import text
 from sqlalchemy.orm import Session
+from pipelines.bulk import copy_rows
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +16,92 @@ class Reconciler:
         self.session = session
         self.client = SecClient()
         self.base_url = "https://www.sec.gov/Archives/edgar/daily-index"
+        self.full_index_url = "https://www.sec.gov/Archives/edgar/full-index"
+
+    def _daily_url(self, date_obj: datetime) -> str:
+        qtr = (date_obj.month - 1) // 3 + 1
+        return f"{self.base_url}/{date_obj.year}/QTR{qtr}/master.{date_obj.strftime('%Y%m%d')}.idx"
+
+    def _parse_index(self, body: str, default_date: Optional[datetime] = None) -> Dict[str, dict]:
+        """
+        Parses a master.idx body (daily or quarterly) into accession -> {cik, form_type, filename, filed_at}.
+        Daily files use YYYYMMDD in "Date Filed", quarterly ones YYYY-MM-DD.
+        """
+        file_accessions = {} # accession -> {cik, form, ...}
+
+        start_parsing = False
+        for line in body.splitlines():
+            if "CIK|Company Name" in line:
+                start_parsing = True
+                continue
+            if not start_parsing or not line.strip():
+                continue
+
+            parts = line.split("|")
+            if len(parts) < 5:
+                continue
+
+            cik = parts[0]
+            form_type = parts[2]
+            filename = parts[4]
+            accession = filename.split("/")[-1].replace(".txt", "")
+
+            filed_at = default_date
+            date_filed = parts[3].strip().replace("-", "")
+            if len(date_filed) == 8 and date_filed.isdigit():
+                filed_at = datetime.strptime(date_filed, "%Y%m%d")
+
+            file_accessions[accession] = {
+                "cik": cik,
+                "form_type": form_type,
+                "filename": filename,
+                "filed_at": filed_at
+            }
+        return file_accessions
+
+    def _apply_index(self, file_accessions: Dict[str, dict]) -> int:
+        """
+        Inserts filings from a parsed index that are not in the DB yet. Returns count added.
+        The index is staged into a temp table (COPY on Postgres) and missing rows are
+        found with an anti-join and inserted in one set-based statement, so the cost
+        depends on the size of the index, not of the filings table.
+        """
+        conn = self.session.connection()
+        conn.execute(text("""
+            CREATE TEMP TABLE IF NOT EXISTS reconcile_staging (
+                accession_number VARCHAR PRIMARY KEY,
+                cik VARCHAR,
+                form_type VARCHAR,
+                filed_at TIMESTAMP,
+                url VARCHAR
+            )
+        """))
+        conn.execute(text("DELETE FROM reconcile_staging"))
+
+        copy_rows(
+            conn,
+            "reconcile_staging",
+            ["accession_number", "cik", "form_type", "filed_at", "url"],
+            (
+                (acc, meta["cik"], meta["form_type"], meta["filed_at"], f"https://www.sec.gov/Archives/{meta['filename']}")
+                for acc, meta in file_accessions.items()
+            ),
+        )
+
+        # WHERE clause also keeps SQLite from misparsing ON CONFLICT after INSERT ... SELECT.
+        result = conn.execute(text("""
+            INSERT INTO filings (accession_number, cik, form_type, filed_at, url, state)
+            SELECT s.accession_number, s.cik, s.form_type, s.filed_at, s.url, :state
+            FROM reconcile_staging s
+            WHERE NOT EXISTS (SELECT 1 FROM filings f WHERE f.accession_number = s.accession_number)
+            ON CONFLICT (accession_number) DO NOTHING
+        """), {"state": FilingState.PENDING.value})
+        new_count = max(result.rowcount or 0, 0)
+
+        conn.execute(text("DELETE FROM reconcile_staging"))
+        self.session.commit()
+        logger.info(f"Found {new_count} missing filings (from {len(file_accessions)} total)")
+        return new_count
 
     def reconcile_date(self, date_str: str): # YYYYMMDD
         """
@@ -20,83 +109,17 @@ class Reconciler:
         URL Format: https://www.sec.gov/Archives/edgar/daily-index/2024/QTR1/master.20240103.idx
         """
         date_obj = datetime.strptime(date_str, "%Y%m%d")
-        year = date_obj.year
-        qtr = (date_obj.month - 1) // 3 + 1
-        
-        url = f"{self.base_url}/{year}/QTR{qtr}/master.{date_str}.idx"
+        url = self._daily_url(date_obj)
         logger.info(f"Reconciling Index: {url}")
-        
+
         try:
             resp = self.client.get(url)
-            # Parse Lines
-            lines = resp.text.splitlines()
-            logger.info(f"Downloaded Index. Lines: {len(lines)}")
-            
-            # 1. Parse all accessions from file
-            file_accessions = {} # accession -> {cik, form, ...}
-            
-            start_parsing = False
-            for line in lines:
-                if "CIK|Company Name" in line:
-                    start_parsing = True
-                    continue
-                if not start_parsing or not line.strip():
-                    continue
-
-                parts = line.split("|")
-                if len(parts) < 5:
-                    continue
-                
-                cik = parts[0]
-                form_type = parts[2]
-                filename = parts[4]
-                accession = filename.split("/")[-1].replace(".txt", "")
-                
-                file_accessions[accession] = {
-                    "cik": cik,
-                    "form_type": form_type,
-                    "filename": filename,
-                    "filed_at": date_obj
-                }
-            
-            # 2. Bulk Fetch Existing
-            existing_accessions = set()
-            # Chunking for VERY large datasets, but for sprint proof 100k is fine in memory for set
-            # Or query just accessions
-            existing_query = self.session.query(Filing.accession_number).all()
-            existing_accessions = {r[0] for r in existing_query}
-            
-            # 3. Determine Missing
-            missing = [acc for acc in file_accessions if acc not in existing_accessions]
-            
-            # 4. Bulk Insert
-            logger.info(f"Found {len(missing)} missing filings (from {len(file_accessions)} total)")
-            
-            batch = []
-            new_count = 0
-            for acc in missing:
-                meta = file_accessions[acc]
-                full_url = f"https://www.sec.gov/Archives/{meta['filename']}"
-                
-                filing = Filing(
-                    accession_number=acc,
-                    cik=meta["cik"],
-                    form_type=meta["form_type"],
-                    filed_at=meta["filed_at"],
-                    url=full_url,
-                    state=FilingState.PENDING
-                )
-                self.session.add(filing)
-                new_count += 1
-                
-                if new_count % 1000 == 0:
-                    self.session.commit()
-            
-            self.session.commit()
+            logger.info(f"Downloaded Index. Bytes: {len(resp.content)}")
+            new_count = self._apply_index(self._parse_index(resp.text, date_obj))
             logger.info(f"Reconciliation Complete. Added {new_count}")
             return new_count
-            
-        except requests.exceptions.HTTPError as e:
+
+        except httpx.HTTPStatusError as e:
             if e.response.status_code == 404:
                 logger.warning(f"Index not found for {date_str} (Weekends/Holidays?): {e}")
                 return 0
@@ -105,26 +128,91 @@ class Reconciler:
             logger.error(f"Reconcile Failed: {e}")
             raise
 
-    def reconcile_backfill(self, start_date: str, end_date: str):
+    def _backfill_units(self, start: datetime, end: datetime, granularity: str) -> List[Tuple[str, str, datetime, datetime]]:
+        """
+        Splits [start, end] into index files to fetch: (checkpoint_key, url, from, to).
+        daily: one master.YYYYMMDD.idx per weekday (EDGAR publishes none on weekends).
+        quarterly: one full-index master.idx per quarter, filtered to [start, end].
+        """
+        units = []
+        if granularity == "daily":
+            current = start
+            while current <= end:
+                if current.weekday() < 5:
+                    units.append((f"daily:{current.strftime('%Y%m%d')}", self._daily_url(current), current, current))
+                current += timedelta(days=1)
+        elif granularity == "quarterly":
+            year, qtr = start.year, (start.month - 1) // 3 + 1
+            while (year, qtr) <= (end.year, (end.month - 1) // 3 + 1):
+                q_start = datetime(year, 3 * qtr - 2, 1)
+                q_end = (datetime(year + (qtr == 4), (3 * qtr) % 12 + 1, 1)) - timedelta(days=1)
+                lo, hi = max(start, q_start), min(end, q_end)
+                key = f"quarterly:{year}Q{qtr}:{lo.strftime('%Y%m%d')}-{hi.strftime('%Y%m%d')}"
+                units.append((key, f"{self.full_index_url}/{year}/QTR{qtr}/master.idx", lo, hi))
+                year, qtr = (year + 1, 1) if qtr == 4 else (year, qtr + 1)
+        else:
+            raise ValueError(f"Unknown granularity: {granularity}")
+        return units
+
+    def reconcile_backfill(self, start_date: str, end_date: str, granularity: str = "daily", batch_size: int = 20):
         """
         Reconciles a range of dates [start_date, end_date].
+        Index files are fetched concurrently (batch_size at a time, all through the
+        shared SEC limiter) and applied in order. Each completed day/quarter is
+        checkpointed in reconcile_checkpoints, so a re-run after a crash resumes
+        where it stopped instead of starting over.
         """
         start = datetime.strptime(start_date, "%Y%m%d")
         end = datetime.strptime(end_date, "%Y%m%d")
-        
-        current = start
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+
+        units = self._backfill_units(start, end, granularity)
+        done = {r[0] for r in self.session.query(ReconcileCheckpoint.index_key).all()}
+        pending = [u for u in units if u[0] not in done]
+        logger.info(f"Backfill {start_date}-{end_date} ({granularity}): {len(pending)} of {len(units)} index files pending")
+
         total_added = 0
-        from datetime import timedelta
-        
-        while current <= end:
-            date_str = current.strftime("%Y%m%d")
-            try:
-                count = self.reconcile_date(date_str)
-                total_added += count
-            except Exception as e:
-                logger.error(f"Failed to reconcile {date_str}: {e}")
-                # Continue to next day
-            
-            current += timedelta(days=1)
-            
+        files_done = 0
+        started = time.monotonic()
+
+        for i in range(0, len(pending), batch_size):
+            batch = pending[i:i + batch_size]
+            responses = self.client.get_many([u[1] for u in batch], return_exceptions=True)
+
+            for (key, url, lo, hi), resp in zip(batch, responses):
+                if isinstance(resp, httpx.HTTPStatusError) and resp.response.status_code == 404:
+                    logger.warning(f"Index not found: {url} (Holiday?)")
+                    # Today's index may simply not be published yet; retry it next run.
+                    if hi < today:
+                        self._checkpoint(key, 0)
+                    continue
+                if isinstance(resp, BaseException):
+                    logger.error(f"Failed to fetch {url}: {resp}")
+                    # Continue to next index; it stays un-checkpointed for the next run
+                    continue
+
+                try:
+                    parsed = self._parse_index(resp.text, lo)
+                    if granularity == "quarterly":
+                        parsed = {acc: m for acc, m in parsed.items() if m["filed_at"] and lo <= m["filed_at"] <= hi}
+                    added = self._apply_index(parsed)
+                except Exception as e:
+                    self.session.rollback()
+                    logger.error(f"Failed to reconcile {key}: {e}")
+                    continue
+
+                self._checkpoint(key, added)
+                total_added += added
+                files_done += 1
+
+            elapsed = max(time.monotonic() - started, 1e-9)
+            logger.info(
+                f"Backfill progress: {min(i + batch_size, len(pending))}/{len(pending)} index files, "
+                f"{total_added} filings added ({files_done / elapsed:.2f} files/s, {total_added / elapsed:.1f} filings/s)"
+            )
+
         return total_added
+
+    def _checkpoint(self, key: str, added: int) -> None:
+        self.session.merge(ReconcileCheckpoint(index_key=key, filings_added=added, completed_at=datetime.utcnow()))
+        self.session.commit()
@@ -0,0 +1,81 @@
+import time
+import httpx
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+from config import get_settings
+from pipelines.disk_cache import DiskCache
+
+settings = get_settings()
+
+# Response headers worth keeping with a cached body.
+_KEPT_HEADERS = ("content-type", "etag", "last-modified")
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    body_path: Path
+    meta_path: Path
+    headers: Dict[str, str]
+    stored_at: float
+    size: int
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.headers.get("etag"):
+            headers["If-None-Match"] = self.headers["etag"]
+        if self.headers.get("last-modified"):
+            headers["If-Modified-Since"] = self.headers["last-modified"]
+        return headers
+
+    def to_response(self) -> httpx.Response:
+        """Rebuild a 200 response from disk so callers can't tell it was cached."""
+        return httpx.Response(
+            200,
+            headers={**self.headers, "x-cache": "HIT"},
+            content=self.body_path.read_bytes(),
+            request=httpx.Request("GET", self.url),
+        )
+
+
+class HttpCache(DiskCache):
+    """
+    On-disk cache for EDGAR GET responses.
+    Stores the (decoded) body plus ETag/Last-Modified per URL so repeat fetches
+    become conditional GETs; 304s are served from disk. Size-bounded LRU, see
+    DiskCache.
+    """
+    name = "HTTP cache"
+
+    def __init__(self, root: Optional[str] = None, max_bytes: Optional[int] = None):
+        super().__init__(
+            root or settings.SEC_HTTP_CACHE_DIR or Path(settings.DATA_DIR) / "http_cache",
+            max_bytes or settings.SEC_HTTP_CACHE_MAX_BYTES,
+        )
+
+    def lookup(self, url: str) -> Optional[CacheEntry]:
+        body_path, meta_path = self._paths(url)
+        found = self._read_entry(body_path, meta_path)
+        if found is None:
+            return None
+        meta, size = found
+        return CacheEntry(url, body_path, meta_path, meta.get("headers", {}), meta.get("stored_at", 0.0), size)
+
+    def touch(self, entry: CacheEntry, revalidated: bool = False) -> None:
+        """Mark an entry as recently used (and, after a 304, freshly validated)."""
+        now = time.time()
+        if self._touch(entry.body_path, now) and revalidated:
+            entry.stored_at = now
+            self._write_meta(entry.meta_path, {"url": entry.url, "headers": entry.headers, "stored_at": now})
+
+    def store(self, url: str, response: httpx.Response) -> None:
+        if not (response.headers.get("etag") or response.headers.get("last-modified")):
+            # Nothing to revalidate against; caching would only serve stale data.
+            return
+        headers = {k: response.headers[k] for k in _KEPT_HEADERS if k in response.headers}
+        self._store(*self._paths(url), response.content, {"url": url, "headers": headers, "stored_at": time.time()})
@@ -1,10 +1,17 @@
+import asyncio
+import os
+import socket
 import time
+import threading
+import weakref
 import redis
-import requests
+import httpx
 import logging
-from tenacity import retry, stop_after_attempt, wait_exponential
+from contextlib import contextmanager, asynccontextmanager
 from config import get_settings
-from typing import Optional, Dict, Any
+from pipelines.sec.cache import HttpCache
+from pipelines.sec.throttle import AdaptiveThrottle, parse_retry_after
+from typing import Optional, Dict, Any, AsyncIterator, Iterator, List, Sequence, Union
 
 # Global Rate Limiter
 # Simple token bucket or just strict sleep. 
@@ -28,97 +35,399 @@ logger = logging.getLogger(__name__)
 settings = get_settings()
 
 
+# Token bucket (GCRA) evaluated atomically inside Redis.
+# Each call reserves n tokens and returns how long the caller must sleep before
+# using them, so callers never poll: they sleep exactly once and go. Reservations
+# are handed out in arrival order, and each consumer (worker process) carries a
+# virtual finish time that advances by n * interval * active_consumers per grant
+# (start-time fair queuing). A consumer ahead of its fair share is deferred
+# without reserving anything, so batch callers cannot starve single-token ones.
+#
+# The effective rate is min(ARGV rate, control.rate): AdaptiveThrottle lowers it
+# after SEC pushes back and can set control.blocked_until to pause all callers.
+#
+# KEYS: [1] bucket state hash, [2] active consumers zset, [3] per-consumer virtual time hash, [4] metrics hash,
+#       [5] AIMD control hash (see pipelines.sec.throttle)
+# ARGV: [1] max rate (tokens/s), [2] burst, [3] n, [4] consumer id, [5] consumer ttl (ms), [6] max queue (ms)
+# Returns {granted, wait_ms}. granted=0 means nothing was reserved; retry after wait_ms.
+_TOKEN_BUCKET_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local control = redis.call('HMGET', KEYS[5], 'rate', 'blocked_until')
+local rate = math.min(tonumber(ARGV[1]), tonumber(control[1] or ARGV[1]))
+local blocked_until = tonumber(control[2] or 0)
+local burst = tonumber(ARGV[2])
+local n = tonumber(ARGV[3])
+local consumer = ARGV[4]
+local ttl = tonumber(ARGV[5])
+local max_queue = tonumber(ARGV[6])
+local interval = 1000 / rate
+
+if blocked_until > now then
+    redis.call('HINCRBY', KEYS[4], 'blocked', 1)
+    return {0, blocked_until - now}
+end
+
+-- Track active consumers to size fair shares; forget the ones that went quiet.
+redis.call('ZADD', KEYS[2], now, consumer)
+local stale = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now - ttl)
+if #stale > 0 then
+    redis.call('ZREM', KEYS[2], unpack(stale))
+    redis.call('HDEL', KEYS[3], unpack(stale))
+end
+local active = math.max(1, redis.call('ZCARD', KEYS[2]))
+
+local tat = tonumber(redis.call('HGET', KEYS[1], 'tat') or now)
+local unused = 0
+if tat < now then
+    -- Bucket sat full: capacity beyond the burst was never used.
+    unused = math.max(0, (now - tat) / interval - burst)
+    tat = now
+end
+if unused > 0 then redis.call('HINCRBYFLOAT', KEYS[4], 'unused_tokens', unused) end
+
+local new_tat = tat + n * interval
+local wait = math.max(0, new_tat - burst * interval - now)
+-- Only the queue of earlier reservations counts against max_queue. A request
+-- larger than the burst waits (n - burst) * interval even on an idle bucket;
+-- deferring it would never shrink that, so it is granted and runs into debt.
+local ahead = wait - math.max(0, (n - burst) * interval)
+local vt = tonumber(redis.call('HGET', KEYS[3], consumer) or now)
+
+if wait > 0 and (ahead > max_queue or (active > 1 and vt > now)) then
+    local defer = math.max(interval, vt - now)
+    if ahead > max_queue then defer = math.max(defer, ahead - max_queue) end
+    redis.call('HINCRBY', KEYS[4], 'deferred', 1)
+    return {0, math.floor(defer)}
+end
+
+redis.call('HSET', KEYS[1], 'tat', new_tat)
+redis.call('PEXPIRE', KEYS[1], math.ceil(new_tat - now + ttl))
+redis.call('HSET', KEYS[3], consumer, math.max(vt, now) + n * interval * active)
+redis.call('PEXPIRE', KEYS[2], ttl)
+redis.call('PEXPIRE', KEYS[3], ttl)
+redis.call('HINCRBY', KEYS[4], 'acquired', n)
+redis.call('HINCRBY', KEYS[4], 'calls', 1)
+if wait > 0 then redis.call('HINCRBYFLOAT', KEYS[4], 'wait_ms', wait) end
+return {1, math.floor(wait)}
+"""
+
+
 class GlobalRateLimiter:
     """
     Redis-backed Token Bucket for Global Rate Limiting (10 req/sec strict).
-    Uses a rolling window or per-second counter key.
+    Continuous refill (GCRA) in a single Lua call per acquire; supports batch
+    acquisition and per-consumer fair queuing. See _TOKEN_BUCKET_LUA.
     """
-    def __init__(self, key="sec_global_limit", rate=10):
+    def __init__(self, key="sec_global_limit", rate=None, burst: int = 1, max_queue_seconds: float = 2.0, consumer_ttl_seconds: float = 5.0):
         self.redis = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
         self.key = key
-        self.rate = rate
+        self.rate = rate or settings.SEC_MAX_RPS
+        self.burst = burst
+        self.max_queue_ms = int(max_queue_seconds * 1000)
+        self.consumer_ttl_ms = int(consumer_ttl_seconds * 1000)
+        self._script = self.redis.register_script(_TOKEN_BUCKET_LUA)
 
-    def acquire(self):
+    @property
+    def consumer_id(self) -> str:
+        # One consumer per worker process; threads in a process share its share.
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def _keys(self) -> List[str]:
+        return [self.key, f"{self.key}:consumers", f"{self.key}:backlog", f"{self.key}:metrics", f"{self.key}:control"]
+
+    def acquire(self, n: int = 1) -> float:
         """
-        Acquire a token. Blocks until available.
-        Strict approach: 1 request per 0.1s bucket.
+        Acquire n tokens. Blocks until available.
+        Returns the number of seconds spent waiting.
         """
+        waited = 0.0
         while True:
             try:
-                # 1. Get current decisecond bucket (100ms)
-                now = time.time()
-                bucket = int(now * 10) 
-                bucket_key = f"{self.key}:{bucket}"
-                
-                # 2. Increment
-                current_count = self.redis.incr(bucket_key)
-                
-                # 3. Set expiry (1 sec is plenty for 0.1s bucket)
-                if current_count == 1:
-                    self.redis.expire(bucket_key, 1)
-                
-                # 4. Check limit (1 per 100ms = 10 per sec)
-                if current_count <= 1:
-                    return
-                else:
-                    # Sleep until next decisecond
-                    next_bucket_time = (bucket + 1) / 10.0
-                    sleep_time = next_bucket_time - time.time() + 0.01
-                    if sleep_time > 0:
-                        time.sleep(sleep_time)
+                granted, wait_ms = self._script(
+                    keys=self._keys(),
+                    args=[self.rate, self.burst, n, self.consumer_id, self.consumer_ttl_ms, self.max_queue_ms],
+                )
             except redis.RedisError as e:
                 logger.error(f"Redis error in RateLimiter: {e}")
                 time.sleep(0.1)
+                waited += 0.1
+                continue
+
+            sleep_time = int(wait_ms) / 1000.0
+            if sleep_time > 0:
+                time.sleep(sleep_time)
+                waited += sleep_time
+            if int(granted):
+                return waited
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Cluster-wide limiter metrics:
+        acquired/calls - tokens and acquire() calls granted
+        wait_ms        - total time callers slept on reservations
+        deferred       - acquires pushed back by fair queuing
+        blocked        - acquires paused by an AIMD penalty window
+        rate_cuts      - multiplicative decreases after 429/503 (see AdaptiveThrottle)
+        unused_tokens  - capacity that expired unused (throughput left on the table)
+        """
+        raw = self.redis.hgetall(f"{self.key}:metrics")
+        return {k.decode(): float(v) for k, v in raw.items()}
+
+# Shared HTTP connection pools.
+# One keep-alive pool per process so every SecClient() reuses the same TCP+TLS
+# connections to www.sec.gov / data.sec.gov. Celery prefork children get their
+# own pool (sockets must not be shared across fork), hence the pid check.
+_http_lock = threading.Lock()
+_http_client: Optional[httpx.Client] = None
+_http_client_pid: Optional[int] = None
+
+# Async pools are bound to the event loop that created them.
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.SEC_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.SEC_MAX_CONNECTIONS,
+        keepalive_expiry=30.0,
+    )
+
+
+def _new_async_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(limits=_pool_limits(), timeout=settings.SEC_TIMEOUT, follow_redirects=True)
+
+
+def get_http_client() -> httpx.Client:
+    """Returns the process-wide keep-alive HTTP client (created lazily)."""
+    global _http_client, _http_client_pid
+    pid = os.getpid()
+    if _http_client is None or _http_client_pid != pid:
+        with _http_lock:
+            if _http_client is None or _http_client_pid != pid:
+                _http_client = httpx.Client(limits=_pool_limits(), timeout=settings.SEC_TIMEOUT, follow_redirects=True)
+                _http_client_pid = pid
+    return _http_client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Returns the keep-alive AsyncClient for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = _new_async_client()
+        _async_clients[loop] = client
+    return client
+
+
+def _https(url: str) -> str:
+    if url.startswith("http://"):
+        return url.replace("http://", "https://", 1)
+    return url
+
 
 class SecClient:
-    def __init__(self):
+    """
+    SEC EDGAR HTTP client.
+    Sync methods (get, get_filing_html, ...) are a facade over a shared keep-alive pool;
+    the async variants (aget, get_many) run many requests at once. Every request,
+    sync or async, still goes through the global Redis limiter so the 10 req/s
+    budget is respected across all workers, and 429/503 responses feed the shared
+    AIMD throttle (honouring Retry-After) instead of a blind per-call backoff.
+    """
+    max_attempts = 5
+    throttle_statuses = (429, 503)
+
+    def __init__(self, concurrency: Optional[int] = None):
         self.limiter = GlobalRateLimiter()
+        self.throttle = AdaptiveThrottle(key=self.limiter.key, max_rate=self.limiter.rate)
         self.headers = {"User-Agent": settings.SEC_USER_AGENT, "Accept-Encoding": "gzip, deflate"}
+        self.concurrency = concurrency or settings.SEC_MAX_CONCURRENCY
+        self.cache = HttpCache()
         if "example.com" in settings.SEC_USER_AGENT:
              logger.warning("Using default/example User-Agent! Please update SEC_USER_AGENT in .env")
 
-    @retry(
-        stop=stop_after_attempt(5),
-        wait=wait_exponential(multiplier=1, min=2, max=60),
-        reraise=True
-    )
-    def _get(self, url: str) -> requests.Response:
-        self.limiter.acquire()
-        response = requests.get(url, headers=self.headers, timeout=20)
-        response.raise_for_status()
+    def _backoff(self, attempt: int) -> float:
+        return min(60.0, 2.0 ** attempt)
+
+    def _retry_delay(self, response: httpx.Response, attempt: int) -> Optional[float]:
+        """
+        Classify a response. Returns None when it is final (success, or a 4xx that
+        retrying will not fix), otherwise the local delay before the next attempt.
+        """
+        if response.status_code in self.throttle_statuses:
+            # Feed the shared AIMD controller; the limiter then holds every
+            # worker for Retry-After, so no local sleep is needed here...
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if self.throttle.on_throttled(retry_after) is not None:
+                return 0.0
+            # ... unless Redis is down and nothing is holding us: back off here
+            return retry_after if retry_after is not None else self.throttle.default_penalty
+        if response.status_code >= 500:
+            return self._backoff(attempt)
+        if response.is_success:
+            self.throttle.on_success()
+        return None
+
+    def _send(self, url: str, stream: bool = False, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        http = get_http_client()
+        headers = {**self.headers, **(headers or {})}
+        for attempt in range(1, self.max_attempts + 1):
+            self.limiter.acquire()
+            try:
+                response = http.send(http.build_request("GET", url, headers=headers), stream=stream)
+            except httpx.TransportError as e:
+                if attempt == self.max_attempts:
+                    raise
+                logger.warning(f"Transport error for {url}: {e}; retrying (attempt {attempt})")
+                time.sleep(self._backoff(attempt))
+                continue
+
+            delay = self._retry_delay(response, attempt)
+            if delay is None or attempt == self.max_attempts:
+                if response.is_error:
+                    response.close()
+                    response.raise_for_status()
+                return response
+            response.close()
+            logger.warning(f"SEC returned {response.status_code} for {url}; retrying (attempt {attempt})")
+            if delay:
+                time.sleep(delay)
+
+    async def _asend(self, url: str, stream: bool = False, client: Optional[httpx.AsyncClient] = None) -> httpx.Response:
+        http = client or get_async_http_client()
+        for attempt in range(1, self.max_attempts + 1):
+            # acquire() blocks on Redis; keep it off the event loop.
+            await asyncio.to_thread(self.limiter.acquire)
+            try:
+                response = await http.send(http.build_request("GET", url, headers=self.headers), stream=stream)
+            except httpx.TransportError as e:
+                if attempt == self.max_attempts:
+                    raise
+                logger.warning(f"Transport error for {url}: {e}; retrying (attempt {attempt})")
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            delay = await asyncio.to_thread(self._retry_delay, response, attempt)
+            if delay is None or attempt == self.max_attempts:
+                if response.is_error:
+                    await response.aclose()
+                    response.raise_for_status()
+                return response
+            await response.aclose()
+            logger.warning(f"SEC returned {response.status_code} for {url}; retrying (attempt {attempt})")
+            if delay:
+                await asyncio.sleep(delay)
+
+    def _get(self, url: str, cache: bool = False, max_age: Optional[float] = None) -> httpx.Response:
+        """
+        GET with retries/throttling.
+        cache=True revalidates against the on-disk HttpCache (If-None-Match /
+        If-Modified-Since) and serves 304s from disk. With max_age, an entry younger
+        than max_age seconds is served without touching the network at all.
+        """
+        if not cache:
+            return self._send(url)
+
+        # Another process may evict an entry between lookup and read: treat as a miss.
+        entry = self.cache.lookup(url)
+        if entry and max_age is not None and entry.age < max_age:
+            self.cache.touch(entry)
+            try:
+                return entry.to_response()
+            except FileNotFoundError:
+                entry = None
+
+        response = self._send(url, headers=entry.conditional_headers() if entry else None)
+        if response.status_code == 304 and entry:
+            logger.debug(f"Not modified, serving cached copy: {url}")
+            self.cache.touch(entry, revalidated=True)
+            try:
+                return entry.to_response()
+            except FileNotFoundError:
+                response = self._send(url)
+        self.cache.store(url, response)
         return response
 
-    def get(self, url: str) -> requests.Response:
+    def get(self, url: str, cache: bool = False, max_age: Optional[float] = None) -> httpx.Response:
         """Public wrapper for _get."""
-        return self._get(url)
+        return self._get(url, cache=cache, max_age=max_age)
+
+    async def _aget(self, url: str, client: Optional[httpx.AsyncClient] = None) -> httpx.Response:
+        return await self._asend(url, client=client)
+
+    async def aget(self, url: str) -> httpx.Response:
+        """Async GET through the shared pool and global limiter."""
+        return await self._aget(_https(url))
+
+    async def aget_many(
+        self, urls: Sequence[str], return_exceptions: bool = False, client: Optional[httpx.AsyncClient] = None
+    ) -> List[Union[httpx.Response, BaseException]]:
+        """
+        Fetch many URLs concurrently (at most self.concurrency in flight).
+        Results are returned in the same order as urls.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def _one(url: str) -> httpx.Response:
+            async with semaphore:
+                return await self._aget(_https(url), client=client)
+
+        return await asyncio.gather(*(_one(u) for u in urls), return_exceptions=return_exceptions)
+
+    def get_many(self, urls: Sequence[str], return_exceptions: bool = False) -> List[Union[httpx.Response, BaseException]]:
+        """Sync facade for aget_many, for callers that are not running an event loop."""
+        async def _run():
+            async with _new_async_client() as client:
+                return await self.aget_many(urls, return_exceptions=return_exceptions, client=client)
+
+        return asyncio.run(_run())
+
+    @contextmanager
+    def stream(self, url: str) -> Iterator[httpx.Response]:
+        """
+        Stream a response body instead of buffering it.
+        Usage: with client.stream(url) as resp: for chunk in resp.iter_bytes(): ...
+        """
+        response = self._send(_https(url), stream=True)
+        try:
+            yield response
+        finally:
+            response.close()
+
+    @asynccontextmanager
+    async def astream(self, url: str) -> AsyncIterator[httpx.Response]:
+        """Async counterpart of stream()."""
+        response = await self._asend(_https(url), stream=True)
+        try:
+            yield response
+        finally:
+            await response.aclose()
 
     def get_filing_html(self, url: str) -> str:
         """
         Download filing text/html.
         """
-        if url.startswith("http://"):
-            url = url.replace("http://", "https://", 1)
-            
+        url = _https(url)
         logging.info(f"Downloading filing: {url}")
         resp = self._get(url)
         return resp.text
 
     def get_filing_bytes(self, url: str) -> bytes:
         """Download binary content."""
-        if url.startswith("http://"):
-            url = url.replace("http://", "https://", 1)
+        url = _https(url)
         logging.info(f"Downloading binary: {url}")
         resp = self._get(url)
         return resp.content
 
-    def get_rss_feed(self, count: int = 100) -> bytes:
+    def get_rss_feed(self, count: int = 100, start: int = 0) -> bytes:
         """
-        Fetch the SEC RSS feed (Atom).
+        Fetch the SEC RSS feed (Atom), newest first.
+        start pages back through older entries (count is capped at 100 by SEC).
         """
-        url = f"https://www.sec.gov/cgi-bin/browse-edgar?action=getcurrent&type=&company=&dateb=&owner=include&start=0&count={count}&output=atom"
+        url = f"https://www.sec.gov/cgi-bin/browse-edgar?action=getcurrent&type=&company=&dateb=&owner=include&start={start}&count={count}&output=atom"
         logging.info("Polling SEC RSS feed...")
         # RSS might not follow strict 10/s limits the same way as archives? 
         # But safely apply same limiter.
-        resp = self._get(url)
+        resp = self._get(url, cache=True)
         return resp.content
-
@@ -1,9 +1,157 @@
+import os
+import json
 import logging
 import re
+from pathlib import Path
 from bs4 import BeautifulSoup
-from typing import Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from config import get_settings
+
+settings = get_settings()
+
+ARCHIVES_DIR_URL = "https://www.sec.gov/Archives/edgar/data/{cik}/{accession}/"
+
+# Directory entries that are never the main report
+_NOT_PRIMARY = re.compile(
+    r"(-index(-headers)?\.html?$|^R\d+\.htm$|^FilingSummary|^Financial_Report|exhibit[-_]?\d"
+    r"|(^|[-_])ex[-_]?\d|\.(xsd|xml|json|jpg|jpeg|gif|png|pdf|zip|xlsx|css|js)$)",
+    re.IGNORECASE,
+)
+_FULL_SUBMISSION = re.compile(r"^\d{10}-\d{2}-\d{6}\.txt$")
+_KINDS = {
+    ".htm": "html", ".html": "html", ".txt": "text", ".xml": "xml", ".xsd": "xml",
+    ".pdf": "pdf", ".jpg": "image", ".jpeg": "image", ".gif": "image", ".png": "image",
+    ".zip": "archive", ".xlsx": "spreadsheet", ".json": "json",
+}
+
 
 class FilingResolver:
+    """
+    Finds a filing's documents from the archive directory listing (index.json)
+    instead of parsing the -index.htm page. The result is cached as
+    {DATA_DIR}/filings/{cik}/{accession}/manifest.json (files, sizes, kinds,
+    primary document), so resolving a filing again is a local file read.
+
+    The primary document comes from the submissions API's primaryDocument
+    when the caller has it, otherwise from a filename heuristic: the largest
+    HTML/text file that isn't an index page, XBRL viewer page or exhibit.
+    """
+    def __init__(self, client=None, root: Optional[str] = None):
+        if client is None:
+            from pipelines.sec.client import SecClient
+            client = SecClient()
+        self.client = client
+        self.root = Path(root or Path(settings.DATA_DIR) / "filings")
+
+    def manifest_path(self, cik: str, accession: str) -> Path:
+        return self.root / cik / accession / "manifest.json"
+
+    @staticmethod
+    def directory_url(cik: str, accession: str) -> str:
+        return ARCHIVES_DIR_URL.format(cik=int(cik), accession=accession.replace("-", ""))
+
+    def manifest(
+        self,
+        cik: str,
+        accession: str,
+        primary_document: Optional[str] = None,
+        base_url: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Manifest for one filing (cached on disk). None if the directory can't be listed."""
+        return self.manifests([(cik, accession, primary_document, base_url)])[0]
+
+    def manifests(
+        self, filings: Sequence[Tuple[str, str, Optional[str], Optional[str]]]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Batch form of manifest() for (cik, accession, primary_document, base_url)
+        tuples: cached manifests are read from disk, the rest of the directory
+        listings are fetched concurrently.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(filings)
+        missing = []
+        for i, (cik, accession, primary_document, base_url) in enumerate(filings):
+            cached = self._load(cik, accession)
+            if cached and (not primary_document or cached["primary_document"] == primary_document):
+                results[i] = cached
+            else:
+                missing.append(i)
+
+        if missing:
+            urls = [(filings[i][3] or self.directory_url(filings[i][0], filings[i][1])) for i in missing]
+            responses = self.client.get_many([u.rstrip("/") + "/index.json" for u in urls], return_exceptions=True)
+            for i, base_url, resp in zip(missing, urls, responses):
+                cik, accession, primary_document, _ = filings[i]
+                if isinstance(resp, BaseException):
+                    logging.warning(f"Could not list {base_url}: {resp}")
+                    continue
+                manifest = self.build_manifest(resp.json(), cik, accession, base_url, primary_document)
+                self._store(manifest)
+                results[i] = manifest
+        return results
+
+    @staticmethod
+    def build_manifest(
+        index: Dict[str, Any],
+        cik: str,
+        accession: str,
+        base_url: str,
+        primary_document: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        index.json: {"directory": {"name": ..., "item": [{"name", "size", "last-modified", "type"}, ...]}}
+        """
+        base_url = base_url.rstrip("/") + "/"
+        files = []
+        for item in index.get("directory", {}).get("item", []):
+            name = item.get("name", "")
+            size = item.get("size")
+            files.append({
+                "name": name,
+                "size": int(size) if str(size).isdigit() else None,
+                "kind": "directory" if item.get("type") == "folder.gif" else _KINDS.get(os.path.splitext(name)[1].lower(), "other"),
+                "last_modified": item.get("last-modified"),
+                "url": base_url + name,
+            })
+
+        primary = primary_document or FilingResolver.guess_primary(files)
+        return {
+            "cik": cik,
+            "accession": accession,
+            "base_url": base_url,
+            "primary_document": primary,
+            "primary_doc_url": base_url + primary if primary else None,
+            "full_submission_url": f"{base_url}{accession}.txt",
+            "files": files,
+        }
+
+    @staticmethod
+    def guess_primary(files: List[Dict[str, Any]]) -> Optional[str]:
+        candidates = [
+            f for f in files
+            if f["kind"] in ("html", "text") and not _NOT_PRIMARY.search(f["name"])
+            # The full submission (named after the accession) is not a document of its own
+            and not _FULL_SUBMISSION.match(f["name"])
+        ]
+        # Prefer HTML reports; plain-text primaries only exist on old filings
+        html = [f for f in candidates if f["kind"] == "html"]
+        if html or candidates:
+            return max(html or candidates, key=lambda f: f["size"] or 0)["name"]
+        return None
+
+    def _load(self, cik: str, accession: str) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads(self.manifest_path(cik, accession).read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _store(self, manifest: Dict[str, Any]) -> None:
+        path = self.manifest_path(manifest["cik"], manifest["accession"])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".tmp{os.getpid()}")
+        tmp.write_text(json.dumps(manifest))
+        os.replace(tmp, path)
+
     @staticmethod
     def resolve_primary_doc_url(index_html_content: str, base_url: str) -> Optional[Tuple[str, str]]:
         """
@@ -1,12 +1,55 @@
 import feedparser
 import logging
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+import pandas as pd
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime, timezone
 from pipelines.sec.client import SecClient
+from pipelines.sec.resolver import FilingResolver
 from lakehouse.db import Database
 from pathlib import Path
 import os
 
+# ingest_cursors.name for the getcurrent feed
+RSS_CURSOR = "sec_rss_getcurrent"
+
+
+class PollScheduler:
+    """
+    Adapts the RSS poll interval to the observed filing arrival rate.
+    Keeps an EWMA of entries/second and sleeps long enough to expect about
+    target_entries new ones, clamped to [min_interval, max_interval]: seconds
+    between polls at 10-K season peaks, the old 10 minutes overnight.
+    """
+    def __init__(
+        self,
+        min_interval: float,
+        max_interval: float,
+        target_entries: float,
+        alpha: float = 0.3,
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_entries = target_entries
+        self.alpha = alpha
+        self.rate: Optional[float] = None # entries / second
+        self._last_poll: Optional[float] = None
+
+    def observe(self, new_entries: int, now: float) -> None:
+        if self._last_poll is not None:
+            elapsed = max(now - self._last_poll, 1e-3)
+            observed = new_entries / elapsed
+            self.rate = observed if self.rate is None else self.alpha * observed + (1 - self.alpha) * self.rate
+        self._last_poll = now
+
+    def next_interval(self) -> float:
+        if self.rate is None:
+            # No rate yet: poll again soon to get a first measurement
+            return self.min_interval
+        if self.rate <= 0:
+            return self.max_interval
+        return min(self.max_interval, max(self.min_interval, self.target_entries / self.rate))
+
+
 class RssWatcher:
     def __init__(self) -> None:
         self.client = SecClient()
@@ -14,6 +57,7 @@ class RssWatcher:
         self.settings = self.db.settings
         self.filings_dir = Path(self.settings.DATA_DIR) / "filings"
         self.filings_dir.mkdir(parents=True, exist_ok=True)
+        self.resolver = FilingResolver(self.client, root=str(self.filings_dir))
 
     def _parse_accession(self, id_str: str) -> str:
         # id is like "urn:tag:sec.gov,2008:accession-number=0001062993-24-000001"
@@ -32,49 +76,149 @@ class RssWatcher:
             return match.group(1)
         return "UNKNOWN"
 
-    def _is_processed(self, accession: str) -> bool:
+    def _existing_accessions(self, conn, accessions: List[str]) -> set:
+        """One set query for the whole feed instead of one lookup per entry."""
+        if not accessions:
+            return set()
+        rows = conn.execute(
+            "SELECT accession_number FROM filings WHERE accession_number IN (SELECT UNNEST(?))",
+            [accessions]
+        ).fetchall()
+        return {r[0] for r in rows}
+
+    def _save_metas(self, conn, metas: List[Dict[str, Any]]) -> None:
+        """Bulk insert of all new filings from a cycle in one statement."""
+        if not metas:
+            return
+        df = pd.DataFrame([{
+            "accession_number": m["accession"],
+            "cik": m["cik"],
+            "company_name": m["company_name"],
+            "form_type": m["form"],
+            "filing_date": m["filing_date"],
+            "primary_doc_url": m["url"],
+            "filing_html_path": str(m["path"]),
+            "report_period": m.get("report_period") # Optional
+        } for m in metas])
+        try:
+            conn.register("df_new_filings", df)
+            conn.execute("""
+                INSERT INTO filings (accession_number, cik, company_name, form_type, filing_date, primary_doc_url, filing_html_path, report_period)
+                SELECT accession_number, cik, company_name, form_type, filing_date, primary_doc_url, filing_html_path, CAST(report_period AS DATE)
+                FROM df_new_filings
+                ON CONFLICT DO NOTHING
+            """)
+            logging.info(f"Saved metadata for {len(metas)} filings")
+        except Exception as e:
+            # Re-raised so run_cycle leaves the cursor where it was and the batch is retried
+            logging.error(f"DB Error saving {len(metas)} filings: {e}")
+            raise
+        finally:
+            conn.unregister("df_new_filings")
+
+    def _entry_updated(self, entry) -> Optional[datetime]:
+        # "2024-01-01T10:00:00-05:00" -> naive UTC, comparable with the stored cursor
+        try:
+            return datetime.strptime(entry.updated, "%Y-%m-%dT%H:%M:%S%z").astimezone(timezone.utc).replace(tzinfo=None)
+        except (AttributeError, TypeError, ValueError):
+            return None
+
+    def _load_cursor(self, conn) -> Optional[Tuple[str, Optional[datetime]]]:
+        row = conn.execute(
+            "SELECT last_accession, last_updated FROM ingest_cursors WHERE name = ?", [RSS_CURSOR]
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def _save_cursor(self, conn, accession: str, updated: Optional[datetime]) -> None:
+        conn.execute("""
+            INSERT INTO ingest_cursors (name, last_accession, last_updated, updated_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT (name) DO UPDATE SET
+                last_accession = excluded.last_accession,
+                last_updated = excluded.last_updated,
+                updated_at = excluded.updated_at
+        """, [RSS_CURSOR, accession, updated])
+
+    def _fetch_since(self, cursor: Optional[Tuple[str, Optional[datetime]]]) -> list:
+        """
+        Pages back through the feed (newest first) until the cursor is reached.
+        Without a cursor (first run) only the first page is read; older filings
+        are the daily reconcile's job.
+        """
+        page_size = self.settings.RSS_PAGE_SIZE
+        entries = []
+        for page in range(self.settings.RSS_MAX_PAGES):
+            feed = feedparser.parse(self.client.get_rss_feed(count=page_size, start=page * page_size))
+            if cursor is None:
+                return list(feed.entries)
+
+            last_accession, last_updated = cursor
+            for entry in feed.entries:
+                if self._parse_accession(entry.id) == last_accession:
+                    return entries
+                updated = self._entry_updated(entry)
+                if last_updated and updated and updated < last_updated:
+                    return entries
+                entries.append(entry)
+
+            if len(feed.entries) < page_size:
+                return entries # end of the feed
+
+        logging.warning(
+            f"RSS cursor not reached after {self.settings.RSS_MAX_PAGES} pages; "
+            "older filings will be picked up by reconcile."
+        )
+        return entries
+
+    def run_cycle(self) -> int:
+        """
+        Processes everything published since the last cycle.
+        Returns the number of feed entries newer than the cursor (all forms),
+        which the poll loop uses as the arrival count.
+        """
         conn = self.db.get_connection()
         try:
-            res = conn.execute("SELECT 1 FROM filings WHERE accession_number = ?", [accession]).fetchone()
-            return res is not None
+            cursor = self._load_cursor(conn)
         finally:
             conn.close()
 
-    def _save_meta(self, meta: Dict[str, Any]) -> None:
+        entries = self._fetch_since(cursor)
+        logging.info(f"Found {len(entries)} new entries in RSS feed.")
+        if not entries:
+            return 0
+
+        # Two DB round-trips per cycle regardless of feed size; the connection is not
+        # held while index pages download (DuckDB allows a single writer process).
+        accessions = [self._parse_accession(e.id) for e in entries]
         conn = self.db.get_connection()
         try:
-            conn.execute("""
-                INSERT INTO filings (accession_number, cik, company_name, form_type, filing_date, primary_doc_url, filing_html_path, report_period)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, [
-                meta["accession"],
-                meta["cik"],
-                meta["company_name"],
-                meta["form"],
-                meta["filing_date"],
-                meta["url"],
-                str(meta["path"]),
-                meta.get("report_period") # Optional
-            ])
-            logging.info(f"Saved metadata for {meta['accession']}")
-        except Exception as e:
-            logging.error(f"DB Error saving {meta['accession']}: {e}")
+            existing = self._existing_accessions(conn, accessions)
         finally:
             conn.close()
 
-    def run_cycle(self) -> None:
-        content = self.client.get_rss_feed(count=100)
-        feed = feedparser.parse(content)
-        
-        logging.info(f"Found {len(feed.entries)} entries in RSS feed.")
-        
-        for entry in feed.entries:
+        metas = self._collect_new(entries, existing)
+
+        # The cursor only moves once the batch is saved, so a crash mid-cycle
+        # replays it next time (the accession check makes that harmless).
+        conn = self.db.get_connection()
+        try:
+            self._save_metas(conn, metas)
+            self._save_cursor(conn, accessions[0], self._entry_updated(entries[0]))
+        finally:
+            conn.close()
+        return len(entries)
+
+    def _collect_new(self, entries, existing: set) -> List[Dict[str, Any]]:
+        metas = []
+        seen = set(existing)
+        for entry in entries:
             # Example entry keys: title, link, updated, id, summary
             # title: "8-K - APPLE INC (0000320193) (Filer)"
             accession = self._parse_accession(entry.id)
             
-            if self._is_processed(accession):
+            if accession in seen:
                 continue
+            seen.add(accession)
                 
             form_type = entry.get("category", "")
             # Basic filters: only 10-K, 10-Q, 8-K for now
@@ -88,50 +232,29 @@ class RssWatcher:
             cik = self._extract_cik(entry.title)
             company_name = entry.title.split("(")[0].replace(f"{form_type} - ", "").strip()
             
-            # Link in feed is to the summary page usually, e.g. http://www.sec.gov/Archives/edgar/data/320193/000032019324000001/0000320193-24-000001-index.htm
-            # We want the text/html document.
-            # Usually strict mapping: data/{cik}/{accession_no_dashes}/{primary_doc}
-            # BUT determining primary doc name from RSS is hard without scraping index page.
-            # SHORTCUT: The RSS "link" usually goes to the index page. We might need to grab the HTML from there.
-            # HOWEVER, for simplicity in MVP, we can try to construct a "txt" url which is the full submission, or parse the index.
-            
-            # Let's simple scrape the index page to find the primary document link?
-            # Or use the .txt full submission (contains UGLY uuencoded files).
-            # BETTER: The "link" href in Atom often points to the summary.
-            
-            # Let's assume we fetch the link provided (Index page) and find the first row "Document".
-            # For Sprint 1, let's just save the link provided in the RSS as "primary" and download THAT check if it is HTML.
-            # Actually, the RSS link is usually the index page.
+            # Link in feed is to the summary page, e.g. http://www.sec.gov/Archives/edgar/data/320193/000032019324000001/0000320193-24-000001-index.htm
+            # The primary document is found from the directory's index.json (below), not by scraping that page.
             index_url = entry.link
             
-            # Download Logic
-            # 1. Create directory
-            filing_path = self.filings_dir / cik / accession
-            filing_path.mkdir(parents=True, exist_ok=True)
-            
-            # 2. Fetch Index Page to find real HTML document? 
-            # This adds 1 extra request per filing. total 2 req/filing.
-            # Let's skip deep parsing for now and just save the index page or try to find the .htm link if obvious.
-            # If we want the text content for RAG, the full .txt submission is easiest to parse programmatically but huge.
-            # Let's stick to downloading the content at `link` for now, recognizing it might be an index page.
-            # TODO: Improve to fetch actual report HTML in refinement.
-            
-            local_file = filing_path / "index.html"
-            html_content = self.client.get_filing_html(index_url)
-            
-            with open(local_file, "w") as f:
-                f.write(html_content)
-                
-            # Save Metadata
-            filing_meta = {
+            metas.append({
                 "accession": accession,
                 "cik": cik,
                 "company_name": company_name,
                 "form": form_type,
                 "filing_date": datetime.strptime(entry.updated, "%Y-%m-%dT%H:%M:%S%z").date(),
                 "url": index_url,
-                "path": local_file,
+                "path": self.resolver.manifest_path(cik, accession),
                 "report_period": None # Need to parse from body
-            }
-            
-            self._save_meta(filing_meta)
+            })
+
+        # One concurrent batch of directory listings for the whole cycle; each is
+        # cached as the filing's manifest.json for later stages.
+        manifests = self.resolver.manifests([
+            (m["cik"], m["accession"], None, m["url"].rsplit("/", 1)[0] + "/") for m in metas
+        ])
+        for meta, manifest in zip(metas, manifests):
+            if manifest and manifest["primary_doc_url"]:
+                meta["url"] = manifest["primary_doc_url"]
+            else:
+                logging.warning(f"No primary document resolved for {meta['accession']}; keeping index page URL")
+        return metas
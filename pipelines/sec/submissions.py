@@ -0,0 +1,147 @@
+import logging
+import pandas as pd
+from typing import Any, Dict, List, Optional
+from pipelines.sec.client import SecClient
+from lakehouse.db import Database
+
+SUBMISSIONS_URL = "https://data.sec.gov/submissions/CIK{cik}.json"
+# Older history overflows into extra files listed under filings.files
+OVERFLOW_URL = "https://data.sec.gov/submissions/{name}"
+ARCHIVES_URL = "https://www.sec.gov/Archives/edgar/data/{cik}/{accession}/{document}"
+
+
+class SubmissionsFetcher:
+    """
+    Complete per-company filing history from the submissions API.
+
+    submissions/CIK##########.json carries the ~1000 most recent filings
+    ("recent", already column-oriented) plus the names of overflow files with
+    older ones. Overflow files never change once written, so each is recorded
+    in submission_pages and skipped on later runs. Everything fetched for a
+    company is upserted into filings with one statement, including the
+    acceptance timestamp and the primary document URL (so nothing has to be
+    scraped from -index.htm pages to find it).
+    """
+    def __init__(self) -> None:
+        self.client = SecClient()
+        self.db = Database()
+
+    def fetch_history(self, cik: str) -> int:
+        """Returns the number of filings written for cik."""
+        cik = str(cik).zfill(10)
+        logging.info(f"Fetching submissions for CIK {cik}...")
+        # Conditional GET: an unchanged company costs a 304
+        data = self.client._get(SUBMISSIONS_URL.format(cik=cik), cache=True).json()
+
+        tickers = data.get("tickers") or []
+        ticker = tickers[0] if tickers else None
+        company_name = data.get("name")
+        filings = data.get("filings", {})
+
+        frames = [self.parse_filings(filings.get("recent", {}), cik, ticker, company_name)]
+
+        conn = self.db.get_connection()
+        try:
+            seen = {
+                (name, count) for name, count in conn.execute(
+                    "SELECT name, filing_count FROM submission_pages WHERE cik = ?", [cik]
+                ).fetchall()
+            }
+        finally:
+            conn.close()
+
+        pages = [p for p in filings.get("files", []) if (p["name"], p.get("filingCount")) not in seen]
+        fetched_pages = []
+        if pages:
+            logging.info(f"Fetching {len(pages)} overflow submission files for CIK {cik}")
+            responses = self.client.get_many([OVERFLOW_URL.format(name=p["name"]) for p in pages], return_exceptions=True)
+            for page, resp in zip(pages, responses):
+                if isinstance(resp, BaseException):
+                    # Not recorded as seen, so the next run retries it
+                    logging.error(f"Failed to fetch {page['name']}: {resp}")
+                    continue
+                frames.append(self.parse_filings(resp.json(), cik, ticker, company_name))
+                fetched_pages.append(page)
+
+        df = pd.concat(frames, ignore_index=True).drop_duplicates(subset=["accession_number"], keep="first")
+        self._save(df, cik, fetched_pages)
+        return len(df)
+
+    @staticmethod
+    def parse_filings(columns: Dict[str, List[Any]], cik: str, ticker: Optional[str], company_name: Optional[str]) -> pd.DataFrame:
+        """
+        The API's column arrays (accessionNumber, filingDate, form, ...) -> filings rows.
+        Empty strings mean "not applicable" and become NULL.
+        """
+        accessions = columns.get("accessionNumber", [])
+        n = len(accessions)
+        if not n:
+            return pd.DataFrame(columns=[
+                "accession_number", "cik", "ticker", "company_name", "form_type", "filing_date",
+                "report_period", "acceptance_datetime", "primary_doc_url",
+            ])
+
+        def _col(name: str) -> pd.Series:
+            return pd.Series(columns.get(name) or [None] * n, dtype=object).replace("", None)
+
+        documents = _col("primaryDocument")
+        plain_cik = str(int(cik))
+        primary_doc_url = [
+            ARCHIVES_URL.format(cik=plain_cik, accession=acc.replace("-", ""), document=doc) if doc else None
+            for acc, doc in zip(accessions, documents)
+        ]
+        # "2024-11-01T06:01:36.000Z" -> naive UTC timestamp
+        accepted = pd.to_datetime(_col("acceptanceDateTime"), utc=True, errors="coerce").dt.tz_localize(None)
+
+        return pd.DataFrame({
+            "accession_number": accessions,
+            "cik": cik,
+            "ticker": ticker,
+            "company_name": company_name,
+            "form_type": _col("form"),
+            "filing_date": _col("filingDate"),
+            "report_period": _col("reportDate"),
+            "acceptance_datetime": accepted,
+            "primary_doc_url": primary_doc_url,
+        })
+
+    def _save(self, df: pd.DataFrame, cik: str, pages: List[Dict[str, Any]]) -> None:
+        conn = self.db.get_connection()
+        try:
+            conn.execute("BEGIN TRANSACTION")
+            conn.register("df_submissions", df)
+            # Rows first seen via RSS/reconcile keep their local paths; the
+            # submissions API is authoritative for everything else.
+            conn.execute("""
+                INSERT INTO filings (accession_number, cik, ticker, company_name, form_type, filing_date, report_period, acceptance_datetime, primary_doc_url)
+                SELECT accession_number, cik, ticker, company_name, form_type,
+                       CAST(filing_date AS DATE), CAST(report_period AS DATE), acceptance_datetime, primary_doc_url
+                FROM df_submissions
+                ON CONFLICT (accession_number) DO UPDATE SET
+                    ticker = COALESCE(excluded.ticker, ticker),
+                    company_name = COALESCE(excluded.company_name, company_name),
+                    form_type = excluded.form_type,
+                    filing_date = excluded.filing_date,
+                    report_period = COALESCE(excluded.report_period, report_period),
+                    acceptance_datetime = excluded.acceptance_datetime,
+                    primary_doc_url = COALESCE(excluded.primary_doc_url, primary_doc_url)
+            """)
+            for page in pages:
+                conn.execute("""
+                    INSERT INTO submission_pages (cik, name, filing_count, filing_from, filing_to)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (cik, name) DO UPDATE SET
+                        filing_count = excluded.filing_count,
+                        filing_from = excluded.filing_from,
+                        filing_to = excluded.filing_to,
+                        fetched_at = now()
+                """, [cik, page["name"], page.get("filingCount"), page.get("filingFrom"), page.get("filingTo")])
+            conn.execute("COMMIT")
+            logging.info(f"Upserted {len(df)} filings for CIK {cik} ({len(pages)} new overflow files).")
+        except Exception as e:
+            conn.execute("ROLLBACK")
+            logging.error(f"DB Error saving submissions for {cik}: {e}")
+            raise
+        finally:
+            conn.unregister("df_submissions")
+            conn.close()
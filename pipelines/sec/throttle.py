@@ -0,0 +1,131 @@
+import time
+import logging
+import redis
+from email.utils import parsedate_to_datetime
+from typing import Optional
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# AIMD control state lives next to the token bucket ({key}:control) so
+# GlobalRateLimiter picks up the current rate and any penalty window on its
+# next acquire. All updates are single Lua calls, so concurrent workers
+# reporting the same burst of 429s only cut the rate once per cooldown.
+#
+# KEYS: [1] control hash, [2] metrics hash
+# ARGV: [1] max rate, [2] min rate, [3] decrease factor, [4] cooldown (ms), [5] penalty (ms)
+_DECREASE_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local rate = tonumber(redis.call('HGET', KEYS[1], 'rate') or ARGV[1])
+local last_cut = tonumber(redis.call('HGET', KEYS[1], 'last_decrease') or 0)
+if now - last_cut >= tonumber(ARGV[4]) then
+    rate = math.max(tonumber(ARGV[2]), rate * tonumber(ARGV[3]))
+    redis.call('HSET', KEYS[1], 'rate', rate, 'last_decrease', now)
+    redis.call('HINCRBY', KEYS[2], 'rate_cuts', 1)
+end
+local blocked_until = now + tonumber(ARGV[5])
+if blocked_until > tonumber(redis.call('HGET', KEYS[1], 'blocked_until') or 0) then
+    redis.call('HSET', KEYS[1], 'blocked_until', blocked_until)
+end
+redis.call('HSET', KEYS[1], 'last_change', now)
+redis.call('HINCRBY', KEYS[2], 'throttled_responses', 1)
+return tostring(rate)
+"""
+
+# KEYS: [1] control hash
+# ARGV: [1] max rate, [2] step, [3] interval (ms)
+_INCREASE_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local max_rate = tonumber(ARGV[1])
+local rate = tonumber(redis.call('HGET', KEYS[1], 'rate') or max_rate)
+local last_change = tonumber(redis.call('HGET', KEYS[1], 'last_change') or 0)
+local blocked_until = tonumber(redis.call('HGET', KEYS[1], 'blocked_until') or 0)
+if rate < max_rate and now >= blocked_until and now - last_change >= tonumber(ARGV[3]) then
+    rate = math.min(max_rate, rate + tonumber(ARGV[2]))
+    redis.call('HSET', KEYS[1], 'rate', rate, 'last_change', now)
+end
+return tostring(rate)
+"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parses a Retry-After header (delta-seconds or HTTP-date) into seconds."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveThrottle:
+    """
+    Additive-increase / multiplicative-decrease controller for the global SEC rate.
+    - on_throttled(): SEC answered 429/503 -> halve the rate and pause everyone
+      for Retry-After (or default_penalty) seconds.
+    - on_success(): probe back up by increase_step req/s every increase_interval seconds.
+    The rate is shared by every worker through Redis and read by GlobalRateLimiter.
+    """
+    def __init__(
+        self,
+        key: str = "sec_global_limit",
+        max_rate: Optional[float] = None,
+        min_rate: Optional[float] = None,
+        increase_step: float = 0.5,
+        increase_interval: float = 5.0,
+        decrease_factor: float = 0.5,
+        decrease_cooldown: float = 2.0,
+        default_penalty: float = 10.0,
+    ):
+        self.redis = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
+        self.control_key = f"{key}:control"
+        self.metrics_key = f"{key}:metrics"
+        self.max_rate = max_rate or settings.SEC_MAX_RPS
+        self.min_rate = min_rate or settings.SEC_MIN_RPS
+        self.increase_step = increase_step
+        self.increase_interval = increase_interval
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+        self.default_penalty = default_penalty
+        self._decrease = self.redis.register_script(_DECREASE_LUA)
+        self._increase = self.redis.register_script(_INCREASE_LUA)
+        self._next_increase_check = 0.0
+
+    def on_throttled(self, retry_after: Optional[float] = None) -> Optional[float]:
+        """Record a 429/503. Returns the new shared rate (None if Redis is unavailable)."""
+        penalty = retry_after if retry_after is not None else self.default_penalty
+        try:
+            rate = float(self._decrease(
+                keys=[self.control_key, self.metrics_key],
+                args=[self.max_rate, self.min_rate, self.decrease_factor,
+                      int(self.decrease_cooldown * 1000), int(penalty * 1000)],
+            ))
+        except redis.RedisError as e:
+            logger.error(f"Redis error in AdaptiveThrottle: {e}")
+            return None
+        logger.warning(f"SEC throttled us; rate now {rate:.2f} req/s, pausing {penalty:.1f}s")
+        return rate
+
+    def on_success(self) -> None:
+        """Record a successful response. Only talks to Redis once per increase_interval."""
+        now = time.monotonic()
+        if now < self._next_increase_check:
+            return
+        self._next_increase_check = now + self.increase_interval
+        try:
+            self._increase(
+                keys=[self.control_key],
+                args=[self.max_rate, self.increase_step, int(self.increase_interval * 1000)],
+            )
+        except redis.RedisError as e:
+            logger.error(f"Redis error in AdaptiveThrottle: {e}")
+
+    def current_rate(self) -> float:
+        rate = self.redis.hget(self.control_key, "rate")
+        return float(rate) if rate is not None else float(self.max_rate)
@@ -1,54 +1,646 @@
 
+import os
+import json
+import time
+import uuid
 import boto3
+import hashlib
 import logging
+import threading
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from botocore.exceptions import ClientError
 from config import get_settings
+from pipelines.storage_cache import ObjectCache
 from io import BytesIO
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import zstandard as zstd
+except ImportError: # optional: pip install .[compression]
+    zstd = None
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# S3 rejects multipart parts smaller than 5 MiB (except the last one).
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+# Content-addressed layout (STORAGE_CAS):
+#   cas/sha256/{sha[:2]}/{sha}   the body, stored once however many keys point at it
+#   cas/tmp/{uuid}               streamed uploads whose hash isn't known yet
+#   {logical key}                small JSON pointer; metadata cas-sha256 names the blob
+CAS_PREFIX = "cas/sha256/"
+CAS_TMP_PREFIX = "cas/tmp/"
+CAS_META = "cas-sha256"
+# Pointers are tiny; anything larger is a regular object and needn't be inspected by GC.
+_MAX_POINTER_SIZE = 1024
+
+
+# Compression: the codec is recorded in object metadata, so compressed and
+# plain objects coexist and readers never guess.
+CODEC_META = "codec"
+ZSTD_DICT_META = "zstd-dict"
+# Trained dictionaries live in the bucket so every worker can decode with them
+ZSTD_DICT_PREFIX = "codecs/zstd/"
+_zstd_dicts: Dict[int, Any] = {} # dict_id -> ZstdCompressionDict, loaded once per process
+_warned_no_zstd = False
+
+
+# Shared S3 client.
+# boto3 clients are thread-safe and hold a urllib3 connection pool, so one per
+# process is reused by every MinIOClient() (tasks construct them per call).
+# Celery prefork children build their own (sockets must not cross a fork),
+# hence the pid check; bucket checks are remembered for the same lifetime.
+_s3_lock = threading.Lock()
+_s3_client = None
+_s3_client_pid: Optional[int] = None
+_checked_buckets: set = set()
+
+
+def get_s3_client():
+    """Returns the process-wide S3 client for MinIO (created lazily)."""
+    global _s3_client, _s3_client_pid
+    pid = os.getpid()
+    if _s3_client is None or _s3_client_pid != pid:
+        with _s3_lock:
+            if _s3_client is None or _s3_client_pid != pid:
+                _s3_client = boto3.client(
+                    "s3",
+                    endpoint_url=f"http://{settings.MINIO_ENDPOINT}",
+                    aws_access_key_id=settings.MINIO_ACCESS_KEY,
+                    aws_secret_access_key=settings.MINIO_SECRET_KEY,
+                    config=Config(
+                        max_pool_connections=settings.MINIO_MAX_CONNECTIONS,
+                        retries={"max_attempts": 5, "mode": "standard"},
+                        tcp_keepalive=True,
+                    ),
+                )
+                _s3_client_pid = pid
+                _checked_buckets.clear()
+    return _s3_client
+
+
+def _transfer_config() -> TransferConfig:
+    # Managed transfers (upload_fileobj, copy, download_file) split large objects
+    # into parts moved concurrently over the shared pool.
+    return TransferConfig(
+        multipart_threshold=settings.MINIO_PART_SIZE,
+        multipart_chunksize=settings.MINIO_PART_SIZE,
+        max_concurrency=settings.MINIO_TRANSFER_CONCURRENCY,
+        use_threads=True,
+    )
+
+
+def blob_key(sha256: str) -> str:
+    return f"{CAS_PREFIX}{sha256[:2]}/{sha256}"
+
+
+def resolve_compression(requested: Optional[str] = None) -> str:
+    """
+    The codec new objects are written with: "zstd" or "none". Unconfigured,
+    zstd only where the optional zstandard package is installed.
+    """
+    global _warned_no_zstd
+    codec = (requested or settings.STORAGE_COMPRESSION or ("zstd" if zstd else "none")).lower()
+    if codec not in ("zstd", "none"):
+        raise ValueError(f"Unknown STORAGE_COMPRESSION: {codec}")
+    if codec == "zstd" and zstd is None:
+        if not _warned_no_zstd:
+            logger.warning("STORAGE_COMPRESSION=zstd but zstandard is not installed; storing objects uncompressed")
+            _warned_no_zstd = True
+        return "none"
+    return codec
+
+
 class MinIOClient:
-    def __init__(self):
-        self.s3 = boto3.client(
-            "s3",
-            endpoint_url=f"http://{settings.MINIO_ENDPOINT}",
-            aws_access_key_id=settings.MINIO_ACCESS_KEY,
-            aws_secret_access_key=settings.MINIO_SECRET_KEY
-        )
+    """
+    Raw object storage. With cas=True (default: settings.STORAGE_CAS) bodies
+    are deduplicated by SHA-256: identical bytes are uploaded once and every
+    logical key is a pointer to the blob. Reads resolve pointers
+    transparently whatever the mode, so CAS and plain objects can coexist.
+    Bodies are zstd-compressed when compression="zstd" (default:
+    settings.STORAGE_COMPRESSION); reads decompress whatever the setting.
+    Construction is free: the S3 client is shared per process and the bucket
+    is checked on first use. get_object reads through a host-local disk cache
+    (cache=True, default: settings.STORAGE_CACHE_ENABLED).
+    """
+    def __init__(self, cas: Optional[bool] = None, compression: Optional[str] = None, cache: Optional[bool] = None):
         self.bucket = settings.MINIO_BUCKET_RAW
-        self._ensure_bucket()
+        self.cas = settings.STORAGE_CAS if cas is None else cas
+        self.compression = resolve_compression(compression)
+        self.zstd_dict_id = settings.STORAGE_ZSTD_DICT_ID
+        use_cache = settings.STORAGE_CACHE_ENABLED if cache is None else cache
+        self.cache = ObjectCache() if use_cache else None
 
-    def _ensure_bucket(self):
-        try:
-            self.s3.head_bucket(Bucket=self.bucket)
-        except ClientError:
+    @property
+    def s3(self):
+        client = get_s3_client()
+        if self.bucket not in _checked_buckets:
+            self._ensure_bucket(client)
+        return client
+
+    def _ensure_bucket(self, client):
+        with _s3_lock:
+            if self.bucket in _checked_buckets:
+                return
             try:
-                self.s3.create_bucket(Bucket=self.bucket)
-                logger.info(f"Created bucket: {self.bucket}")
-            except Exception as e:
-                logger.error(f"Failed to create bucket: {e}")
-                raise
+                client.head_bucket(Bucket=self.bucket)
+            except ClientError:
+                try:
+                    client.create_bucket(Bucket=self.bucket)
+                    logger.info(f"Created bucket: {self.bucket}")
+                except Exception as e:
+                    logger.error(f"Failed to create bucket: {e}")
+                    raise
+            _checked_buckets.add(self.bucket)
 
-    def put_object(self, key: str, data: bytes) -> str:
-        """Uploads data to MinIO and returns the key."""
+    def put_object(self, key: str, data: bytes, dictionary: bool = True) -> str:
+        """
+        Uploads data to MinIO and returns the key.
+        dictionary=False keeps small bodies in plain zstd frames (no trained
+        dictionary needed to decode them).
+        """
+        self._invalidate(key)
         try:
-            self.s3.upload_fileobj(BytesIO(data), self.bucket, key)
+            if self.cas:
+                self._put_cas_bytes(key, data, dictionary)
+            else:
+                payload, metadata = self._encode(data, dictionary)
+                extra = {"Metadata": metadata} if metadata else None
+                self.s3.upload_fileobj(BytesIO(payload), self.bucket, key, ExtraArgs=extra, Config=_transfer_config())
             return key
         except Exception as e:
             logger.error(f"Upload failed for {key}: {e}")
             raise
 
+    def put_stream(self, key: str, chunks: Iterable[bytes], part_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Uploads an iterable of byte chunks (e.g. an HTTP response body) without
+        holding the whole object in memory. Returns {"key", "size", "sha256"}.
+        In CAS mode a body that fits in one part is hashed before upload (and
+        skipped if the blob exists); larger ones are streamed to cas/tmp/ and
+        then copied server-side to their blob, or dropped if it already exists.
+        """
+        self._invalidate(key)
+        if not self.cas:
+            return self._put_stream(key, chunks, part_size)
+
+        part_size = max(part_size or settings.MINIO_PART_SIZE, MIN_PART_SIZE)
+        chunks = iter(chunks)
+        head = bytearray()
+        for chunk in chunks:
+            head += chunk
+            if len(head) >= part_size:
+                break
+        else:
+            return self._put_cas_bytes(key, bytes(head))
+
+        def _rest():
+            yield bytes(head)
+            yield from chunks
+
+        tmp_key = f"{CAS_TMP_PREFIX}{uuid.uuid4().hex}"
+        result = self._put_stream(tmp_key, _rest(), part_size)
+        blob = blob_key(result["sha256"])
+        metadata = self._codec_metadata()
+        try:
+            if not self._reuse_blob(blob):
+                # Managed copy: server-side, multipart for large blobs
+                self.s3.copy(
+                    {"Bucket": self.bucket, "Key": tmp_key}, self.bucket, blob,
+                    ExtraArgs={"Metadata": metadata} if metadata else None,
+                    Config=_transfer_config(),
+                )
+            else:
+                logger.info(f"Blob {result['sha256'][:12]} already stored; dropping duplicate upload of {key}")
+        finally:
+            self.s3.delete_object(Bucket=self.bucket, Key=tmp_key)
+        self._put_pointer(key, result["sha256"], result["size"])
+        return {"key": key, "size": result["size"], "sha256": result["sha256"]}
+
+    def _put_cas_bytes(self, key: str, data: bytes, dictionary: bool = True) -> Dict[str, Any]:
+        # The address is the hash of the original bytes, whatever the codec
+        sha = hashlib.sha256(data).hexdigest()
+        blob = blob_key(sha)
+        if not self._reuse_blob(blob):
+            payload, metadata = self._encode(data, dictionary)
+            self.s3.put_object(Bucket=self.bucket, Key=blob, Body=payload, Metadata=metadata)
+        else:
+            logger.debug(f"Blob {sha[:12]} already stored; skipping upload of {key}")
+        self._put_pointer(key, sha, len(data))
+        return {"key": key, "size": len(data), "sha256": sha}
+
+    def _reuse_blob(self, blob: str) -> bool:
+        """
+        True if blob is stored and a new pointer may reference it. A blob old
+        enough for gc() to consider gets its LastModified refreshed first (an
+        in-place copy), so a sweep that listed it before our pointer exists
+        sees it as young when it re-checks, and keeps it.
+        """
+        head = self._head(blob)
+        if head is None:
+            return False
+        modified = head.get("LastModified")
+        if modified is None or time.time() - modified.timestamp() > settings.STORAGE_CAS_GC_GRACE_SECONDS / 2:
+            try:
+                self.s3.copy_object(
+                    Bucket=self.bucket, Key=blob, CopySource={"Bucket": self.bucket, "Key": blob},
+                    Metadata=head.get("Metadata", {}), MetadataDirective="REPLACE",
+                )
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                    return False # collected in the meantime: upload it again
+                raise
+        return True
+
+    def _put_pointer(self, key: str, sha: str, size: int) -> None:
+        # Re-runs that store the same bytes under the same key are a single HEAD
+        current = self._head(key)
+        if current is not None and current.get("Metadata", {}).get(CAS_META) == sha:
+            return
+        body = json.dumps({"sha256": sha, "size": size, "blob": blob_key(sha)}).encode("utf-8")
+        self.s3.put_object(
+            Bucket=self.bucket, Key=key, Body=body,
+            ContentType="application/json", Metadata={CAS_META: sha},
+        )
+
+    def _head(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            return self.s3.head_object(Bucket=self.bucket, Key=key)
+        except ClientError:
+            return None
+
+    def _invalidate(self, key: str) -> None:
+        # Other hosts notice the new ETag once their entry stops being fresh
+        if self.cache is not None:
+            self.cache.invalidate(self.bucket, key)
+
+    def _codec_metadata(self) -> Dict[str, str]:
+        return {CODEC_META: "zstd"} if self.compression == "zstd" else {}
+
+    def _encode(self, data: bytes, dictionary: bool = True) -> Tuple[bytes, Dict[str, str]]:
+        """Compresses a whole body. Returns (payload, metadata to store with it)."""
+        if self.compression != "zstd":
+            return data, {}
+        metadata = self._codec_metadata()
+        dict_data = None
+        # Small HTML/XML documents compress poorly on their own; a dictionary
+        # trained on the corpus supplies the shared tags and boilerplate.
+        if dictionary and self.zstd_dict_id and len(data) <= settings.STORAGE_ZSTD_DICT_MAX_BODY:
+            dict_data = self._load_zstd_dict(self.zstd_dict_id)
+            metadata[ZSTD_DICT_META] = str(self.zstd_dict_id)
+        cctx = zstd.ZstdCompressor(level=settings.STORAGE_COMPRESSION_LEVEL, dict_data=dict_data)
+        return cctx.compress(data), metadata
+
+    def _load_zstd_dict(self, dict_id: int):
+        if dict_id not in _zstd_dicts:
+            body = self.s3.get_object(Bucket=self.bucket, Key=f"{ZSTD_DICT_PREFIX}{dict_id}.dict")["Body"].read()
+            _zstd_dicts[dict_id] = zstd.ZstdCompressionDict(body)
+        return _zstd_dicts[dict_id]
+
+    def train_zstd_dictionary(self, prefix: str, samples: int = 2000, dict_size: int = 112 * 1024) -> int:
+        """
+        Trains a zstd dictionary on up to `samples` small objects under prefix
+        (e.g. "edgar/"), stores it as codecs/zstd/{id}.dict and returns its id.
+        Setting STORAGE_ZSTD_DICT_ID to the id makes new small objects use it;
+        objects written with an older dictionary stay readable.
+        """
+        if zstd is None:
+            raise RuntimeError("Training a dictionary needs zstandard (pip install .[compression])")
+        max_body = settings.STORAGE_ZSTD_DICT_MAX_BODY
+        bodies: List[bytes] = []
+        paginator = self.s3.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                # Listed sizes are stored sizes; the decoded length is checked below
+                if obj["Size"] > max_body:
+                    continue
+                body = self.get_object(obj["Key"])
+                if len(body) <= max_body:
+                    bodies.append(body)
+                if len(bodies) >= samples:
+                    break
+            if len(bodies) >= samples:
+                break
+
+        if len(bodies) < 10:
+            raise ValueError(f"Only {len(bodies)} small objects under {prefix!r}; not enough to train a dictionary")
+        trained = zstd.train_dictionary(dict_size, bodies)
+        dict_id = trained.dict_id()
+        self.s3.put_object(Bucket=self.bucket, Key=f"{ZSTD_DICT_PREFIX}{dict_id}.dict", Body=trained.as_bytes())
+        _zstd_dicts[dict_id] = trained
+        logger.info(f"Trained zstd dictionary {dict_id} ({len(trained.as_bytes())} bytes) on {len(bodies)} objects under {prefix}")
+        return dict_id
+
+    def _put_stream(self, key: str, chunks: Iterable[bytes], part_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Uploads an iterable of byte chunks (e.g. an HTTP response body) without
+        holding the whole object in memory. Chunks are regrouped into fixed-size
+        parts of a multipart upload; bodies smaller than one part go up as a single
+        PUT. A SHA-256 of the full body is computed on the fly. With zstd on, the
+        chunks are compressed as they arrive (one frame, no dictionary).
+        Up to MINIO_TRANSFER_CONCURRENCY parts upload in parallel while the
+        next one is read, so memory stays bounded at about that many parts.
+        Returns {"key", "size", "sha256"}; size and hash are of the original bytes.
+        """
+        part_size = max(part_size or settings.MINIO_PART_SIZE, MIN_PART_SIZE)
+        concurrency = max(1, settings.MINIO_TRANSFER_CONCURRENCY)
+        metadata = self._codec_metadata()
+        compressor = zstd.ZstdCompressor(level=settings.STORAGE_COMPRESSION_LEVEL).compressobj() if metadata else None
+        s3 = self.s3
+        hasher = hashlib.sha256()
+        size = 0
+        buffer = bytearray()
+        upload_id = None
+        parts = []
+        in_flight = set()
+        next_part = 1
+        executor: Optional[ThreadPoolExecutor] = None
+
+        def _send(number: int, body: bytes) -> Dict[str, Any]:
+            resp = s3.upload_part(Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=number, Body=body)
+            return {"ETag": resp["ETag"], "PartNumber": number}
+
+        def _collect(block_until: int) -> None:
+            # Wait until at most block_until parts are still uploading
+            nonlocal in_flight
+            while len(in_flight) > block_until:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    parts.append(future.result())
+
+        def _upload_part(body: bytes) -> None:
+            nonlocal next_part
+            _collect(concurrency - 1)
+            in_flight.add(executor.submit(_send, next_part, body))
+            next_part += 1
+
+        def _drain() -> None:
+            nonlocal upload_id, executor
+            while len(buffer) >= part_size:
+                if upload_id is None:
+                    upload_id = s3.create_multipart_upload(Bucket=self.bucket, Key=key, Metadata=metadata)["UploadId"]
+                    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="minio-part")
+                _upload_part(bytes(buffer[:part_size]))
+                del buffer[:part_size]
+
+        try:
+            for chunk in chunks:
+                hasher.update(chunk)
+                size += len(chunk)
+                buffer += compressor.compress(chunk) if compressor else chunk
+                _drain()
+            if compressor:
+                buffer += compressor.flush()
+                _drain()
+
+            if upload_id is None:
+                s3.put_object(Bucket=self.bucket, Key=key, Body=bytes(buffer), Metadata=metadata)
+            else:
+                if buffer:
+                    _upload_part(bytes(buffer))
+                _collect(0)
+                parts.sort(key=lambda p: p["PartNumber"])
+                s3.complete_multipart_upload(
+                    Bucket=self.bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+                )
+        except Exception as e:
+            logger.error(f"Streaming upload failed for {key}: {e}")
+            for future in in_flight:
+                future.cancel()
+            if upload_id is not None:
+                try:
+                    s3.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+                except Exception as abort_error:
+                    logger.warning(f"Failed to abort multipart upload for {key}: {abort_error}")
+            raise
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+
+        return {"key": key, "size": size, "sha256": hasher.hexdigest()}
+
     def get_object(self, key: str) -> bytes:
-        """Downloads data from MinIO."""
+        """Downloads data from MinIO (following a CAS pointer, decompressing)."""
         try:
-            response = self.s3.get_object(Bucket=self.bucket, Key=key)
-            return response["Body"].read()
+            if self.cache is None:
+                return self._read_all(self._open(key, self.s3.get_object(Bucket=self.bucket, Key=key)))
+            return self._get_cached(key)
         except Exception as e:
-            logger.error(f"Download failed for {key}: {e}")
+            # A missing key is often expected (e.g. no document manifest): the caller decides
+            if not (isinstance(e, ClientError) and e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404")):
+                logger.error(f"Download failed for {key}: {e}")
             raise
+
+    def _get_cached(self, key: str) -> bytes:
+        # entry.read() is None when another process evicted the entry after
+        # lookup; that is just a miss.
+        entry = self.cache.lookup(self.bucket, key)
+        if entry and entry.fresh:
+            self.cache.touch(entry)
+            data = entry.read()
+            if data is not None:
+                return data
+
+        with self.cache.filling(self.bucket, key):
+            # Another process may have filled or revalidated it while we waited
+            entry = self.cache.lookup(self.bucket, key)
+            if entry and entry.fresh:
+                self.cache.touch(entry)
+                data = entry.read()
+                if data is not None:
+                    return data
+
+            conditional = {"IfNoneMatch": entry.etag} if entry else {}
+            try:
+                response = self.s3.get_object(Bucket=self.bucket, Key=key, **conditional)
+            except ClientError as e:
+                if not (entry and e.response.get("Error", {}).get("Code") in ("304", "NotModified")):
+                    raise
+                self.cache.touch(entry, revalidated=True)
+                data = entry.read()
+                if data is not None:
+                    return data
+                # Evicted right after the 304: fetch it for real
+                response = self.s3.get_object(Bucket=self.bucket, Key=key)
+            # For CAS the logical key's ETag is the pointer's: a new blob means a new pointer
+            etag = response.get("ETag", "")
+            data = self._read_all(self._open(key, response))
+            self.cache.store(self.bucket, key, etag, data)
+            return data
+
+    @staticmethod
+    def _read_all(reader: BinaryIO) -> bytes:
+        try:
+            return reader.read()
+        finally:
+            reader.close()
+
+    def get_range(self, key: str, start: int, end: int) -> bytes:
+        """
+        Returns bytes [start, end) of the object's original content, e.g. the
+        span behind a citation, without downloading the whole filing. Plain
+        objects are served by a ranged GET; compressed ones can't be sliced
+        server-side, so they are decoded as a stream up to `end`.
+        """
+        if end <= start:
+            return b""
+        byte_range = f"bytes={start}-{end - 1}"
+        try:
+            response = self._ranged_get(key, byte_range)
+            # No body means start is past the end of key, which may just be a
+            # small CAS pointer or a compressed body: its metadata decides.
+            metadata = response["Metadata"] if response else (self._head(key) or {}).get("Metadata", {})
+            sha = metadata.get(CAS_META)
+            if sha:
+                if response:
+                    response["Body"].close()
+                response = self._ranged_get(blob_key(sha), byte_range)
+                metadata = response["Metadata"] if response else (self._head(blob_key(sha)) or {}).get("Metadata", {})
+            if not metadata.get(CODEC_META):
+                return response["Body"].read() if response else b"" # past the end of the object
+            if response:
+                response["Body"].close()
+        except ClientError as e:
+            logger.error(f"Range read failed for {key}: {e}")
             raise
 
+        reader = self.open_object(key)
+        try:
+            skip = start
+            while skip > 0:
+                chunk = reader.read(min(skip, 1024 * 1024))
+                if not chunk:
+                    return b""
+                skip -= len(chunk)
+            return reader.read(end - start)
+        finally:
+            reader.close()
+
+    def _ranged_get(self, key: str, byte_range: str) -> Optional[Dict[str, Any]]:
+        """GetObject for a byte range; None when the range starts past the stored body."""
+        try:
+            response = self.s3.get_object(Bucket=self.bucket, Key=key, Range=byte_range)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") != "InvalidRange":
+                raise
+            return None
+        response.setdefault("Metadata", {})
+        return response
+
+    def download_file(self, key: str, path: str) -> str:
+        """
+        Downloads an object's original content to a local file. Plain objects
+        are fetched as parallel ranged GETs; compressed ones are decoded as a
+        stream. Writes to path + ".part" and renames, so readers never see a
+        partial file.
+        """
+        tmp_path = f"{path}.part"
+        s3 = self.s3
+        head = s3.head_object(Bucket=self.bucket, Key=key)
+        target, metadata = key, head.get("Metadata", {})
+        sha = metadata.get(CAS_META)
+        if sha:
+            target = blob_key(sha)
+            metadata = s3.head_object(Bucket=self.bucket, Key=target).get("Metadata", {})
+
+        if metadata.get(CODEC_META):
+            reader = self.open_object(key)
+            try:
+                with open(tmp_path, "wb") as f:
+                    for chunk in iter(lambda: reader.read(1024 * 1024), b""):
+                        f.write(chunk)
+            finally:
+                reader.close()
+        else:
+            s3.download_file(self.bucket, target, tmp_path, Config=_transfer_config())
+        os.replace(tmp_path, path)
+        return path
+
+    def open_object(self, key: str) -> BinaryIO:
+        """
+        Returns a file-like reader over the object's original bytes. CAS
+        pointers are followed and zstd bodies are decompressed as they stream
+        in, so large filings can be processed without holding them in memory.
+        """
+        return self._open(key, self.s3.get_object(Bucket=self.bucket, Key=key))
+
+    def _open(self, key: str, response: Dict[str, Any]) -> BinaryIO:
+        """Decoding reader for a GetObject response on key."""
+        sha = response.get("Metadata", {}).get(CAS_META)
+        if sha:
+            response["Body"].close()
+            response = self.s3.get_object(Bucket=self.bucket, Key=blob_key(sha))
+
+        metadata = response.get("Metadata", {})
+        codec = metadata.get(CODEC_META)
+        if not codec:
+            return response["Body"]
+        if codec != "zstd":
+            raise ValueError(f"Unknown codec {codec!r} on {key}")
+        if zstd is None:
+            raise RuntimeError(f"{key} is zstd-compressed; install zstandard (pip install .[compression]) to read it")
+        dict_id = metadata.get(ZSTD_DICT_META)
+        dict_data = self._load_zstd_dict(int(dict_id)) if dict_id else None
+        return zstd.ZstdDecompressor(dict_data=dict_data).stream_reader(response["Body"], closefd=True)
+
+    def gc(self, grace_seconds: Optional[int] = None, dry_run: bool = False) -> Dict[str, int]:
+        """
+        Mark and sweep for CAS blobs: counts pointer references per blob and
+        deletes blobs nobody references, plus abandoned cas/tmp/ uploads.
+        Objects younger than grace_seconds are kept, so a blob whose pointer
+        is still being written is never collected.
+        """
+        grace = settings.STORAGE_CAS_GC_GRACE_SECONDS if grace_seconds is None else grace_seconds
+        cutoff = time.time() - grace
+        refs: Counter = Counter()
+        blobs: Dict[str, Dict[str, Any]] = {}
+        stale_tmp = []
+
+        paginator = self.s3.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket):
+            for obj in page.get("Contents", []):
+                key = obj["Key"]
+                if key.startswith(CAS_PREFIX):
+                    blobs[key] = obj
+                elif key.startswith(CAS_TMP_PREFIX):
+                    if obj["LastModified"].timestamp() < cutoff:
+                        stale_tmp.append(key)
+                elif obj["Size"] <= _MAX_POINTER_SIZE:
+                    head = self._head(key)
+                    sha = head.get("Metadata", {}).get(CAS_META) if head else None
+                    if sha:
+                        refs[blob_key(sha)] += 1
+
+        candidates = [
+            k for k, obj in blobs.items()
+            if refs[k] == 0 and obj["LastModified"].timestamp() < cutoff
+        ]
+        # Re-check just before deleting: a writer that deduplicated onto one of
+        # these since the listing has refreshed its LastModified (_reuse_blob).
+        garbage = [k for k in candidates if self._still_garbage(k, cutoff)] + stale_tmp
+        stats = {
+            "blobs": len(blobs),
+            "references": sum(refs.values()),
+            "deleted": len(garbage),
+            "bytes_freed": sum(blobs[k]["Size"] for k in garbage if k in blobs),
+        }
+        if not dry_run:
+            for i in range(0, len(garbage), 1000): # DeleteObjects limit
+                self.s3.delete_objects(
+                    Bucket=self.bucket,
+                    Delete={"Objects": [{"Key": k} for k in garbage[i:i + 1000]], "Quiet": True},
+                )
+        logger.info(f"CAS GC{' (dry run)' if dry_run else ''}: {stats}")
+        return stats
+
+    def _still_garbage(self, blob: str, cutoff: float) -> bool:
+        head = self._head(blob)
+        return head is not None and head["LastModified"].timestamp() < cutoff
+
     def get_storage_path(self, cik: str, accession: str, ext: str = "txt") -> str:
         """Returns deterministic path: raw/{cik}/{accession}.{ext}"""
         return f"raw/{cik}/{accession}.{ext}"
@@ -0,0 +1,91 @@
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional
+from config import get_settings
+from pipelines.disk_cache import DiskCache, fcntl
+
+settings = get_settings()
+
+
+@dataclass
+class ObjectCacheEntry:
+    key: str
+    body_path: Path
+    meta_path: Path
+    etag: str
+    validated_at: float
+    size: int
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() - self.validated_at < settings.STORAGE_CACHE_FRESH_SECONDS
+
+    def read(self) -> Optional[bytes]:
+        """The cached body, or None if another process evicted it since lookup."""
+        try:
+            return self.body_path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+
+class ObjectCache(DiskCache):
+    """
+    Read-through disk cache for MinIOClient.get_object, shared by every process
+    on a worker host. Holds the decoded object bytes plus the ETag they came
+    with. Entries validated less than STORAGE_CACHE_FRESH_SECONDS ago are served
+    without asking MinIO; older ones are revalidated with If-None-Match.
+    Size-bounded LRU, see DiskCache; a {sha}.lock file sits next to an entry
+    while it is being filled.
+    """
+    name = "Object cache"
+
+    def __init__(self, root: Optional[str] = None, max_bytes: Optional[int] = None):
+        super().__init__(
+            root or settings.STORAGE_CACHE_DIR or Path(settings.DATA_DIR) / "object_cache",
+            max_bytes or settings.STORAGE_CACHE_MAX_BYTES,
+        )
+
+    def lookup(self, bucket: str, key: str) -> Optional[ObjectCacheEntry]:
+        body_path, meta_path = self._paths(f"{bucket}/{key}")
+        found = self._read_entry(body_path, meta_path)
+        if found is None:
+            return None
+        meta, size = found
+        return ObjectCacheEntry(key, body_path, meta_path, meta.get("etag", ""), meta.get("validated_at", 0.0), size)
+
+    @contextmanager
+    def filling(self, bucket: str, key: str) -> Iterator[None]:
+        """
+        Exclusive per-object lock across processes while an entry is fetched,
+        so a cold SPY series is downloaded once per host, not once per worker.
+        """
+        body_path, _ = self._paths(f"{bucket}/{key}")
+        if fcntl is None:
+            yield
+            return
+        body_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(body_path.with_suffix(".lock"), "a+b") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def touch(self, entry: ObjectCacheEntry, revalidated: bool = False) -> None:
+        """Mark an entry as recently used (and, after a 304, freshly validated)."""
+        now = time.time()
+        if self._touch(entry.body_path, now) and revalidated:
+            entry.validated_at = now
+            self._write_meta(entry.meta_path, {"key": entry.key, "etag": entry.etag, "validated_at": now})
+
+    def store(self, bucket: str, key: str, etag: str, data: bytes) -> None:
+        if not etag or len(data) > settings.STORAGE_CACHE_MAX_OBJECT_BYTES:
+            return
+        self._store(*self._paths(f"{bucket}/{key}"), data, {"key": key, "etag": etag, "validated_at": time.time()})
+
+    def invalidate(self, bucket: str, key: str) -> None:
+        body_path, meta_path = self._paths(f"{bucket}/{key}")
+        meta_path.unlink(missing_ok=True)
+        body_path.unlink(missing_ok=True)
@@ -1,17 +1,21 @@
 
 import logging
-from celery import Celery
+from celery import Celery, group
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from config import get_settings
 from pipelines.models import Base, Filing, FilingState
 from pipelines.sec.client import SecClient
 from pipelines.storage import MinIOClient
+from pipelines.parse.sgml import SubmissionDemuxer
+from pipelines.documents import FilingDocumentWriter, load_manifest, primary_document, xbrl_document
 import feedparser
 from datetime import datetime
 from pipelines.reconcile import Reconciler
 from pipelines.parse.xbrl import XBRLParser
-from pipelines.models import Base, Filing, FilingState, Fact, Company
+from pipelines.facts import FactWriter
+from pipelines.migrations import apply_migrations
+from pipelines.models import Base, Filing, FilingState, Company
 from pipelines.market.stooq import StooqClient
 from pipelines.features import FeatureStore
 from pipelines.rag.chunker import Chunker
@@ -29,11 +33,15 @@ celery_app = Celery(
 )
 
 # Database Setup
-engine = create_engine(settings.DATABASE_URL)
+# values_plus_batch: psycopg2 execute_batch for the executemany UPDATEs/DELETEs
+# that insertmanyvalues doesn't cover (bulk fact inserts themselves use COPY).
+engine = create_engine(settings.DATABASE_URL, executemany_mode="values_plus_batch")
 SessionLocal = sessionmaker(bind=engine)
 
 # Ensure tables exist (Migration logic typically handled by Alembic, but verified here for sprint)
 Base.metadata.create_all(bind=engine)
+# ... and that tables created by older versions have the current columns
+apply_migrations(engine)
 
 @celery_app.task
 def ingest_rss_feed():
@@ -47,38 +55,43 @@ def ingest_rss_feed():
         resp = client.get(url) 
         feed = feedparser.parse(resp.content)
         
-        session = SessionLocal()
-        new_count = 0
-        
+        # Entry ID format: urn:tag:sec.gov,2008:accession-number=0000320193-24-000001
+        # The feed lists one entry per filer, so a filing can appear more than once.
+        entries = {}
         for entry in feed.entries:
-            # Parse Accession (typically in ID or Summary)
-            # Entry ID format: urn:tag:sec.gov,2008:accession-number
-            # Accession is the last part
-            accession = entry.id.split(":")[-1]
-            title = entry.title
-            
-            # Parse Link
-            # Atom feed entry has link href
-            link = entry.link
-            
-            # Check if exists
-            exists = session.query(Filing).filter_by(accession_number=accession).first()
-            if not exists:
-                filing = Filing(
-                    accession_number=accession,
-                    # title=title, 
-                    filed_at=datetime.utcnow(), 
-                    url=link,
-                    state=FilingState.PENDING
-                )
-                session.add(filing)
-                new_count += 1
-                
-                # Trigger download task
-                download_filing.delay(accession)
-        
-        session.commit()
-        session.close()
+            accession = entry.id.split("accession-number=")[-1]
+            entries.setdefault(accession, entry)
+
+        session = SessionLocal()
+        try:
+            # One lookup for the whole feed instead of a query per entry
+            existing = {
+                row[0] for row in
+                session.query(Filing.accession_number).filter(Filing.accession_number.in_(list(entries))).all()
+            }
+            new_accessions = [acc for acc in entries if acc not in existing]
+
+            if new_accessions:
+                now = datetime.utcnow()
+                session.bulk_insert_mappings(Filing, [
+                    {
+                        "accession_number": acc,
+                        "filed_at": now,
+                        "url": entries[acc].link,
+                        "state": FilingState.PENDING,
+                    }
+                    for acc in new_accessions
+                ])
+            # Commit before enqueuing so workers never look up a row that isn't visible yet
+            session.commit()
+        finally:
+            session.close()
+
+        # Trigger download tasks in a single broker round-trip
+        if new_accessions:
+            group(download_filing.s(acc) for acc in new_accessions).apply_async()
+
+        new_count = len(new_accessions)
         logger.info(f"RSS Ingest Complete. New Filings: {new_count}")
         return new_count
         
@@ -100,9 +113,6 @@ def download_filing(self, accession: str):
     client = SecClient()
     storage = MinIOClient()
     
-    client = SecClient()
-    storage = MinIOClient()
-    
     try:
         # Download
         # The RSS link is usually the index page. We want the full text.
@@ -113,12 +123,23 @@ def download_filing(self, accession: str):
         # Simple heuristic replace
         txt_url = filing.url.replace("-index.htm", ".txt").replace("-index.html", ".txt")
         
-        resp = client.get(txt_url)
-        content = resp.content
-        
-        # Save to MinIO
+        # Stream straight into a MinIO multipart upload: full submissions with
+        # exhibits can be hundreds of MB, so never buffer the whole body.
+        # The same pass splits the SGML envelope into per-document objects.
         key = f"edgar/{accession}/raw.txt"
-        storage.put_object(key, content)
+        writer = FilingDocumentWriter(storage, accession)
+        demuxer = SubmissionDemuxer(writer)
+
+        def _tee(chunks):
+            for chunk in chunks:
+                demuxer.feed(chunk)
+                yield chunk
+            demuxer.close()
+
+        with client.stream(txt_url) as resp:
+            result = storage.put_stream(key, _tee(resp.iter_bytes(chunk_size=1024 * 1024)))
+        writer.write_manifest()
+        logger.info(f"Stored {accession}: {result['size']} bytes (sha256 {result['sha256']})")
         
         filing.state = FilingState.DOWNLOADED
         filing.s3_path = key
@@ -157,26 +178,18 @@ def process_filing_task(accession: str):
         session.close()
         return "Not ready"
         
-    storage = MinIOClient()
+    storage = MinIOClient(cache=False) # one-shot read: keep it out of the host cache
     parser = XBRLParser()
     
     try:
-        # Get Content
-        content = storage.get_object(filing.s3_path)
+        # Get Content: only the XBRL instance / iXBRL primary doc, not the whole submission
+        manifest = load_manifest(storage, accession)
+        doc = xbrl_document(manifest, filing.form_type) if manifest else None
+        content = storage.get_object(doc["key"] if doc else filing.s3_path)
         
-        # Parse
-        facts_data = parser.parse(content)
-        
-        # Save Facts
-        for item in facts_data:
-            fact = Fact(
-                filing_accession=accession,
-                concept=item['concept'],
-                value=item['value'],
-                unit=item['unit']
-                # period logic needs context map
-            )
-            session.add(fact)
+        # Parse and Save Facts: streamed from the parser into COPY, replacing any
+        # from an earlier run, in the same transaction as the state change
+        written = FactWriter(session).replace(accession, parser.iter_facts(content))
             
         filing.state = FilingState.PROCESSED
         session.commit()
@@ -188,7 +201,7 @@ def process_filing_task(accession: str):
     finally:
         session.close()
         
-    return f"Processed {len(facts_data)} facts"
+    return f"Processed {written} facts"
 
 @celery_app.task
 def ingest_market_data_task(tickers: list[str]):
@@ -230,15 +243,17 @@ def ingest_rag_task(accession: str):
         session.close()
         return "Filing not ready/found"
         
-    storage = MinIOClient()
+    storage = MinIOClient(cache=False) # read once per filing
     chunker = Chunker()
     embedder = Embedder() # Uses all-MiniLM-L6-v2 by default
     vb = VectorBooster()
     
     try:
-        # 1. Get Text (Assuming raw.txt is text)
+        # 1. Get Text: the primary document if the submission was split, else raw.txt
         # TODO: clean html if needed, but for now treat as raw text
-        content_bytes = storage.get_object(filing.s3_path)
+        manifest = load_manifest(storage, accession)
+        doc = primary_document(manifest, filing.form_type) if manifest else None
+        content_bytes = storage.get_object(doc["key"] if doc else filing.s3_path)
         text = content_bytes.decode("utf-8", errors="ignore")
         
         # 2. Chunk
@@ -1,20 +1,154 @@
+import os
+import json
+import time
 import logging
+import zipfile
+import itertools
+import numpy as np
 import pandas as pd
-import json
-from typing import Optional, List
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, Optional, List, Tuple
 from pipelines.sec.client import SecClient
 from lakehouse.db import Database
 from pipelines.xbrl.quality_gates import QualityGates
 
+try:
+    # Optional faster decoder (pip install orjson); companyfacts payloads run to tens of MB
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
+# Nightly archive with every company's companyfacts JSON (one CIK##########.json member each)
+BULK_URL = "https://www.sec.gov/Archives/edgar/daily-index/xbrl/companyfacts.zip"
+
+
+# xbrl_facts.id: content hash of a fact, used by incremental merges to tell
+# unchanged rows from new or restated ones. NULLs are spelled out so that
+# e.g. an instant date can't hash like a period end.
+_FACT_HASH_SQL = """md5(concat_ws('|',
+    cik, taxonomy, tag, coalesce(CAST(period_start AS VARCHAR), '-'), coalesce(CAST(period_end AS VARCHAR), '-'),
+    coalesce(CAST(period_instant AS VARCHAR), '-'), unit, coalesce(CAST(value AS VARCHAR), '-'),
+    coalesce(accession_number, '-'), coalesce(CAST(fy AS VARCHAR), '-'), coalesce(fp, '-'), coalesce(form, '-'),
+    coalesce(CAST(filed_date AS VARCHAR), '-'), coalesce(frame, '-')))"""
+
+# Column order of xbrl_facts rows produced by the parser
+FACT_COLUMNS = [
+    "cik", "taxonomy", "tag", "period_start", "period_end", "period_instant", "unit", "value",
+    "accession_number", "fy", "fp", "form", "filed_date", "frame",
+]
+
+
+def _repeat_categorical(values: List[str], counts: List[int]) -> pd.Categorical:
+    # One code per run instead of one Python string per fact
+    categories = pd.unique(pd.Series(values, dtype=object))
+    codes = pd.Categorical(values, categories=categories).codes
+    return pd.Categorical.from_codes(np.repeat(codes, counts), categories=categories)
+
+
+def _categorical(values) -> pd.Categorical:
+    # factorize + from_codes skips most of pd.Categorical()'s validation; None -> NaN
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object), sort=True)
+    return pd.Categorical.from_codes(codes, categories=uniques)
+
+
+def _build_batch(cik: str, runs: List[Tuple[str, str, str, int]], buf: Dict[str, list]) -> pd.DataFrame:
+    n = len(buf["end"])
+    start = np.array(buf["start"], dtype=object)
+    end = np.array(buf["end"], dtype=object)
+    # If 'start' is missing, it's an Instant fact (Balance Sheet): 'end' is the instant date
+    instant = pd.isna(start)
+    counts = [r[3] for r in runs]
+
+    try:
+        value = np.array(buf["val"], dtype="float64")
+    except (TypeError, ValueError):
+        value = pd.to_numeric(pd.Series(buf["val"], dtype=object), errors="coerce").to_numpy()
+
+    return pd.DataFrame({
+        "cik": pd.Categorical.from_codes(np.zeros(n, dtype="int8"), categories=[cik]),
+        "taxonomy": _repeat_categorical([r[0] for r in runs], counts),
+        "tag": _repeat_categorical([r[1] for r in runs], counts),
+        # Dates, accessions and frames repeat across tags too (a company has a few
+        # hundred filings), so they are dictionary-encoded as well. Inferred
+        # categories are sorted, so ISO dates still order correctly.
+        "period_start": _categorical(start),
+        "period_end": _categorical(np.where(instant, None, end)),
+        "period_instant": _categorical(np.where(instant, end, None)),
+        "unit": _repeat_categorical([r[2] for r in runs], counts),
+        "value": value,
+        "accession_number": _categorical(buf["accn"]),
+        "fy": pd.array(buf["fy"], dtype="Int32"),
+        "fp": _categorical(buf["fp"]),
+        "form": _categorical(buf["form"]),
+        "filed_date": _categorical(buf["filed"]),
+        "frame": _categorical(buf["frame"]),
+    }, columns=FACT_COLUMNS)
+
+
+def iter_companyfacts(data: dict, cik: str, batch_rows: int = 100_000) -> Iterator[pd.DataFrame]:
+    """
+    Flattens one companyfacts JSON document into xbrl_facts rows, as a sequence
+    of columnar DataFrames of roughly batch_rows rows each.
+
+    Facts are appended straight into per-column lists (no dict per fact), and
+    taxonomy/tag/unit/fp/form become dictionary-encoded categoricals. Batches
+    are only cut between tags, so QualityGates' dedupe (which keys on tag)
+    gives the same result per batch as on the whole company.
+    Module-level so bulk mode can run it in worker processes.
+    """
+    # Structure:
+    # { "cik": ..., "entityName": ..., "facts": { "us-gaap": { "AccountsPayableCurrent": { "units": { "USD": [ { "start":..., "end":..., "val":..., "accn":... } ] } } } } }
+    fields = ("start", "end", "val", "accn", "fy", "fp", "form", "filed", "frame")
+    buf = {f: [] for f in fields}
+    runs: List[Tuple[str, str, str, int]] = [] # (taxonomy, tag, unit, n_facts)
+
+    # Iterate taxonomies (us-gaap, dei, etc)
+    for tax_name, concepts in data.get("facts", {}).items():
+        for tag, tag_data in concepts.items():
+            for unit, facts_list in tag_data.get("units", {}).items():
+                if not facts_list:
+                    continue
+                runs.append((tax_name, tag, unit, len(facts_list)))
+                for f in fields:
+                    buf[f].extend([fact.get(f) for fact in facts_list])
+
+            if len(buf["end"]) >= batch_rows:
+                yield _build_batch(cik, runs, buf)
+                buf = {f: [] for f in fields}
+                runs = []
+
+    if runs:
+        yield _build_batch(cik, runs, buf)
+
+
+def parse_companyfacts(data: dict, cik: str) -> pd.DataFrame:
+    """All of a company's facts as one DataFrame (see iter_companyfacts)."""
+    batches = list(iter_companyfacts(data, cik))
+    if not batches:
+        return pd.DataFrame(columns=FACT_COLUMNS)
+    return pd.concat(batches, ignore_index=True) if len(batches) > 1 else batches[0]
+
+
+def _parse_bulk_member(path: str, member: str) -> Tuple[str, List[pd.DataFrame]]:
+    """Worker: reads and parses one CIK member of companyfacts.zip."""
+    cik = member.replace("CIK", "").replace(".json", "").zfill(10)
+    # Each worker opens the archive itself; only the member name crosses the process boundary.
+    with zipfile.ZipFile(path) as zf:
+        data = _json_loads(zf.read(member))
+    frames = [QualityGates.run_gates(df, context_str=f"CIK {cik}") for df in iter_companyfacts(data, cik)]
+    return cik, frames
+
+
 class XbrlFactsFetcher:
     def __init__(self) -> None:
         self.client = SecClient()
         self.db = Database()
 
-    def fetch_facts(self, cik: str, taxonomy: str = "us-gaap") -> None:
+    def fetch_facts(self, cik: str, taxonomy: str = "us-gaap", incremental: bool = True) -> None:
         """
         Fetch all company facts for a CIK (all taxonomies returned in one JSON usually).
         URL: https://data.sec.gov/api/xbrl/companyfacts/CIK{cik}.json
+        incremental=False rewrites the company's whole history instead of merging.
         """
         # CIK must be 10 digits
         cik = str(cik).zfill(10)
@@ -22,102 +156,196 @@ class XbrlFactsFetcher:
         
         logging.info(f"Fetching XBRL facts for CIK {cik}...")
         try:
-            resp = self.client._get(url)
-            data = resp.json()
+            resp = self.client._get(url, cache=True)
+            data = _json_loads(resp.content)
             
-            # Structure:
-            # { "cik": ..., "entityName": ..., "facts": { "us-gaap": { "AccountsPayableCurrent": { "units": { "USD": [ { "start":..., "end":..., "val":..., "accn":... } ] } } } } }
-            
-            facts_container = data.get("facts", {})
-            if not facts_container:
+            if not data.get("facts"):
                 logging.warning(f"No facts found for CIK {cik}")
                 return
 
-            all_records = []
-            
-            # Iterate taxonomies (us-gaap, dei, etc)
-            for tax_name, concepts in facts_container.items():
-                if taxonomy and taxonomy != "all" and tax_name != taxonomy:
-                    # If user specified specific taxonomy, skip. But usually we want all or us-gaap.
-                    # Let's ingest 'us-gaap' and 'dei' mostly.
-                    pass 
-                
-                # Concepts
-                for tag, tag_data in concepts.items():
-                    # Units
-                    for unit, facts_list in tag_data.get("units", {}).items():
-                        for fact in facts_list:
-                            # Fact keys: start, end, val, accn, fy, fp, form, filed, frame
-                            # Some are instant (no start/end, just 'end' usually?)
-                            # Actually SEC JSON uses 'end' as the instant date for balance sheet items.
-                            # And 'start' + 'end' for duration items.
-                            
-                            record = {
-                                "cik": cik,
-                                "taxonomy": tax_name,
-                                "tag": tag,
-                                "period_start": fact.get("start"),
-                                "period_end": fact.get("end"),
-                                "period_instant": None, # Logic below
-                                "unit": unit,
-                                "value": fact.get("val"),
-                                "accession_number": fact.get("accn"),
-                                "fy": fact.get("fy"),
-                                "fp": fact.get("fp"),
-                                "form": fact.get("form"),
-                                "filed_date": fact.get("filed"),
-                                "frame": fact.get("frame")
-                            }
-                            
-                            # Handle Instant vs Duration
-                            # If 'start' is missing, it's an Instant fact (Balance Sheet)
-                            if "start" not in fact:
-                                record["period_instant"] = fact.get("end") # The metadata uses 'end' key for instant date too
-                                record["period_end"] = None
-                            
-                            all_records.append(record)
-
-            if not all_records:
+            # Parse, gate and insert batch by batch so memory stays bounded per CIK
+            batches = (
+                QualityGates.run_gates(df, context_str=f"CIK {cik}")
+                for df in iter_companyfacts(data, cik)
+            )
+            if not self._save_facts(batches, [cik], incremental=incremental):
                 logging.warning(f"No records parsed for CIK {cik}")
-                return
-
-            df = pd.DataFrame(all_records)
-            
-            # Quality Gates
-            df = QualityGates.run_gates(df, context_str=f"CIK {cik}")
-            
-            # Save
-            self._save_facts(df)
             
         except Exception as e:
             logging.error(f"Error fetching/saving facts for {cik}: {e}")
             # Don't raise, just log so loop continues?
             raise
 
-    def _save_facts(self, df: pd.DataFrame) -> None:
+    def download_bulk(self, path: str) -> str:
+        """Streams the nightly companyfacts.zip (several GB) to path."""
+        tmp = f"{path}.part"
+        logging.info(f"Downloading {BULK_URL} -> {path}")
+        with self.client.stream(BULK_URL) as resp, open(tmp, "wb") as f:
+            for chunk in resp.iter_bytes(chunk_size=1024 * 1024):
+                f.write(chunk)
+        os.replace(tmp, path)
+        return path
+
+    def ingest_bulk(
+        self,
+        path: str,
+        workers: Optional[int] = None,
+        batch_rows: int = 500_000,
+        incremental: bool = True,
+    ) -> Dict[str, int]:
+        """
+        Loads every company in a local companyfacts.zip.
+        Members are parsed in a process pool; parsed frames are buffered and
+        written in batches of ~batch_rows (one DuckDB insert per batch), so the
+        whole universe costs one download plus CPU instead of one HTTP call per CIK.
+        """
+        with zipfile.ZipFile(path) as zf:
+            members = [n for n in zf.namelist() if n.startswith("CIK") and n.endswith(".json")]
+        workers = workers or os.cpu_count() or 1
+        logging.info(f"Bulk XBRL ingest: {len(members)} companies from {path} ({workers} workers)")
+
+        stats = {"companies": 0, "facts": 0, "failed": 0}
+        pending: List[pd.DataFrame] = []
+        pending_ciks: List[str] = []
+        pending_rows = 0
+        started = time.monotonic()
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Bounded window of in-flight members so finished frames don't pile up in memory
+            todo = iter(members)
+            in_flight = {}
+            for member in itertools.islice(todo, workers * 2):
+                in_flight[pool.submit(_parse_bulk_member, path, member)] = member
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    member = in_flight.pop(future)
+                    for nxt in itertools.islice(todo, 1):
+                        in_flight[pool.submit(_parse_bulk_member, path, nxt)] = nxt
+                    try:
+                        cik, frames = future.result()
+                    except Exception as e:
+                        logging.error(f"Failed to parse {member}: {e}")
+                        stats["failed"] += 1
+                        continue
+                    stats["companies"] += 1
+                    pending.extend(frames)
+                    pending_ciks.append(cik)
+                    pending_rows += sum(len(df) for df in frames)
+
+                if pending_rows >= batch_rows:
+                    stats["facts"] += self._save_facts(pending, pending_ciks, incremental=incremental)
+                    pending, pending_ciks, pending_rows = [], [], 0
+                    elapsed = time.monotonic() - started
+                    logging.info(
+                        f"Bulk XBRL progress: {stats['companies']}/{len(members)} companies, "
+                        f"{stats['facts']} facts ({stats['facts'] / elapsed:.0f} facts/s)"
+                    )
+
+        stats["facts"] += self._save_facts(pending, pending_ciks, incremental=incremental)
+        logging.info(f"Bulk XBRL ingest complete: {stats} in {time.monotonic() - started:.0f}s")
+        return stats
+
+    def _save_facts(self, frames: Iterable[pd.DataFrame], ciks: List[str], incremental: bool = True) -> int:
+        """
+        Writes the given frames for ciks in one transaction, so readers never see
+        a company with its facts half-loaded. Returns the number of rows inserted.
+
+        incremental: only facts filed on/after the CIK's watermark are considered;
+        of those, rows whose hash is already stored are skipped and stored rows
+        with the same natural key but a different hash (restated values) are
+        replaced. A daily refresh touches only the new filing's facts.
+        Otherwise all existing facts of ciks are deleted and reinserted.
+        """
+        if not ciks:
+            return 0
         conn = self.db.get_connection()
+        inserted = 0
         try:
-            # Huge insert usually.
-            logging.info(f"Inserting {len(df)} facts into Lakehouse...")
-            conn.register("df_facts", df)
-            
-            # We assume clean insert for now. Dedupe handled in QualityGates broadly.
-            # But really we should DELETE existing for this CIK/Taxonomy or use upsert.
-            # For idempotent re-runs, let's DELETE WHERE CIK = ?
-            # This is safer than complex upsert on millions of rows.
-            
-            ciks = df["cik"].unique()
-            for c in ciks:
-                conn.execute("DELETE FROM xbrl_facts WHERE cik = ?", [c])
-            
-            conn.execute("""
-                INSERT INTO xbrl_facts 
-                (cik, taxonomy, tag, period_start, period_end, period_instant, unit, value, accession_number, fy, fp, form, filed_date, frame)
-                SELECT 
-                    cik, taxonomy, tag, period_start, period_end, period_instant, unit, value, accession_number, fy, fp, form, filed_date, frame 
-                FROM df_facts
-            """)
-            logging.info("Insert complete.")
-            
+            conn.execute("BEGIN TRANSACTION")
+            if not incremental:
+                # Full rewrite: DELETE existing facts of these CIKs first
+                conn.execute("DELETE FROM xbrl_facts WHERE cik IN (SELECT UNNEST(?))", [list(ciks)])
+
+            for df in frames:
+                if df.empty:
+                    continue
+                # Categorical columns arrive in DuckDB as ENUMs and are cast on insert
+                conn.register("df_facts", df)
+                if incremental:
+                    inserted += self._merge_batch(conn)
+                else:
+                    conn.execute(f"""
+                        INSERT INTO xbrl_facts 
+                        (id, cik, taxonomy, tag, period_start, period_end, period_instant, unit, value, accession_number, fy, fp, form, filed_date, frame)
+                        SELECT 
+                            {_FACT_HASH_SQL}, cik, taxonomy, tag, period_start, period_end, period_instant, unit, value, accession_number, fy, fp, form, filed_date, frame 
+                        FROM df_facts
+                    """)
+                    inserted += len(df)
+                conn.unregister("df_facts")
+
+            self._update_watermarks(conn, ciks)
+            conn.execute("COMMIT")
+            logging.info(
+                f"{'Merged' if incremental else 'Inserted'} {inserted} facts for {len(ciks)} companies into Lakehouse."
+            )
+            return inserted
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
         finally:
             conn.close()
+
+    def _merge_batch(self, conn) -> int:
+        # Only facts filed on/after the watermark can be new; '>=' re-checks the
+        # watermark day itself in case more of it was published after the last run.
+        conn.execute(f"""
+            CREATE OR REPLACE TEMP TABLE xbrl_facts_staged AS
+            SELECT * FROM (
+                SELECT 
+                    {_FACT_HASH_SQL} AS id, CAST(cik AS VARCHAR) AS cik, CAST(taxonomy AS VARCHAR) AS taxonomy,
+                    CAST(tag AS VARCHAR) AS tag, CAST(period_start AS DATE) AS period_start,
+                    CAST(period_end AS DATE) AS period_end, CAST(period_instant AS DATE) AS period_instant,
+                    CAST(unit AS VARCHAR) AS unit, value, CAST(accession_number AS VARCHAR) AS accession_number,
+                    fy, CAST(fp AS VARCHAR) AS fp, CAST(form AS VARCHAR) AS form,
+                    CAST(filed_date AS DATE) AS filed_date, CAST(frame AS VARCHAR) AS frame
+                FROM df_facts
+            ) f
+            WHERE f.filed_date >= coalesce(
+                (SELECT w.max_filed_date FROM xbrl_watermarks w WHERE w.cik = f.cik), DATE '1900-01-01'
+            )
+        """)
+
+        # Restated facts: same natural key (QualityGates' dedupe key), different content
+        conn.execute("""
+            DELETE FROM xbrl_facts t USING xbrl_facts_staged s
+            WHERE t.cik = s.cik AND t.taxonomy = s.taxonomy AND t.tag = s.tag AND t.unit = s.unit
+              AND t.period_start IS NOT DISTINCT FROM s.period_start
+              AND t.period_end IS NOT DISTINCT FROM s.period_end
+              AND t.period_instant IS NOT DISTINCT FROM s.period_instant
+              AND t.id IS DISTINCT FROM s.id
+        """)
+        inserted = conn.execute("""
+            INSERT INTO xbrl_facts 
+            (id, cik, taxonomy, tag, period_start, period_end, period_instant, unit, value, accession_number, fy, fp, form, filed_date, frame)
+            SELECT 
+                id, cik, taxonomy, tag, period_start, period_end, period_instant, unit, value, accession_number, fy, fp, form, filed_date, frame 
+            FROM xbrl_facts_staged s
+            WHERE NOT EXISTS (SELECT 1 FROM xbrl_facts t WHERE t.cik = s.cik AND t.id = s.id)
+        """).fetchone()[0]
+        conn.execute("DROP TABLE xbrl_facts_staged")
+        return inserted
+
+    def _update_watermarks(self, conn, ciks: List[str]) -> None:
+        conn.execute("""
+            INSERT INTO xbrl_watermarks (cik, max_filed_date, updated_at)
+            SELECT cik, MAX(filed_date), CURRENT_TIMESTAMP
+            FROM xbrl_facts
+            WHERE cik IN (SELECT UNNEST(?))
+            GROUP BY cik
+            ON CONFLICT (cik) DO UPDATE SET
+                max_filed_date = excluded.max_filed_date,
+                updated_at = excluded.updated_at
+        """, [list(ciks)])
@@ -0,0 +1,147 @@
+import json
+import logging
+import httpx
+import numpy as np
+import pandas as pd
+from typing import List, Sequence, Tuple
+from pipelines.sec.client import SecClient
+from lakehouse.db import Database
+
+# Concepts FeatureBuilder (and the agent tools, through the features table) read
+# from xbrl_facts: (taxonomy, tag, unit). All are duration concepts.
+FRAME_CONCEPTS: List[Tuple[str, str, str]] = [
+    ("us-gaap", "Revenues", "USD"),
+    ("us-gaap", "RevenueFromContractWithCustomerExcludingAssessedTax", "USD"),
+    ("us-gaap", "NetIncomeLoss", "USD"),
+]
+
+FRAMES_URL = "https://data.sec.gov/api/xbrl/frames/{taxonomy}/{tag}/{unit}/{frame}.json"
+
+
+def calendar_frames(start_year: int, end_year: int, quarterly: bool = True, annual: bool = True) -> List[str]:
+    """
+    Frame names for [start_year, end_year]: CY2023 (annual), CY2023Q1..Q4 (quarterly).
+    Instant concepts (balance sheet) use the same names with an "I" suffix, e.g. CY2023Q4I.
+    """
+    frames = []
+    for year in range(start_year, end_year + 1):
+        if annual:
+            frames.append(f"CY{year}")
+        if quarterly:
+            frames.extend(f"CY{year}Q{q}" for q in range(1, 5))
+    return frames
+
+
+class XbrlFramesFetcher:
+    """
+    Cross-sectional XBRL snapshots from the frames API: one request returns a
+    concept's value for every company for one calendar period (one fact per
+    company, the one SEC aligned to that frame). A universe-wide screen or
+    peer percentile needs concepts x periods requests instead of one
+    companyfacts download per company.
+    """
+    def __init__(self) -> None:
+        self.client = SecClient()
+        self.db = Database()
+
+    def fetch_frames(
+        self,
+        frames: Sequence[str],
+        concepts: Sequence[Tuple[str, str, str]] = FRAME_CONCEPTS,
+    ) -> int:
+        """Fetches every (concept, frame) pair concurrently and upserts them. Returns rows written."""
+        requests = [(concept, frame) for concept in concepts for frame in frames]
+        urls = [
+            FRAMES_URL.format(taxonomy=tax, tag=tag, unit=unit, frame=frame)
+            for (tax, tag, unit), frame in requests
+        ]
+        logging.info(f"Fetching {len(urls)} XBRL frames ({len(concepts)} concepts x {len(frames)} periods)...")
+        responses = self.client.get_many(urls, return_exceptions=True)
+
+        parsed = []
+        for ((tax, tag, unit), frame), url, resp in zip(requests, urls, responses):
+            if isinstance(resp, httpx.HTTPStatusError) and resp.response.status_code == 404:
+                # No company reported this concept for the period (or the period isn't closed yet)
+                logging.info(f"No frame data: {url}")
+                continue
+            if isinstance(resp, BaseException):
+                logging.error(f"Failed to fetch frame {url}: {resp}")
+                continue
+            df = self.parse_frame(json.loads(resp.content), tax, tag, unit, frame)
+            if not df.empty:
+                parsed.append(df)
+
+        if not parsed:
+            logging.warning("No frame data fetched.")
+            return 0
+        df = pd.concat(parsed, ignore_index=True)
+        # One row per key, as the upsert requires
+        df = df.drop_duplicates(subset=["taxonomy", "tag", "unit", "frame", "cik"], keep="last")
+        return self._save_frames(df)
+
+    @staticmethod
+    def parse_frame(data: dict, taxonomy: str, tag: str, unit: str, frame: str) -> pd.DataFrame:
+        """
+        Frames JSON -> xbrl_frames rows, one column at a time.
+        Structure: { "taxonomy", "tag", "uom", "ccp", ..., "data": [ { "accn", "cik", "entityName", "loc", "start", "end", "val" } ] }
+        """
+        rows = data.get("data", [])
+        n = len(rows)
+        if not n:
+            return pd.DataFrame()
+        return pd.DataFrame({
+            "taxonomy": pd.Categorical.from_codes(np.zeros(n, dtype="int8"), categories=[taxonomy]),
+            "tag": pd.Categorical.from_codes(np.zeros(n, dtype="int8"), categories=[tag]),
+            "unit": pd.Categorical.from_codes(np.zeros(n, dtype="int8"), categories=[unit]),
+            "frame": pd.Categorical.from_codes(np.zeros(n, dtype="int8"), categories=[frame]),
+            "cik": [str(r.get("cik")).zfill(10) for r in rows],
+            "entity_name": [r.get("entityName") for r in rows],
+            "loc": [r.get("loc") for r in rows],
+            "accession_number": [r.get("accn") for r in rows],
+            "period_start": [r.get("start") for r in rows],
+            "period_end": [r.get("end") for r in rows],
+            "value": np.array([r.get("val") for r in rows], dtype="float64"),
+        })
+
+    def _save_frames(self, df: pd.DataFrame) -> int:
+        """Replaces the fetched (concept, frame) slices in one transaction."""
+        conn = self.db.get_connection()
+        try:
+            conn.execute("BEGIN TRANSACTION")
+            conn.register("df_frames", df)
+            conn.execute("""
+                INSERT INTO xbrl_frames
+                (taxonomy, tag, unit, frame, cik, entity_name, loc, accession_number, period_start, period_end, value)
+                SELECT taxonomy, tag, unit, frame, cik, entity_name, loc, accession_number, period_start, period_end, value
+                FROM df_frames
+                ON CONFLICT (taxonomy, tag, unit, frame, cik) DO UPDATE SET
+                    entity_name = excluded.entity_name,
+                    loc = excluded.loc,
+                    accession_number = excluded.accession_number,
+                    period_start = excluded.period_start,
+                    period_end = excluded.period_end,
+                    value = excluded.value,
+                    created_at = now()
+            """)
+            # A frame is a complete snapshot: drop companies SEC no longer maps to it
+            conn.execute("""
+                DELETE FROM xbrl_frames t
+                WHERE EXISTS (
+                    SELECT 1 FROM df_frames s
+                    WHERE s.taxonomy = t.taxonomy AND s.tag = t.tag AND s.unit = t.unit AND s.frame = t.frame
+                )
+                AND NOT EXISTS (
+                    SELECT 1 FROM df_frames s
+                    WHERE s.taxonomy = t.taxonomy AND s.tag = t.tag AND s.unit = t.unit AND s.frame = t.frame AND s.cik = t.cik
+                )
+            """)
+            conn.execute("COMMIT")
+            logging.info(f"Saved {len(df)} frame rows.")
+            return len(df)
+        except Exception as e:
+            conn.execute("ROLLBACK")
+            logging.error(f"DB Error saving frames: {e}")
+            raise
+        finally:
+            conn.unregister("df_frames")
+            conn.close()
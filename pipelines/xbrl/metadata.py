@@ -18,7 +18,8 @@ class CompanyMetadataFetcher:
         
         try:
             # SEC returns a dict of dicts: {"0": {"cik":..., "ticker":...}, "1": ...}
-            resp = self.client._get(url)
+            # Conditional GET: unchanged ticker files are served from the local HTTP cache.
+            resp = self.client._get(url, cache=True)
             data = resp.json()
             
             # Convert to DataFrame
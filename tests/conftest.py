@@ -1,5 +1,8 @@
 
 import pytest
+from contextlib import ExitStack
+from pathlib import Path
+from unittest.mock import patch
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from pipelines.models import Base
@@ -14,3 +17,25 @@ def db_session():
     session = Session()
     yield session
     session.close()
+
+@pytest.fixture
+def duckdb_lake(tmp_path):
+    """
+    Factory for fetcher tests: duckdb_lake(module, *schemas) creates a temporary
+    DuckDB file with lakehouse/schemas/<schema> applied, patches module.Database
+    to connect to it and module.SecClient with a mock, and returns the file path.
+    """
+    import duckdb
+    schemas_dir = Path(__file__).parent.parent / "lakehouse" / "schemas"
+    db_path = str(tmp_path / "lake.duckdb")
+    with ExitStack() as patches:
+        def lake(module: str, *schemas: str) -> str:
+            conn = duckdb.connect(db_path)
+            for schema in schemas:
+                conn.execute((schemas_dir / schema).read_text())
+            conn.close()
+            patches.enter_context(patch(f"{module}.SecClient"))
+            database = patches.enter_context(patch(f"{module}.Database"))
+            database.return_value.get_connection.side_effect = lambda: duckdb.connect(db_path)
+            return db_path
+        yield lake
@@ -0,0 +1,64 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from sqlalchemy.orm import sessionmaker
+from pipelines.backlog import BacklogParser
+from pipelines.models import Fact, Filing, FilingState
+
+INSTANCE = b"""<?xml version="1.0"?>
+<xbrli:xbrl xmlns:xbrli="http://www.xbrl.org/2003/instance" xmlns:us-gaap="http://fasb.org/us-gaap/2012-01-31">
+  <xbrli:context id="c1">
+    <xbrli:entity><xbrli:identifier scheme="http://www.sec.gov/CIK">1</xbrli:identifier></xbrli:entity>
+    <xbrli:period><xbrli:instant>2012-09-29</xbrli:instant></xbrli:period>
+  </xbrli:context>
+  <xbrli:unit id="USD"><xbrli:measure>iso4217:USD</xbrli:measure></xbrli:unit>
+  <us-gaap:Assets contextRef="c1" unitRef="USD" decimals="-6">176064000000</us-gaap:Assets>
+  <us-gaap:Liabilities contextRef="c1" unitRef="USD" decimals="-6">57854000000</us-gaap:Liabilities>
+</xbrli:xbrl>
+"""
+
+@pytest.fixture
+def backlog(db_session):
+    for acc, state in (("acc-1", FilingState.DOWNLOADED), ("acc-2", FilingState.DOWNLOADED),
+                       ("acc-bad", FilingState.DOWNLOADED), ("acc-pending", FilingState.PENDING)):
+        db_session.add(Filing(accession_number=acc, cik="1", form_type="10-K", state=state, s3_path=f"edgar/{acc}/raw.txt"))
+    db_session.commit()
+
+    storage = MagicMock()
+    def get_object(key):
+        if "acc-bad" in key:
+            raise RuntimeError("NoSuchKey")
+        return INSTANCE
+    storage.get_object.side_effect = get_object
+
+    with patch("pipelines.backlog.MinIOClient", return_value=storage), \
+         patch("pipelines.backlog.load_manifest", return_value=None):
+        yield sessionmaker(bind=db_session.get_bind())
+
+def test_parse_backlog_drains_downloaded_filings(backlog, db_session):
+    stats = BacklogParser(backlog, workers=1, batch_size=2).run()
+
+    assert (stats["filings"], stats["failed"], stats["facts"]) == (2, 1, 4)
+    assert stats["facts_per_sec"] > 0
+    states = {f.accession_number: f.state for f in db_session.query(Filing)}
+    assert states == {
+        "acc-1": FilingState.PROCESSED, "acc-2": FilingState.PROCESSED,
+        "acc-bad": FilingState.FAILED, "acc-pending": FilingState.PENDING,
+    }
+    assert db_session.query(Fact).filter_by(filing_accession="acc-1").count() == 2
+
+    # Nothing left to claim
+    assert BacklogParser(backlog, workers=1).run()["filings"] == 0
+
+def test_parse_backlog_limit(backlog, db_session):
+    stats = BacklogParser(backlog, workers=1, batch_size=10).run(limit=1)
+    assert stats["filings"] + stats["failed"] == 1
+    assert db_session.query(Filing).filter_by(state=FilingState.DOWNLOADED).count() == 2
+
+def test_parse_filing_bypasses_object_cache():
+    from pipelines.backlog import parse_filing
+    with patch("pipelines.backlog.MinIOClient") as client, patch("pipelines.backlog.load_manifest", return_value=None):
+        client.return_value.get_object.return_value = INSTANCE
+        accession, rows, error = parse_filing(("acc-1", "10-K", "edgar/acc-1/raw.txt"))
+    # One-shot filing reads must not push hot objects out of the host cache
+    client.assert_called_once_with(cache=False)
+    assert (accession, len(rows), error) == ("acc-1", 2, None)
@@ -0,0 +1,77 @@
+import json
+from datetime import date, datetime
+from pipelines.facts import FactWriter
+from pipelines.models import Fact
+
+def _fact(concept, value, kind="numeric", **extra):
+    fact = {"concept": concept, "value": value, "unit": "USD", "period_db_ref": "c1", "decimals": "-6", "kind": kind,
+            "period_start": date(2022, 9, 25), "period_end": date(2023, 9, 30), "dimensions": None, "is_dimensional": False}
+    fact.update(extra)
+    return fact
+
+def test_fact_writer_replaces_facts_per_accession(db_session):
+    writer = FactWriter(db_session)
+    db_session.add(Fact(filing_accession="other", concept="us-gaap:Assets", value="1.0", unit="USD"))
+    db_session.commit()
+
+    first = [
+        _fact("us-gaap:Revenues", "383285000000.0"),
+        _fact("us-gaap:Cash", "1.0", dimensions={"us-gaap:StatementBusinessSegmentsAxis": "aapl:AmericasSegmentMember"}, is_dimensional=True),
+        _fact("dei:DocumentType", "10-K", kind="text", unit=None),
+    ]
+    assert writer.replace("0000320193-23-000106", first) == 2
+    db_session.commit()
+
+    stored = {f.concept: f for f in db_session.query(Fact).filter_by(filing_accession="0000320193-23-000106")}
+    assert set(stored) == {"us-gaap:Revenues", "us-gaap:Cash"}
+    assert stored["us-gaap:Revenues"].period_end == datetime(2023, 9, 30)
+    assert stored["us-gaap:Revenues"].is_dimensional is False and stored["us-gaap:Revenues"].dimensions is None
+    assert json.loads(stored["us-gaap:Cash"].dimensions) == {"us-gaap:StatementBusinessSegmentsAxis": "aapl:AmericasSegmentMember"}
+
+    # Re-running a filing replaces its facts instead of duplicating them; other filings untouched
+    assert writer.replace("0000320193-23-000106", [_fact("us-gaap:Revenues", "383285000000.0")]) == 1
+    db_session.commit()
+    assert db_session.query(Fact).filter_by(filing_accession="0000320193-23-000106").count() == 1
+    assert db_session.query(Fact).filter_by(filing_accession="other").count() == 1
+
+def test_fact_writer_rolls_back_with_caller(db_session):
+    writer = FactWriter(db_session)
+    writer.replace("acc-1", [_fact("us-gaap:Revenues", "1.0")])
+    db_session.commit()
+
+    writer.replace("acc-1", [_fact("us-gaap:Revenues", "2.0"), _fact("us-gaap:Assets", "3.0")])
+    db_session.rollback()
+    assert [f.value for f in db_session.query(Fact).filter_by(filing_accession="acc-1")] == ["1.0"]
+
+def test_fact_migrations(db_session):
+    from sqlalchemy import text
+    from pipelines.migrations import MIGRATIONS_DIR, _statements, apply_migrations
+
+    statements = _statements((MIGRATIONS_DIR / "0001_fact_dimensions.sql").read_text())
+    assert len(statements) == 3 and all("facts" in s for s in statements)
+    # SQLite tables always come fresh from create_all
+    assert apply_migrations(db_session.get_bind()) == 0
+
+    # Rows written without the new column (older writers) default to non-dimensional
+    db_session.execute(text("INSERT INTO facts (filing_accession, concept, value) VALUES ('acc', 'us-gaap:Assets', '1.0')"))
+    assert db_session.query(Fact).one().is_dimensional is False
+
+def test_migrations_run_once(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine, inspect, text
+    import pipelines.migrations as migrations
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE facts (id INTEGER PRIMARY KEY)"))
+    # Not idempotent on purpose: a second run would fail with a duplicate column
+    (tmp_path / "0001_extra.sql").write_text("ALTER TABLE facts ADD COLUMN extra TEXT;")
+    monkeypatch.setattr(engine.dialect, "name", "postgresql")
+    monkeypatch.setattr(migrations, "_lock", lambda conn: None) # pg_advisory_xact_lock
+
+    assert migrations.apply_migrations(engine, tmp_path) == 1
+    assert migrations.apply_migrations(engine, tmp_path) == 0
+    assert "extra" in {c["name"] for c in inspect(engine).get_columns("facts")}
+
+    # A new file is applied on its own
+    (tmp_path / "0002_more.sql").write_text("ALTER TABLE facts ADD COLUMN more TEXT;")
+    assert migrations.apply_migrations(engine, tmp_path) == 1
@@ -2,6 +2,7 @@
 import pytest
 import networkx as nx
 from unittest.mock import MagicMock, patch
+from botocore.exceptions import ClientError
 from pipelines.graph.extractor import EntityExtractor
 from pipelines.graph.builder import GraphBuilder
 from pipelines.models import Filing, Company
@@ -26,7 +27,11 @@ def test_graph_builder(db_session):
     with patch("pipelines.graph.builder.MinIOClient") as MockStorage:
         mock_cli = MagicMock()
         # Mock text content returning a mention
-        mock_cli.get_object.return_value = b"Referencing $TSLA here."
+        def get_object(key):
+            if key.endswith("documents.json"): # not split into documents: read raw.txt
+                raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+            return b"Referencing $TSLA here."
+        mock_cli.get_object.side_effect = get_object
         MockStorage.return_value = mock_cli
         
         builder = GraphBuilder(db_session)
@@ -41,3 +46,17 @@ def test_graph_builder(db_session):
         # NetworkX < 3.0 uses 'links', newer might use 'edges' or configurable.
         # The output showed 'edges'.
         assert "edges" in json_data or "links" in json_data
+
+def test_graph_builder_falls_back_on_unreadable_manifest(db_session, caplog):
+    db_session.add(Filing(accession_number="002", cik="2", state="PROCESSED", s3_path="edgar/002/raw.txt"))
+    db_session.commit()
+
+    with patch("pipelines.graph.builder.MinIOClient") as MockStorage:
+        mock_cli = MagicMock()
+        mock_cli.get_object.side_effect = lambda key: b"{not json" if key.endswith("documents.json") else b"See $NVDA."
+        MockStorage.return_value = mock_cli
+
+        graph = GraphBuilder(db_session).build_graph(limit=1)
+
+    assert graph.has_edge("2", "NVDA")
+    assert "Unreadable document manifest" in caplog.text
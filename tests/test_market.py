@@ -21,6 +21,8 @@ def test_stooq_download_success():
             mock_put.assert_called_once()
             args, _ = mock_put.call_args
             assert args[0] == "market/aapl.csv"
+            # DuckDB reads market/*.csv directly: plain bodies whatever STORAGE_COMPRESSION says
+            assert client.storage.compression == "none" and client.storage.cas is False
 
 def test_stooq_download_no_data():
     with patch("requests.get") as mock_get:
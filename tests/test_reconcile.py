@@ -2,7 +2,7 @@
 import pytest
 from unittest.mock import MagicMock, patch
 from pipelines.reconcile import Reconciler
-from pipelines.models import Filing
+from pipelines.models import Filing, FilingState
 from datetime import datetime
 
 class MockResponse:
@@ -28,13 +28,19 @@ CIK|Company Name|Form Type|Date Filed|Filename
 1000229|CORE LABORATORIES INC|8-K|20240103|edgar/data/1000229/0001000229-24-000001.txt
 """
     
+    # Already known filing: must be skipped and left untouched
+    db_session.add(Filing(accession_number="0001000229-24-000001", cik="1000229", form_type="8-K", url="known"))
+    db_session.commit()
+
     with patch("pipelines.sec.client.SecClient.get") as mock_get:
         mock_get.return_value = MockResponse(mock_idx)
         
         reconciler = Reconciler(db_session)
         count = reconciler.reconcile_date("20240103")
         
-        assert count == 2
+        assert count == 1
+        assert db_session.query(Filing).count() == 2
+        assert db_session.query(Filing).filter_by(accession_number="0001000229-24-000001").one().url == "known"
         
         # Verify DB
         filing = db_session.query(Filing).filter_by(accession_number="0001000228-24-000001").first()
@@ -42,12 +48,45 @@ CIK|Company Name|Form Type|Date Filed|Filename
         assert filing.cik == "1000228"
         assert filing.form_type == "8-K"
         assert filing.url == "https://www.sec.gov/Archives/edgar/data/1000228/0001000228-24-000001.txt"
+        assert filing.state == FilingState.PENDING
+        assert filing.filed_at == datetime(2024, 1, 3)
+
+def _daily_idx(date_str, accessions):
+    rows = "\n".join(f"1000228|HENRY SCHEIN INC|8-K|{date_str}|edgar/data/1000228/{a}.txt" for a in accessions)
+    return "CIK|Company Name|Form Type|Date Filed|Filename\n" + "-" * 80 + "\n" + rows + "\n"
 
 def test_reconcile_backfill(db_session):
-    # Mock reconcile_date
-    with patch.object(Reconciler, 'reconcile_date', return_value=5) as mock_date:
+    import httpx
+    from pipelines.models import ReconcileCheckpoint
+
+    def get_many(urls, return_exceptions=False):
+        out = []
+        for url in urls:
+            day = url.split("master.")[-1].replace(".idx", "")
+            if day == "20240102":
+                out.append(httpx.HTTPStatusError("404", request=None, response=httpx.Response(404)))
+            else:
+                out.append(MockResponse(_daily_idx(day, [f"0001000228-24-{day}-{i}" for i in range(5)])))
+        return out
+
+    with patch("pipelines.sec.client.SecClient.get_many", side_effect=get_many) as mock_many:
         reconciler = Reconciler(db_session)
         total = reconciler.reconcile_backfill("20240101", "20240103")
-        
-        assert total == 15 # 5 * 3 days
-        assert mock_date.call_count == 3
+
+        assert total == 10 # 5 * 2 days, 20240102 is missing
+        assert mock_many.call_count == 1
+        keys = {c.index_key for c in db_session.query(ReconcileCheckpoint).all()}
+        assert keys == {"daily:20240101", "daily:20240102", "daily:20240103"}
+
+        # Re-run resumes: nothing pending, nothing fetched
+        assert reconciler.reconcile_backfill("20240101", "20240103") == 0
+        assert mock_many.call_count == 1
+
+def test_backfill_units_skip_weekends_and_split_quarters(db_session):
+    reconciler = Reconciler(db_session)
+    daily = reconciler._backfill_units(datetime(2024, 1, 5), datetime(2024, 1, 8), "daily")
+    assert [u[0] for u in daily] == ["daily:20240105", "daily:20240108"]
+
+    quarterly = reconciler._backfill_units(datetime(2023, 11, 15), datetime(2024, 2, 1), "quarterly")
+    assert [u[0] for u in quarterly] == ["quarterly:2023Q4:20231115-20231231", "quarterly:2024Q1:20240101-20240201"]
+    assert quarterly[1][1].endswith("/full-index/2024/QTR1/master.idx")
@@ -0,0 +1,44 @@
+import httpx
+from unittest.mock import MagicMock
+from pipelines.sec.resolver import FilingResolver
+
+BASE = "https://www.sec.gov/Archives/edgar/data/320193/000032019324000123/"
+INDEX = {"directory": {"name": "/Archives/edgar/data/320193/000032019324000123", "item": [
+    {"name": "0000320193-24-000123-index-headers.html", "type": "text.gif", "size": "", "last-modified": "2024-11-01 06:01:36"},
+    {"name": "0000320193-24-000123-index.html", "type": "text.gif", "size": "", "last-modified": "2024-11-01 06:01:36"},
+    {"name": "0000320193-24-000123.txt", "type": "text.gif", "size": "9854400", "last-modified": "2024-11-01 06:01:36"},
+    {"name": "R1.htm", "type": "text.gif", "size": "40000", "last-modified": "2024-11-01 06:01:36"},
+    {"name": "a10-kexhibit21109282024.htm", "type": "text.gif", "size": "5000", "last-modified": "2024-11-01 06:01:36"},
+    {"name": "aapl-20240928.htm", "type": "text.gif", "size": "1520000", "last-modified": "2024-11-01 06:01:36"},
+    {"name": "aapl-20240928.xsd", "type": "text.gif", "size": "60000", "last-modified": "2024-11-01 06:01:36"},
+    {"name": "aapl-20240928_htm.xml", "type": "text.gif", "size": "2000000", "last-modified": "2024-11-01 06:01:36"},
+    {"name": "Financial_Report.xlsx", "type": "text.gif", "size": "80000", "last-modified": "2024-11-01 06:01:36"},
+]}}
+
+
+def test_build_manifest_picks_main_report():
+    manifest = FilingResolver.build_manifest(INDEX, "0000320193", "0000320193-24-000123", BASE)
+    assert manifest["primary_document"] == "aapl-20240928.htm"
+    assert manifest["primary_doc_url"] == BASE + "aapl-20240928.htm"
+    files = {f["name"]: f for f in manifest["files"]}
+    assert files["aapl-20240928.xsd"]["kind"] == "xml"
+    assert files["0000320193-24-000123.txt"]["size"] == 9854400
+    assert files["0000320193-24-000123-index.html"]["size"] is None
+
+    # A primaryDocument from the submissions API wins over the heuristic
+    manifest = FilingResolver.build_manifest(INDEX, "0000320193", "0000320193-24-000123", BASE, "a10-kexhibit21109282024.htm")
+    assert manifest["primary_document"] == "a10-kexhibit21109282024.htm"
+
+
+def test_manifests_are_cached_on_disk(tmp_path):
+    client = MagicMock()
+    client.get_many.return_value = [httpx.Response(200, json=INDEX)]
+    resolver = FilingResolver(client, root=str(tmp_path))
+
+    first = resolver.manifest("0000320193", "0000320193-24-000123")
+    client.get_many.assert_called_once_with([BASE + "index.json"], return_exceptions=True)
+    assert (tmp_path / "0000320193" / "0000320193-24-000123" / "manifest.json").exists()
+
+    client.get_many.reset_mock()
+    assert resolver.manifest("0000320193", "0000320193-24-000123") == first
+    client.get_many.assert_not_called()
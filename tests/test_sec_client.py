@@ -0,0 +1,183 @@
+import httpx
+import pytest
+from unittest.mock import patch
+from pipelines.sec.client import SecClient
+from pipelines.sec.throttle import parse_retry_after
+
+def _transport(calls):
+    def handler(request):
+        calls.append(str(request.url))
+        if request.url.path.endswith("missing.idx"):
+            return httpx.Response(404, request=request)
+        return httpx.Response(200, content=request.url.path.encode(), request=request)
+    return httpx.MockTransport(handler)
+
+@patch("pipelines.sec.client.AdaptiveThrottle")
+@patch("pipelines.sec.client.GlobalRateLimiter")
+def test_get_many_preserves_order(MockLimiter, MockThrottle):
+    calls = []
+    transport = _transport(calls)
+    with patch("pipelines.sec.client._new_async_client", lambda: httpx.AsyncClient(transport=transport)):
+        client = SecClient(concurrency=3)
+        urls = [f"http://www.sec.gov/Archives/{i}.txt" for i in range(10)]
+        results = client.get_many(urls)
+
+    assert [r.text for r in results] == [f"/Archives/{i}.txt" for i in range(10)]
+    # http:// is upgraded and every request went through the limiter
+    assert all(c.startswith("https://") for c in calls)
+    assert MockLimiter.return_value.acquire.call_count == 10
+
+@patch("pipelines.sec.client.AdaptiveThrottle")
+@patch("pipelines.sec.client.GlobalRateLimiter")
+def test_get_many_return_exceptions(MockLimiter, MockThrottle):
+    transport = _transport([])
+    with patch("pipelines.sec.client._new_async_client", lambda: httpx.AsyncClient(transport=transport)):
+        client = SecClient()
+        results = client.get_many(["https://www.sec.gov/ok.idx", "https://www.sec.gov/missing.idx"], return_exceptions=True)
+
+    assert results[0].status_code == 200
+    assert isinstance(results[1], httpx.HTTPStatusError)
+    # 404 is final: one request, no retries
+    assert MockLimiter.return_value.acquire.call_count == 2
+
+@patch("pipelines.sec.client.AdaptiveThrottle")
+@patch("pipelines.sec.client.GlobalRateLimiter")
+def test_stream_uses_shared_pool(MockLimiter, MockThrottle):
+    shared = httpx.Client(transport=_transport([]))
+    with patch("pipelines.sec.client.get_http_client", return_value=shared):
+        client = SecClient()
+        with client.stream("https://www.sec.gov/Archives/big.txt") as resp:
+            body = b"".join(resp.iter_bytes())
+    assert body == b"/Archives/big.txt"
+
+@patch("pipelines.sec.client.time.sleep")
+@patch("pipelines.sec.client.redis.Redis")
+def test_rate_limiter_sleeps_once_per_reservation(MockRedis, mock_sleep):
+    from pipelines.sec.client import GlobalRateLimiter
+    script = MockRedis.return_value.register_script.return_value
+    # First call deferred by fair queuing, second call granted with a 200ms reservation
+    script.side_effect = [[0, 150], [1, 200]]
+
+    limiter = GlobalRateLimiter(rate=10)
+    waited = limiter.acquire(3)
+
+    assert waited == pytest.approx(0.35)
+    assert [c.args[0] for c in mock_sleep.call_args_list] == [0.15, 0.2]
+    args = script.call_args.kwargs["args"]
+    assert args[:3] == [10, 1, 3]
+
+@patch("pipelines.sec.client.AdaptiveThrottle")
+@patch("pipelines.sec.client.GlobalRateLimiter")
+def test_throttled_response_feeds_aimd(MockLimiter, MockThrottle):
+    responses = iter([
+        httpx.Response(429, headers={"Retry-After": "7"}),
+        httpx.Response(200, content=b"ok"),
+    ])
+    shared = httpx.Client(transport=httpx.MockTransport(lambda request: next(responses)))
+    with patch("pipelines.sec.client.get_http_client", return_value=shared):
+        resp = SecClient().get("https://data.sec.gov/api/xbrl/companyfacts/CIK0000320193.json")
+
+    assert resp.text == "ok"
+    MockThrottle.return_value.on_throttled.assert_called_once_with(7.0)
+    MockThrottle.return_value.on_success.assert_called_once()
+    assert MockLimiter.return_value.acquire.call_count == 2
+
+@patch("pipelines.sec.client.time.sleep")
+@patch("pipelines.sec.client.AdaptiveThrottle")
+@patch("pipelines.sec.client.GlobalRateLimiter")
+def test_throttled_without_redis_backs_off_locally(MockLimiter, MockThrottle, mock_sleep):
+    MockThrottle.return_value.on_throttled.return_value = None # Redis unavailable
+    MockThrottle.return_value.default_penalty = 10.0
+    responses = iter([
+        httpx.Response(429, headers={"Retry-After": "7"}),
+        httpx.Response(503),
+        httpx.Response(200, content=b"ok"),
+    ])
+    shared = httpx.Client(transport=httpx.MockTransport(lambda request: next(responses)))
+    with patch("pipelines.sec.client.get_http_client", return_value=shared):
+        resp = SecClient().get("https://www.sec.gov/files/company_tickers.json")
+
+    assert resp.text == "ok"
+    # Nothing shared pauses the worker, so it waits Retry-After (or the default penalty) itself
+    assert [c.args[0] for c in mock_sleep.call_args_list] == [7.0, 10.0]
+
+def test_parse_retry_after():
+    assert parse_retry_after("120") == 120.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+@patch("pipelines.sec.client.AdaptiveThrottle")
+@patch("pipelines.sec.client.GlobalRateLimiter")
+def test_conditional_get_served_from_cache(MockLimiter, MockThrottle, tmp_path):
+    from pipelines.sec.cache import HttpCache
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, headers={"ETag": '"v1"'}, content=b'{"0": {"ticker": "AAPL"}}')
+
+    shared = httpx.Client(transport=httpx.MockTransport(handler))
+    with patch("pipelines.sec.client.get_http_client", return_value=shared):
+        client = SecClient()
+        client.cache = HttpCache(root=str(tmp_path))
+        url = "https://www.sec.gov/files/company_tickers.json"
+        first = client.get(url, cache=True)
+        second = client.get(url, cache=True)
+        third = client.get(url, cache=True, max_age=3600)
+
+    assert seen == [None, '"v1"']  # third call never hit the network
+    assert first.json() == second.json() == third.json() == {"0": {"ticker": "AAPL"}}
+
+def test_http_cache_evicts_least_recently_used(tmp_path):
+    import os
+    from pipelines.sec.cache import HttpCache
+    cache = HttpCache(root=str(tmp_path), max_bytes=250)
+    for i in range(3):
+        cache.store(f"https://x/{i}", httpx.Response(200, headers={"ETag": str(i)}, content=b"x" * 100))
+        entry = cache.lookup(f"https://x/{i}")
+        os.utime(entry.body_path, (i, i))
+    cache.store("https://x/3", httpx.Response(200, headers={"ETag": "3"}, content=b"x" * 100))
+
+    assert cache.lookup("https://x/0") is None
+    assert cache.lookup("https://x/3") is not None
+
+def test_http_cache_survives_concurrent_eviction(tmp_path):
+    from pathlib import Path
+    from pipelines.sec import cache as cache_module
+    cache = cache_module.HttpCache(root=str(tmp_path), max_bytes=150)
+    cache.store("https://x/0", httpx.Response(200, headers={"ETag": "0"}, content=b"x" * 100))
+
+    # Another process evicted an entry between glob() and stat()
+    real_glob = Path.glob
+    gone = tmp_path / "ab" / "gone.body"
+    with patch.object(Path, "glob", lambda self, pattern: [gone, *real_glob(self, pattern)]):
+        cache.store("https://x/1", httpx.Response(200, headers={"ETag": "1"}, content=b"x" * 100))
+    assert cache.lookup("https://x/1") is not None
+
+def test_http_cache_size_shared_across_instances(tmp_path):
+    from pipelines import disk_cache
+    from pipelines.sec.cache import HttpCache
+    HttpCache(root=str(tmp_path)).store("https://x/0", httpx.Response(200, headers={"ETag": "0"}, content=b"x"))
+    with patch.object(disk_cache, "_scan", wraps=disk_cache._scan) as scan:
+        # A new SecClient's cache doesn't rescan the directory on its first store
+        HttpCache(root=str(tmp_path)).store("https://x/1", httpx.Response(200, headers={"ETag": "1"}, content=b"x"))
+    assert scan.call_count == 0
+
+@patch("pipelines.sec.client.time.sleep")
+def test_rate_limiter_grants_more_than_burst(mock_sleep):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa") # EVAL support
+    from pipelines.sec.client import GlobalRateLimiter
+
+    with patch("pipelines.sec.client.redis.Redis", return_value=fakeredis.FakeRedis()):
+        limiter = GlobalRateLimiter(rate=10, burst=1, max_queue_seconds=2.0)
+    # Bail out instead of spinning forever if the request keeps being deferred
+    mock_sleep.side_effect = lambda s: None if mock_sleep.call_count < 5 else pytest.fail("acquire(30) never granted")
+
+    waited = limiter.acquire(30)
+
+    # 29 tokens beyond the burst at 10/s, reserved in one grant
+    assert waited == pytest.approx(2.9, abs=0.05)
+    assert mock_sleep.call_count == 1
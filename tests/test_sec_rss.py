@@ -18,18 +18,23 @@ def mock_feed():
 </feed>
 """
 
+@patch("pipelines.sec.rss.FilingResolver")
 @patch("pipelines.sec.rss.SecClient")
 @patch("pipelines.sec.rss.Database")
 @patch("pipelines.sec.rss.feedparser")
-def test_rss_cycle(mock_feedparser, MockDatabase, MockSecClient):
+def test_rss_cycle(mock_feedparser, MockDatabase, MockSecClient, MockResolver):
     # Setup Mocks
     mock_db = MockDatabase.return_value
     mock_conn = mock_db.get_connection.return_value
-    mock_conn.execute.return_value.fetchone.return_value = None
+    mock_conn.execute.return_value.fetchall.return_value = []
+    mock_conn.execute.return_value.fetchone.return_value = None # no cursor yet
     
     mock_client = MockSecClient.return_value
     mock_client.get_rss_feed.return_value = b"some bytes"
     mock_client.get_filing_html.return_value = "<html>Test Doc</html>"
+    MockResolver.return_value.manifests.return_value = [{
+        "primary_doc_url": "https://www.sec.gov/Archives/edgar/data/320193/000032019324000001/aapl-10k.htm",
+    }]
     
     # Mock Feedparser Result
     mock_entry = MagicMock()
@@ -63,10 +68,119 @@ def test_rss_cycle(mock_feedparser, MockDatabase, MockSecClient):
     # Should have called get_rss_feed
     mock_client.get_rss_feed.assert_called_once()
     
-    # Should have checked DB for accession 0000320193-24-000001
-    mock_conn.execute.assert_any_call("SELECT 1 FROM filings WHERE accession_number = ?", ["0000320193-24-000001"])
+    # Should have checked DB for all feed accessions in one query
+    select_calls = [call for call in mock_conn.execute.call_args_list if "SELECT accession_number FROM filings" in str(call)]
+    assert len(select_calls) == 1
+    assert select_calls[0].args[1] == [["0000320193-24-000001"]]
     
     # Should have inserted metadata
     # We check if insert query was called.
     insert_call = [call for call in mock_conn.execute.call_args_list if "INSERT INTO filings" in str(call)]
-    assert len(insert_call) > 0
+    assert len(insert_call) == 1
+    registered = mock_conn.register.call_args.args[1]
+    assert list(registered["accession_number"]) == ["0000320193-24-000001"]
+
+    # Primary document comes from the directory listing, not the index page
+    mock_client.get_filing_html.assert_not_called()
+    MockResolver.return_value.manifests.assert_called_once_with([(
+        "0000320193", "0000320193-24-000001", None,
+        "https://www.sec.gov/Archives/edgar/data/320193/000032019324000001/",
+    )])
+    assert list(registered["primary_doc_url"]) == ["https://www.sec.gov/Archives/edgar/data/320193/000032019324000001/aapl-10k.htm"]
+
+@patch("pipelines.sec.rss.SecClient")
+@patch("pipelines.sec.rss.Database")
+@patch("pipelines.sec.rss.feedparser")
+def test_rss_cycle_skips_known_accessions(mock_feedparser, MockDatabase, MockSecClient):
+    mock_conn = MockDatabase.return_value.get_connection.return_value
+    mock_conn.execute.return_value.fetchall.return_value = [("0000320193-24-000001",)]
+    mock_conn.execute.return_value.fetchone.return_value = None
+
+    entry = MagicMock()
+    entry.id = "urn:tag:sec.gov,2008:accession-number=0000320193-24-000001"
+    mock_feedparser.parse.return_value.entries = [entry, entry]
+
+    with patch("pathlib.Path.mkdir"):
+        RssWatcher().run_cycle()
+
+    MockSecClient.return_value.get_filing_html.assert_not_called()
+    assert not [call for call in mock_conn.execute.call_args_list if "INSERT INTO filings" in str(call)]
+
+
+def _entry(accession, updated, form="8-K"):
+    entry = MagicMock()
+    entry.id = f"urn:tag:sec.gov,2008:accession-number={accession}"
+    entry.title = f"{form} - ACME CORP (0000000001) (Filer)"
+    entry.link = f"https://www.sec.gov/Archives/edgar/data/1/{accession.replace('-', '')}/{accession}-index.htm"
+    entry.updated = updated
+    entry.get.side_effect = lambda k, d=None: form if k == "category" else d
+    return entry
+
+@patch("pipelines.sec.rss.SecClient")
+@patch("pipelines.sec.rss.Database")
+@patch("pipelines.sec.rss.feedparser")
+def test_rss_cycle_pages_back_to_cursor(mock_feedparser, MockDatabase, MockSecClient):
+    from datetime import datetime
+    mock_conn = MockDatabase.return_value.get_connection.return_value
+    mock_conn.execute.return_value.fetchall.return_value = []
+    # Cursor: last cycle ended at accession ...-000001
+    mock_conn.execute.return_value.fetchone.return_value = ("0000000001-24-000001", datetime(2024, 1, 1, 15, 0))
+
+    newest = [_entry(f"0000000001-24-{n:06d}", "2024-01-01T11:00:00-05:00") for n in range(300, 200, -1)]
+    older = [_entry(f"0000000001-24-{n:06d}", "2024-01-01T10:30:00-05:00") for n in range(200, 1, -1)] + \
+        [_entry("0000000001-24-000001", "2024-01-01T10:00:00-05:00")]
+    pages = {0: newest, 100: older[:100], 200: older[100:]}
+    MockSecClient.return_value.get_rss_feed.side_effect = lambda count, start: start
+    mock_feedparser.parse.side_effect = lambda start: MagicMock(entries=pages[start])
+    MockSecClient.return_value.get_filing_html.return_value = "<html></html>"
+
+    watcher = RssWatcher()
+    watcher.settings = MagicMock(RSS_PAGE_SIZE=100, RSS_MAX_PAGES=20, DATA_DIR="/tmp")
+    with patch("pathlib.Path.mkdir"), patch("builtins.open"):
+        new_entries = watcher.run_cycle()
+
+    # Everything newer than the cursor, across three pages, and nothing older
+    assert new_entries == 299
+    assert [c.kwargs["start"] for c in MockSecClient.return_value.get_rss_feed.call_args_list] == [0, 100, 200]
+
+    # Cursor advanced to the newest entry (converted to UTC)
+    cursor_call = [c for c in mock_conn.execute.call_args_list if "INSERT INTO ingest_cursors" in str(c)][0]
+    assert cursor_call.args[1][1:] == ["0000000001-24-000300", datetime(2024, 1, 1, 16, 0)]
+
+@patch("pipelines.sec.rss.FilingResolver")
+@patch("pipelines.sec.rss.SecClient")
+@patch("pipelines.sec.rss.Database")
+@patch("pipelines.sec.rss.feedparser")
+def test_rss_cycle_keeps_cursor_when_insert_fails(mock_feedparser, MockDatabase, MockSecClient, MockResolver):
+    mock_conn = MockDatabase.return_value.get_connection.return_value
+    mock_conn.execute.return_value.fetchall.return_value = []
+    mock_conn.execute.return_value.fetchone.return_value = None
+    def execute(sql, *args):
+        if "INSERT INTO filings" in sql:
+            raise RuntimeError("Conflict on tuple deletion")
+        return mock_conn.execute.return_value
+    mock_conn.execute.side_effect = execute
+    mock_feedparser.parse.return_value.entries = [_entry("0000000001-24-000002", "2024-01-01T11:00:00-05:00")]
+    MockResolver.return_value.manifests.return_value = [None]
+    MockSecClient.return_value.get_filing_html.return_value = "<html></html>"
+
+    with patch("pathlib.Path.mkdir"), patch("builtins.open"), pytest.raises(RuntimeError):
+        RssWatcher().run_cycle()
+
+    # The batch wasn't saved, so the next cycle must fetch it again
+    assert not [c for c in mock_conn.execute.call_args_list if "INSERT INTO ingest_cursors" in str(c)]
+
+def test_poll_scheduler_tracks_arrival_rate():
+    from pipelines.sec.rss import PollScheduler
+    scheduler = PollScheduler(min_interval=15, max_interval=600, target_entries=5)
+    scheduler.observe(0, now=0.0)
+    assert scheduler.next_interval() == 15 # no measurement yet
+
+    # Quiet: nothing new for 10 minutes -> back off to the ceiling
+    scheduler.observe(0, now=600.0)
+    assert scheduler.next_interval() == 600
+
+    # Burst: 50 filings in 15s pulls the interval down to the floor
+    for t in range(1, 10):
+        scheduler.observe(50, now=600.0 + 15 * t)
+    assert scheduler.next_interval() == 15
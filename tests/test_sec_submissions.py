@@ -0,0 +1,76 @@
+import duckdb
+import httpx
+import pytest
+from pipelines.sec.submissions import SubmissionsFetcher
+
+def _columns(rows):
+    # rows: (accession, filing_date, report_date, accepted, form, primary_document)
+    return {
+        "accessionNumber": [r[0] for r in rows],
+        "filingDate": [r[1] for r in rows],
+        "reportDate": [r[2] for r in rows],
+        "acceptanceDateTime": [r[3] for r in rows],
+        "form": [r[4] for r in rows],
+        "primaryDocument": [r[5] for r in rows],
+    }
+
+
+RECENT = _columns([
+    ("0000320193-24-000123", "2024-11-01", "2024-09-28", "2024-11-01T06:01:36.000Z", "10-K", "aapl-20240928.htm"),
+    ("0000320193-24-000100", "2024-08-02", "2024-06-29", "2024-08-02T06:00:00.000Z", "10-Q", "aapl-20240629.htm"),
+    ("0001140361-24-000001", "2024-07-01", "", "2024-07-01T16:30:00.000Z", "4", ""),
+])
+OVERFLOW = _columns([
+    ("0000320193-02-000001", "2002-12-19", "2002-09-28", "2002-12-19T00:00:00.000Z", "10-K", "d10k.txt"),
+])
+
+
+@pytest.fixture
+def fetcher(duckdb_lake):
+    db_path = duckdb_lake("pipelines.sec.submissions", "filings.sql", "submission_pages.sql")
+    # A row RSS already saved, with a local copy of the index page
+    conn = duckdb.connect(db_path)
+    conn.execute("""
+        INSERT INTO filings (accession_number, cik, form_type, filing_date, primary_doc_url, filing_html_path)
+        VALUES ('0000320193-24-000123', '0000320193', '10-K', '2024-11-01', 'https://www.sec.gov/x-index.htm', '/data/x/index.html')
+    """)
+    conn.close()
+
+    f = SubmissionsFetcher()
+    f.client._get.return_value = httpx.Response(200, json={
+        "cik": "320193", "name": "Apple Inc.", "tickers": ["AAPL"],
+        "filings": {"recent": RECENT, "files": [
+            {"name": "CIK0000320193-submissions-001.json", "filingCount": 1, "filingFrom": "1994-01-26", "filingTo": "2002-12-19"},
+        ]},
+    })
+    f.client.get_many.return_value = [httpx.Response(200, json=OVERFLOW)]
+    return f, db_path
+
+
+def test_fetch_history_upserts_recent_and_overflow(fetcher):
+    f, db_path = fetcher
+    assert f.fetch_history("320193") == 4
+    f.client.get_many.assert_called_once_with(
+        ["https://data.sec.gov/submissions/CIK0000320193-submissions-001.json"], return_exceptions=True
+    )
+
+    conn = duckdb.connect(db_path)
+    rows = conn.execute("""
+        SELECT accession_number, ticker, form_type, CAST(report_period AS VARCHAR), CAST(acceptance_datetime AS VARCHAR), primary_doc_url, filing_html_path
+        FROM filings ORDER BY filing_date DESC
+    """).fetchall()
+    conn.close()
+    assert rows[0] == (
+        "0000320193-24-000123", "AAPL", "10-K", "2024-09-28", "2024-11-01 06:01:36",
+        "https://www.sec.gov/Archives/edgar/data/320193/000032019324000123/aapl-20240928.htm", "/data/x/index.html",
+    )
+    assert rows[2][3] is None and rows[2][5] is None  # Form 4: no report date / primary document
+    assert rows[3][0] == "0000320193-02-000001"
+
+
+def test_fetch_history_skips_seen_overflow_files(fetcher):
+    f, _ = fetcher
+    f.fetch_history("320193")
+    f.client.get_many.reset_mock()
+    f.fetch_history("320193")
+    f.client.get_many.assert_not_called()
@@ -0,0 +1,59 @@
+from pipelines.parse.sgml import iter_documents
+
+SUBMISSION = b"""<SEC-DOCUMENT>0000320193-24-000001.txt : 20240101
+<SEC-HEADER>0000320193-24-000001.hdr.sgml : 20240101
+CONFORMED SUBMISSION TYPE:\t10-K
+</SEC-HEADER>
+<DOCUMENT>
+<TYPE>10-K
+<SEQUENCE>1
+<FILENAME>aapl-20231230.htm
+<DESCRIPTION>10-K
+<TEXT>
+<html><body>Annual report</body></html>
+</TEXT>
+</DOCUMENT>
+<DOCUMENT>
+<TYPE>GRAPHIC
+<SEQUENCE>2
+<FILENAME>logo.jpg
+<TEXT>
+begin 644 logo.jpg
+M_]C_X``02D9)1@`!`0$`8`!@``#_VP!#``(!`0(!`0("`@("`@("`P4#`P,#
+end
+</TEXT>
+</DOCUMENT>
+<DOCUMENT>
+<TYPE>EX-101.INS
+<SEQUENCE>3
+<FILENAME>aapl-20231230.xml
+<TEXT>
+<XBRL>
+<xbrli:xbrl></xbrli:xbrl>
+</XBRL>
+</TEXT>
+</DOCUMENT>
+</SEC-DOCUMENT>
+"""
+
+def _chunks(data, size):
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+def test_demux_splits_documents():
+    # Tiny chunks exercise lines split across feed() calls
+    docs = [(d.type, d.sequence, d.filename, d.is_binary, d.read()) for d in iter_documents(_chunks(SUBMISSION, 7))]
+
+    assert [d[:4] for d in docs] == [
+        ("10-K", 1, "aapl-20231230.htm", False),
+        ("GRAPHIC", 2, "logo.jpg", True),
+        ("EX-101.INS", 3, "aapl-20231230.xml", False),
+    ]
+    assert docs[0][4] == b"<html><body>Annual report</body></html>\n"
+    assert docs[1][4] == b""  # uuencoded payload skipped
+    assert docs[2][4] == b"<xbrli:xbrl></xbrli:xbrl>\n"  # <XBRL> wrapper stripped
+
+def test_demux_long_single_line_body():
+    line = b"<p>" + b"x" * 200_000 + b"</p>"
+    sub = b"<DOCUMENT>\n<TYPE>8-K\n<SEQUENCE>1\n<TEXT>\n" + line + b"\n</TEXT>\n</DOCUMENT>\n"
+    docs = [d.read() for d in iter_documents(_chunks(sub, 4096))]
+    assert docs == [line + b"\n"]
@@ -0,0 +1,346 @@
+import hashlib
+import pytest
+from datetime import datetime, timezone
+from io import BytesIO
+from unittest.mock import patch
+from botocore.exceptions import ClientError
+import pipelines.storage as storage_module
+from pipelines.storage import MinIOClient, MIN_PART_SIZE, CAS_TMP_PREFIX, blob_key
+
+@pytest.fixture(autouse=True)
+def fresh_s3_client(monkeypatch, tmp_path):
+    # The S3 client is shared per process; every test gets its own mock
+    monkeypatch.setattr(storage_module, "_s3_client", None)
+    monkeypatch.setattr(storage_module, "_checked_buckets", set())
+    monkeypatch.setattr(storage_module.settings, "STORAGE_CACHE_DIR", str(tmp_path / "object_cache"))
+
+@pytest.fixture
+def mock_s3():
+    with patch("pipelines.storage.boto3.client") as mock_client:
+        s3 = mock_client.return_value
+        s3.create_multipart_upload.return_value = {"UploadId": "u1"}
+        s3.upload_part.side_effect = lambda **kw: {"ETag": f"etag-{kw['PartNumber']}"}
+        yield s3
+
+def test_put_stream_multipart(mock_s3):
+    chunks = [bytes([i]) * (1024 * 1024) for i in range(12)]
+    storage = MinIOClient(compression="none")
+    result = storage.put_stream("edgar/acc/raw.txt", iter(chunks), part_size=MIN_PART_SIZE)
+
+    assert result["size"] == 12 * 1024 * 1024
+    assert result["sha256"] == hashlib.sha256(b"".join(chunks)).hexdigest()
+    # Parts upload concurrently, so call order isn't part numbering order
+    calls = sorted(mock_s3.upload_part.call_args_list, key=lambda c: c.kwargs["PartNumber"])
+    sizes = [len(c.kwargs["Body"]) for c in calls]
+    assert sizes == [MIN_PART_SIZE, MIN_PART_SIZE, 2 * 1024 * 1024]
+    parts = mock_s3.complete_multipart_upload.call_args.kwargs["MultipartUpload"]["Parts"]
+    assert [p["PartNumber"] for p in parts] == [1, 2, 3]
+
+def test_put_stream_small_body_single_put(mock_s3):
+    storage = MinIOClient(compression="none")
+    storage.put_stream("k", [b"abc", b"def"])
+    mock_s3.create_multipart_upload.assert_not_called()
+    assert mock_s3.put_object.call_args.kwargs["Body"] == b"abcdef"
+
+def test_put_stream_aborts_on_failure(mock_s3):
+    def chunks():
+        yield b"x" * MIN_PART_SIZE
+        raise IOError("connection reset")
+
+    storage = MinIOClient(compression="none")
+    with pytest.raises(IOError):
+        storage.put_stream("k", chunks(), part_size=MIN_PART_SIZE)
+    mock_s3.abort_multipart_upload.assert_called_once_with(Bucket=storage.bucket, Key="k", UploadId="u1")
+
+
+class FakeS3:
+    """Just enough of the S3 API, backed by a dict, to exercise CAS mode."""
+    def __init__(self):
+        self.objects = {} # key -> {"Body", "Metadata", "LastModified", "ETag"}
+        self.puts = []
+        self.gets = []
+
+    def _store(self, key, body, metadata=None):
+        self.objects[key] = {
+            "Body": bytes(body), "Metadata": metadata or {}, "LastModified": datetime.now(timezone.utc),
+            "ETag": f'"{hashlib.md5(bytes(body)).hexdigest()}"',
+        }
+
+    def head_bucket(self, Bucket):
+        return {}
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "404"}}, "HeadObject")
+        obj = self.objects[Key]
+        return {"ContentLength": len(obj["Body"]), "Metadata": obj["Metadata"], "LastModified": obj["LastModified"]}
+
+    def put_object(self, Bucket, Key, Body, Metadata=None, **kwargs):
+        self.puts.append(Key)
+        self._store(Key, Body, Metadata)
+
+    def upload_fileobj(self, fileobj, Bucket, Key, ExtraArgs=None, Config=None):
+        self.put_object(Bucket, Key, fileobj.read(), **(ExtraArgs or {}))
+
+    def get_object(self, Bucket, Key, Range=None, IfNoneMatch=None):
+        self.gets.append(Key)
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        obj = self.objects[Key]
+        if IfNoneMatch == obj["ETag"]:
+            raise ClientError({"Error": {"Code": "304", "Message": "Not Modified"}}, "GetObject")
+        body = obj["Body"]
+        if Range:
+            start, end = (int(x) for x in Range[len("bytes="):].split("-"))
+            if start >= len(body):
+                raise ClientError({"Error": {"Code": "InvalidRange"}}, "GetObject")
+            body = body[start:end + 1]
+        return {"Body": BytesIO(body), "Metadata": obj["Metadata"], "ETag": obj["ETag"]}
+
+    def create_multipart_upload(self, Bucket, Key, Metadata=None):
+        self._parts = {}
+        self._metadata = Metadata
+        return {"UploadId": "u1"}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self._parts[PartNumber] = Body
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self._store(Key, b"".join(self._parts[p["PartNumber"]] for p in MultipartUpload["Parts"]), self._metadata)
+
+    def copy(self, source, Bucket, Key, ExtraArgs=None, Config=None):
+        src = self.objects[source["Key"]]
+        self._store(Key, src["Body"], (ExtraArgs or {}).get("Metadata", src["Metadata"]))
+
+    def copy_object(self, Bucket, Key, CopySource, Metadata=None, MetadataDirective="COPY"):
+        if CopySource["Key"] not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "CopyObject")
+        src = self.objects[CopySource["Key"]]
+        self._store(Key, src["Body"], Metadata if MetadataDirective == "REPLACE" else src["Metadata"])
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+    def delete_objects(self, Bucket, Delete):
+        for obj in Delete["Objects"]:
+            self.objects.pop(obj["Key"], None)
+
+    def get_paginator(self, name):
+        fake = self
+        class _Paginator:
+            def paginate(self, Bucket, Prefix=""):
+                yield {"Contents": [
+                    {"Key": k, "Size": len(o["Body"]), "LastModified": o["LastModified"]}
+                    for k, o in list(fake.objects.items()) if k.startswith(Prefix)
+                ]}
+        return _Paginator()
+
+
+@pytest.fixture
+def fake_s3():
+    fake = FakeS3()
+    with patch("pipelines.storage.boto3.client", return_value=fake):
+        yield fake
+
+def test_cas_dedupes_identical_bodies(fake_s3):
+    storage = MinIOClient(cas=True)
+    body = b"<html>10-K</html>"
+    storage.put_object("edgar/0001-24-000001/raw.txt", body)
+    storage.put_object("edgar/0001-24-000002/raw.txt", body) # amendment with the same bytes
+    storage.put_object("edgar/0001-24-000001/raw.txt", body) # re-run
+
+    sha = hashlib.sha256(body).hexdigest()
+    assert fake_s3.puts.count(blob_key(sha)) == 1
+    assert fake_s3.puts.count("edgar/0001-24-000001/raw.txt") == 1 # re-run writes nothing
+    assert storage.get_object("edgar/0001-24-000002/raw.txt") == body
+    # Pointers resolve even when CAS mode is off
+    assert MinIOClient(cas=False).get_object("edgar/0001-24-000001/raw.txt") == body
+
+def test_cas_put_stream_large_body_goes_through_tmp(fake_s3):
+    storage = MinIOClient(cas=True)
+    chunks = [bytes([i]) * (1024 * 1024) for i in range(6)]
+    result = storage.put_stream("edgar/acc/raw.txt", iter(chunks), part_size=MIN_PART_SIZE)
+
+    sha = hashlib.sha256(b"".join(chunks)).hexdigest()
+    assert result["sha256"] == sha and result["size"] == 6 * 1024 * 1024
+    assert not [k for k in fake_s3.objects if k.startswith(CAS_TMP_PREFIX)]
+    assert storage.get_object("edgar/acc/raw.txt") == b"".join(chunks)
+
+def test_cas_gc_removes_unreferenced_blobs(fake_s3):
+    storage = MinIOClient(cas=True)
+    storage.put_object("a", b"kept")
+    storage.put_object("b", b"orphaned")
+    storage.put_object("c", b"orphaned")
+    fake_s3.delete_object(Bucket=storage.bucket, Key="b")
+
+    # Everything is younger than the grace period: nothing goes
+    assert storage.gc()["deleted"] == 0
+
+    fake_s3.delete_object(Bucket=storage.bucket, Key="c")
+    stats = storage.gc(grace_seconds=0)
+    assert stats["deleted"] == 1 and stats["references"] == 1
+    assert blob_key(hashlib.sha256(b"orphaned").hexdigest()) not in fake_s3.objects
+    assert storage.get_object("a") == b"kept"
+
+def test_cas_gc_keeps_blob_reused_during_sweep(fake_s3):
+    from datetime import timedelta
+    storage = MinIOClient(cas=True, compression="none")
+    storage.put_object("old", b"body")
+    blob = blob_key(hashlib.sha256(b"body").hexdigest())
+    fake_s3.delete_object(Bucket=storage.bucket, Key="old")
+    # An old, unreferenced blob: a GC candidate
+    fake_s3.objects[blob]["LastModified"] -= timedelta(days=30)
+
+    # The sweep lists the bucket, then a writer deduplicates onto the blob
+    # before the sweep gets to delete it
+    real_paginator = fake_s3.get_paginator
+    def paginator_then_write(name):
+        pages = list(real_paginator(name).paginate(Bucket=storage.bucket))
+        storage.put_object("new", b"body")
+        return type("P", (), {"paginate": lambda self, Bucket: iter(pages)})()
+
+    with patch.object(fake_s3, "get_paginator", paginator_then_write):
+        stats = storage.gc(grace_seconds=3600)
+
+    assert stats["deleted"] == 0
+    assert storage.get_object("new") == b"body"
+
+def test_compression_defaults_to_installed_codec(monkeypatch):
+    monkeypatch.setattr(storage_module.settings, "STORAGE_COMPRESSION", None)
+    monkeypatch.setattr(storage_module, "zstd", None)
+    assert storage_module.resolve_compression() == "none"
+    monkeypatch.setattr(storage_module, "zstd", object())
+    assert storage_module.resolve_compression() == "zstd"
+
+def test_zstd_roundtrip_with_codec_tag(fake_s3):
+    pytest.importorskip("zstandard")
+    storage = MinIOClient(cas=False, compression="zstd")
+    body = b"<xbrl>" + b"<us-gaap:Revenues>100</us-gaap:Revenues>" * 500 + b"</xbrl>"
+    storage.put_object("edgar/acc/raw.txt", body)
+    stored = fake_s3.objects["edgar/acc/raw.txt"]
+    assert stored["Metadata"]["codec"] == "zstd" and len(stored["Body"]) < len(body) // 10
+
+    chunks = [body] * 20_000 # ~25 MiB raw, compressed as it streams
+    result = storage.put_stream("edgar/acc/big.txt", iter(chunks), part_size=MIN_PART_SIZE)
+    assert result["sha256"] == hashlib.sha256(b"".join(chunks)).hexdigest()
+    reader = storage.open_object("edgar/acc/big.txt")
+    assert reader.read(len(body)) == body # decompressed incrementally
+    reader.close()
+
+    # Plain objects written before compression was enabled still read back
+    fake_s3.put_object(Bucket=storage.bucket, Key="market/old.csv", Body=b"Date,Close\n")
+    assert storage.get_object("market/old.csv") == b"Date,Close\n"
+    assert storage.get_object("edgar/acc/raw.txt") == body
+
+def test_zstd_dictionary_for_small_documents(fake_s3):
+    pytest.importorskip("zstandard")
+    storage = MinIOClient(cas=True, compression="zstd")
+    docs = [
+        f'<ix:nonFraction name="us-gaap:Revenues" contextRef="c{i}" unitRef="usd" decimals="-6">{i * 7919}</ix:nonFraction>'
+        .encode() * 3
+        for i in range(400)
+    ]
+    for i, doc in enumerate(docs):
+        storage.put_object(f"edgar/{i}/primary.htm", doc)
+
+    storage.zstd_dict_id = storage.train_zstd_dictionary("edgar/", dict_size=4096)
+    storage.put_object("edgar/new/primary.htm", docs[0] + b"<!-- new -->")
+    blob = fake_s3.objects[blob_key(hashlib.sha256(docs[0] + b"<!-- new -->").hexdigest())]
+    assert blob["Metadata"]["zstd-dict"] == str(storage.zstd_dict_id)
+    assert MinIOClient(compression="none").get_object("edgar/new/primary.htm") == docs[0] + b"<!-- new -->"
+
+def test_client_is_shared_and_bucket_checked_once(mock_s3):
+    with patch("pipelines.storage.boto3.client") as factory:
+        factory.return_value = mock_s3
+        first, second = MinIOClient(), MinIOClient()
+        assert factory.call_count == 0 # construction does no I/O
+        first.exists("a")
+        second.exists("b")
+    assert factory.call_count == 1
+    mock_s3.head_bucket.assert_called_once()
+
+def test_get_range_reads_a_span(fake_s3):
+    body = b"".join(f"line {i}\n".encode() for i in range(1000))
+    MinIOClient(cas=False, compression="none").put_object("edgar/acc/raw.txt", body)
+    MinIOClient(cas=True, compression="none").put_object("edgar/acc/primary.htm", body)
+
+    storage = MinIOClient()
+    assert storage.get_range("edgar/acc/raw.txt", 100, 140) == body[100:140]
+    assert storage.get_range("edgar/acc/primary.htm", 100, 140) == body[100:140] # via the CAS pointer
+    assert storage.get_range("edgar/acc/raw.txt", len(body) + 10, len(body) + 20) == b""
+    # Past the end of the ~180 byte pointer, but inside the blob
+    assert storage.get_range("edgar/acc/primary.htm", 500, 520) == body[500:520]
+    assert storage.get_range("edgar/acc/primary.htm", len(body) + 10, len(body) + 20) == b""
+
+def test_get_range_decodes_compressed_past_stored_length(fake_s3):
+    body = bytes(range(100)) * 100
+    # 10 000 bytes stored as 1 000 compressed ones: offsets past 1 000 are still content
+    fake_s3._store("edgar/acc/raw.txt", b"z" * 1000, {"codec": "zstd"})
+    fake_s3._store(blob_key("ab" * 32), b"z" * 1000, {"codec": "zstd"})
+    MinIOClient(cas=True, compression="none")._put_pointer("edgar/acc/primary.htm", "ab" * 32, len(body))
+
+    storage = MinIOClient()
+    with patch.object(MinIOClient, "open_object", side_effect=lambda key: BytesIO(body)) as opened:
+        assert storage.get_range("edgar/acc/raw.txt", 5000, 5010) == body[5000:5010]
+        assert storage.get_range("edgar/acc/primary.htm", 5000, 5010) == body[5000:5010]
+        assert storage.get_range("edgar/acc/raw.txt", len(body) + 10, len(body) + 20) == b""
+    assert opened.call_count == 3
+
+def test_missing_manifest_is_not_logged_as_an_error(fake_s3, caplog):
+    from pipelines.documents import load_manifest
+    storage = MinIOClient(cache=False)
+    with caplog.at_level("ERROR"):
+        # Filings that were never split have no documents.json
+        assert load_manifest(storage, "0000320193-23-000106") is None
+        assert load_manifest(MinIOClient(), "0000320193-23-000106") is None
+        with pytest.raises(ClientError):
+            storage.get_object("edgar/missing/raw.txt")
+    assert caplog.records == []
+
+def test_get_object_reads_through_disk_cache(fake_s3, monkeypatch):
+    storage = MinIOClient(cas=True, compression="none")
+    storage.put_object("market/spy.csv", b"Date,Close\n2024-01-02,472.65\n")
+
+    assert storage.get_object("market/spy.csv") == b"Date,Close\n2024-01-02,472.65\n"
+    fake_s3.gets.clear()
+    # Another worker on the same host: served from disk, no request at all
+    assert MinIOClient().get_object("market/spy.csv") == b"Date,Close\n2024-01-02,472.65\n"
+    assert fake_s3.gets == []
+
+    # Once stale, the entry is revalidated: a 304 costs one small request
+    monkeypatch.setattr(storage_module.settings, "STORAGE_CACHE_FRESH_SECONDS", 0)
+    assert MinIOClient().get_object("market/spy.csv") == b"Date,Close\n2024-01-02,472.65\n"
+    assert fake_s3.gets == ["market/spy.csv"]
+
+    # A new version (new pointer ETag) replaces the entry
+    MinIOClient(cas=True, compression="none", cache=False).put_object("market/spy.csv", b"Date,Close\n2024-01-03,468.79\n")
+    assert MinIOClient().get_object("market/spy.csv") == b"Date,Close\n2024-01-03,468.79\n"
+
+def test_get_object_survives_concurrent_cache_eviction(fake_s3, monkeypatch, tmp_path):
+    from pathlib import Path
+    import pipelines.storage_cache as cache_module
+    storage = MinIOClient(cas=False, compression="none")
+    storage.put_object("market/spy.csv", b"Date,Close\n")
+    assert storage.get_object("market/spy.csv") == b"Date,Close\n"
+
+    # Another process evicts the entry between lookup and read: just a miss
+    real_lookup = cache_module.ObjectCache.lookup
+    def lookup_then_evict(self, bucket, key):
+        entry = real_lookup(self, bucket, key)
+        if entry:
+            entry.body_path.unlink()
+        return entry
+    with patch.object(cache_module.ObjectCache, "lookup", lookup_then_evict):
+        assert storage.get_object("market/spy.csv") == b"Date,Close\n"
+        # ... also when it goes right after a 304
+        monkeypatch.setattr(storage_module.settings, "STORAGE_CACHE_FRESH_SECONDS", 0)
+        assert storage.get_object("market/spy.csv") == b"Date,Close\n"
+
+    # ... or between glob() and stat() while scanning for eviction
+    monkeypatch.setattr(storage_module.settings, "STORAGE_CACHE_MAX_BYTES", 1)
+    real_glob = Path.glob
+    gone = tmp_path / "object_cache" / "ab" / "gone.body"
+    with patch.object(Path, "glob", lambda self, pattern: [gone, *real_glob(self, pattern)]):
+        storage.put_object("market/qqq.csv", b"Date,Close\n")
+        assert MinIOClient().get_object("market/qqq.csv") == b"Date,Close\n"
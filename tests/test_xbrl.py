@@ -29,3 +29,165 @@ def test_xbrl_parsing():
     f2 = facts[1]
     assert f2["concept"] == "us-gaap:Liabilities"
     assert float(f2["value"]) == -500000000.0
+
+IXBRL_DOC = b"""<?xml version="1.0" encoding="utf-8"?>
+<html xmlns="http://www.w3.org/1999/xhtml" xmlns:ix="http://www.xbrl.org/2013/inlineXBRL"
+      xmlns:ixt="http://www.xbrl.org/inlineXBRL/transformation/2020-02-12"
+      xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
+      xmlns:xbrli="http://www.xbrl.org/2003/instance" xmlns:xbrldi="http://xbrl.org/2006/xbrldi">
+<body>
+  <div style="display:none"><ix:header><ix:resources>
+    <xbrli:context id="c1">
+      <xbrli:entity><xbrli:identifier scheme="http://www.sec.gov/CIK">0000320193</xbrli:identifier></xbrli:entity>
+      <xbrli:period><xbrli:startDate>2022-09-25</xbrli:startDate><xbrli:endDate>2023-09-30</xbrli:endDate></xbrli:period>
+    </xbrli:context>
+    <xbrli:context id="c2">
+      <xbrli:entity>
+        <xbrli:identifier scheme="http://www.sec.gov/CIK">0000320193</xbrli:identifier>
+        <xbrli:segment>
+          <xbrldi:explicitMember dimension="us-gaap:StatementBusinessSegmentsAxis">aapl:AmericasSegmentMember</xbrldi:explicitMember>
+          <xbrldi:typedMember dimension="aapl:ContractAxis"><aapl:ContractDomain>C-17</aapl:ContractDomain></xbrldi:typedMember>
+        </xbrli:segment>
+      </xbrli:entity>
+      <xbrli:period><xbrli:instant>2023-09-30</xbrli:instant></xbrli:period>
+    </xbrli:context>
+    <xbrli:unit id="usd"><xbrli:measure>iso4217:USD</xbrli:measure></xbrli:unit>
+    <xbrli:unit id="usdPerShare"><xbrli:divide>
+      <xbrli:unitNumerator><xbrli:measure>iso4217:USD</xbrli:measure></xbrli:unitNumerator>
+      <xbrli:unitDenominator><xbrli:measure>xbrli:shares</xbrli:measure></xbrli:unitDenominator>
+    </xbrli:divide></xbrli:unit>
+  </ix:resources></ix:header></div>
+  <div><ix:nonNumeric name="dei:DocumentType" contextRef="c1">10-K</ix:nonNumeric></div>
+  <table><tr><td>
+    <ix:nonFraction name="us-gaap:Revenues" contextRef="c1" unitRef="usd" decimals="-6" scale="6"
+        format="ixt:num-dot-decimal">394,328</ix:nonFraction>
+  </td><td>
+    <ix:nonFraction name="us-gaap:Assets" contextRef="c2" unitRef="eur" format="ixt:num-comma-decimal">1.234,5</ix:nonFraction>
+    <ix:nonFraction name="us-gaap:EarningsPerShareBasic" contextRef="c1" unitRef="usdPerShare" decimals="2">6.16</ix:nonFraction>
+  </td><td>
+    <ix:nonFraction name="us-gaap:Goodwill" contextRef="c2" unitRef="usd" format="ixt:fixed-zero">-</ix:nonFraction>
+    <ix:nonFraction name="us-gaap:Other" contextRef="c2" unitRef="usd" xsi:nil="true"/>
+  </td></tr></table>
+  <ix:nonNumeric name="us-gaap:RevenueRecognitionPolicyTextBlock" contextRef="c1" continuedAt="cont1">
+    Revenue is recognized <ix:exclude>[page 41]</ix:exclude>when control
+    of <ix:nonFraction name="us-gaap:Cash" contextRef="c2" unitRef="usd">5</ix:nonFraction> transfers
+  </ix:nonNumeric>
+  <p>Unrelated narrative</p>
+  <ix:continuation id="cont1" continuedAt="cont2">to the customer,</ix:continuation>
+  <ix:continuation id="cont2">net of returns.</ix:continuation>
+  <ix:nonFraction name="us-gaap:Late" contextRef="c3" unitRef="usd">7</ix:nonFraction>
+  <div style="display:none"><xbrli:context id="c3">
+    <xbrli:entity><xbrli:identifier scheme="http://www.sec.gov/CIK">0000320193</xbrli:identifier></xbrli:entity>
+    <xbrli:period><xbrli:instant>2022-09-24</xbrli:instant></xbrli:period>
+  </xbrli:context></div>
+</body>
+</html>
+"""
+
+def test_streaming_ixbrl_engine():
+    facts = XBRLParser().parse(IXBRL_DOC)
+    by_concept = {f["concept"]: f for f in facts}
+
+    assert by_concept["us-gaap:Revenues"]["value"] == str(394328e6)
+    assert by_concept["us-gaap:Assets"]["value"] == "1234.5"
+    assert by_concept["us-gaap:Goodwill"]["value"] == "0.0"
+    assert "us-gaap:Other" not in by_concept # nil
+    assert by_concept["dei:DocumentType"]["value"] == "10-K"
+    assert by_concept["dei:DocumentType"]["kind"] == "text"
+    # Nested numeric fact inside a text block is reported too
+    assert by_concept["us-gaap:Cash"]["value"] == "5.0"
+    # ix:exclude dropped, continuation chain appended in order
+    assert by_concept["us-gaap:RevenueRecognitionPolicyTextBlock"]["value"] == (
+        "Revenue is recognized when control of 5 transfers to the customer, net of returns."
+    )
+
+def test_streaming_engine_matches_soup_on_numeric_facts():
+    # The legacy engine knows nothing of formats, nil or text facts; on plain
+    # numeric facts both must agree.
+    doc = IXBRL_DOC.replace(b' format="ixt:num-comma-decimal">1.234,5', b">1234.5")
+    stream = [(f["concept"], f["value"]) for f in XBRLParser().parse(doc) if f["kind"] == "numeric"]
+    soup = [(f["concept"], f["value"]) for f in XBRLParser(engine="soup").parse(doc)]
+    # (facts whose context/unit comes later are emitted at the end, so compare unordered)
+    assert sorted(f for f in stream if f[0] != "us-gaap:Goodwill") == sorted(f for f in soup if f[0] != "us-gaap:Goodwill")
+
+def test_facts_resolve_contexts_and_units():
+    from datetime import date
+    by_concept = {f["concept"]: f for f in XBRLParser().parse(IXBRL_DOC)}
+
+    revenue = by_concept["us-gaap:Revenues"]
+    assert (revenue["period_start"], revenue["period_end"]) == (date(2022, 9, 25), date(2023, 9, 30))
+    assert revenue["unit"] == "USD" and revenue["is_dimensional"] is False
+
+    cash = by_concept["us-gaap:Cash"] # instant, on a segment
+    assert cash["period_start"] is None and cash["period_end"] == cash["period_instant"] == date(2023, 9, 30)
+    assert cash["is_dimensional"] is True
+    assert cash["dimensions"] == {
+        "aapl:ContractAxis": "C-17",
+        "us-gaap:StatementBusinessSegmentsAxis": "aapl:AmericasSegmentMember",
+    }
+    assert by_concept["us-gaap:EarningsPerShareBasic"]["unit"] == "USD/shares"
+    # Unknown unit ids pass through; a context defined after its fact still resolves
+    assert by_concept["us-gaap:Assets"]["unit"] == "eur"
+    assert by_concept["us-gaap:Late"]["period_end"] == date(2022, 9, 24)
+
+XBRL_INSTANCE = b"""<?xml version="1.0" encoding="utf-8"?>
+<xbrli:xbrl xmlns:xbrli="http://www.xbrl.org/2003/instance" xmlns:link="http://www.xbrl.org/2003/linkbase"
+    xmlns:xlink="http://www.w3.org/1999/xlink" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
+    xmlns:iso4217="http://www.xbrl.org/2003/iso4217" xmlns:xbrldi="http://xbrl.org/2006/xbrldi"
+    xmlns:us-gaap="http://fasb.org/us-gaap/2012-01-31" xmlns:dei="http://xbrl.sec.gov/dei/2012">
+  <link:schemaRef xlink:type="simple" xlink:href="aapl-20120929.xsd"/>
+  <xbrli:context id="FY2012">
+    <xbrli:entity><xbrli:identifier scheme="http://www.sec.gov/CIK">0000320193</xbrli:identifier></xbrli:entity>
+    <xbrli:period><xbrli:startDate>2011-09-25</xbrli:startDate><xbrli:endDate>2012-09-29</xbrli:endDate></xbrli:period>
+  </xbrli:context>
+  <xbrli:unit id="USD"><xbrli:measure>iso4217:USD</xbrli:measure></xbrli:unit>
+  <dei:DocumentType contextRef="FY2012">10-K</dei:DocumentType>
+  <us-gaap:Revenues contextRef="FY2012" unitRef="USD" decimals="-6">156508000000</us-gaap:Revenues>
+  <us-gaap:Goodwill contextRef="FY2012" unitRef="USD" xsi:nil="true"/>
+  <us-gaap:Cash contextRef="I2012_Americas" unitRef="USD" decimals="-6">1000000</us-gaap:Cash>
+  <xbrli:context id="I2012_Americas">
+    <xbrli:entity>
+      <xbrli:identifier scheme="http://www.sec.gov/CIK">0000320193</xbrli:identifier>
+      <xbrli:segment><xbrldi:explicitMember dimension="us-gaap:StatementBusinessSegmentsAxis">aapl:AmericasSegmentMember</xbrldi:explicitMember></xbrli:segment>
+    </xbrli:entity>
+    <xbrli:period><xbrli:instant>2012-09-29</xbrli:instant></xbrli:period>
+  </xbrli:context>
+  <link:footnoteLink xlink:type="extended" xlink:role="http://www.xbrl.org/2003/role/link">
+    <link:footnote xlink:type="resource" xlink:label="fn1">Includes restricted cash.</link:footnote>
+  </link:footnoteLink>
+</xbrli:xbrl>
+"""
+
+def test_xml_instance_facts():
+    from datetime import date
+    facts = XBRLParser().parse(XBRL_INSTANCE)
+    by_concept = {f["concept"]: f for f in facts}
+
+    # nil numeric facts and the footnote link produce nothing
+    assert set(by_concept) == {"dei:DocumentType", "us-gaap:Revenues", "us-gaap:Cash"}
+    assert by_concept["dei:DocumentType"]["kind"] == "text" and by_concept["dei:DocumentType"]["value"] == "10-K"
+
+    revenue = by_concept["us-gaap:Revenues"]
+    assert revenue["kind"] == "numeric" and float(revenue["value"]) == 156508000000.0
+    assert revenue["unit"] == "USD" and revenue["decimals"] == "-6"
+    assert (revenue["period_start"], revenue["period_end"]) == (date(2011, 9, 25), date(2012, 9, 29))
+
+    # context defined after its fact
+    cash = by_concept["us-gaap:Cash"]
+    assert cash["period_end"] == date(2012, 9, 29) and cash["is_dimensional"] is True
+    assert set(cash) == set(revenue)
+
+def test_xml_instance_rejects_non_xml():
+    assert XBRLParser().parse(b"<SEC-DOCUMENT>0000320193-12-000092.txt : 20121031\n<TYPE>10-K") == []
+
+def test_iter_facts_streams_and_falls_back_without_duplicates():
+    import types
+    facts = XBRLParser().iter_facts(IXBRL_DOC)
+    assert isinstance(facts, types.GeneratorType)
+    assert list(facts) == XBRLParser().parse(IXBRL_DOC)
+
+    # Not well-formed after several facts were already yielded: the HTML re-parse
+    # continues from there instead of repeating them
+    sloppy = IXBRL_DOC.replace(b"<p>Unrelated narrative</p>", b"<p>Unrelated narrative<br></p>")
+    concepts = [f["concept"] for f in XBRLParser().iter_facts(sloppy)]
+    assert sorted(concepts) == sorted(f["concept"] for f in XBRLParser().parse(IXBRL_DOC))
@@ -0,0 +1,112 @@
+import json
+import zipfile
+import duckdb
+import pytest
+import pandas as pd
+from unittest.mock import patch
+from pipelines.xbrl.facts import XbrlFactsFetcher, iter_companyfacts, parse_companyfacts
+
+def _companyfacts(cik, revenue):
+    return {
+        "cik": int(cik),
+        "entityName": f"Company {cik}",
+        "facts": {
+            "us-gaap": {
+                "Revenues": {"units": {"USD": [
+                    {"start": "2023-01-01", "end": "2023-12-31", "val": revenue, "accn": f"{cik}-24-000001",
+                     "fy": 2023, "fp": "FY", "form": "10-K", "filed": "2024-02-01", "frame": "CY2023"},
+                ]}},
+                "Assets": {"units": {"USD": [
+                    {"end": "2023-12-31", "val": revenue * 3, "accn": f"{cik}-24-000001",
+                     "fy": 2023, "fp": "FY", "form": "10-K", "filed": "2024-02-01"},
+                ]}},
+            }
+        },
+    }
+
+
+@pytest.fixture
+def fetcher(duckdb_lake):
+    db_path = duckdb_lake("pipelines.xbrl.facts", "xbrl_facts.sql")
+    return XbrlFactsFetcher(), db_path
+
+
+def test_parse_companyfacts_instant_vs_duration():
+    df = parse_companyfacts(_companyfacts("0000000001", 100.0), "0000000001")
+    revenue = df[df["tag"] == "Revenues"].iloc[0]
+    assets = df[df["tag"] == "Assets"].iloc[0]
+    assert revenue["period_start"] == "2023-01-01" and revenue["period_end"] == "2023-12-31"
+    assert assets["period_instant"] == "2023-12-31" and pd.isna(assets["period_end"])
+
+
+def test_ingest_bulk_loads_every_member(fetcher, tmp_path):
+    facts_fetcher, db_path = fetcher
+    archive = tmp_path / "companyfacts.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        for i, cik in enumerate(["0000000001", "0000000002", "0000000003"]):
+            zf.writestr(f"CIK{cik}.json", json.dumps(_companyfacts(cik, 100.0 * (i + 1))))
+        zf.writestr("CIK0000000004.json", "{not json")
+
+    # Tiny batches so more than one flush happens
+    stats = facts_fetcher.ingest_bulk(str(archive), workers=2, batch_rows=2)
+    assert stats == {"companies": 3, "facts": 6, "failed": 1}
+
+    conn = duckdb.connect(db_path)
+    rows = conn.execute("SELECT cik, value FROM xbrl_facts WHERE tag = 'Revenues' ORDER BY cik").fetchall()
+    conn.close()
+    assert rows == [("0000000001", 100.0), ("0000000002", 200.0), ("0000000003", 300.0)]
+
+    # Re-running replaces rather than duplicates
+    facts_fetcher.ingest_bulk(str(archive), workers=1)
+    conn = duckdb.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM xbrl_facts").fetchone()[0] == 6
+    conn.close()
+
+
+def test_iter_companyfacts_batches_on_tag_boundaries():
+    data = _companyfacts("0000000001", 100.0)
+    # Same fact reported twice (original 10-K and a later amendment)
+    revenues = data["facts"]["us-gaap"]["Revenues"]["units"]["USD"]
+    revenues.append({**revenues[0], "val": 110.0, "accn": "0000000001-24-000009", "form": "10-K/A", "filed": "2024-05-01"})
+
+    batches = list(iter_companyfacts(data, "0000000001", batch_rows=1))
+    assert [sorted(set(b["tag"])) for b in batches] == [["Revenues"], ["Assets"]]
+    assert str(batches[0]["tag"].dtype) == "category"
+
+    # Dedupe per batch keeps the latest filing, as it would on the whole company
+    from pipelines.xbrl.quality_gates import QualityGates
+    revenue = QualityGates.run_gates(batches[0])
+    assert len(revenue) == 1 and revenue.iloc[0]["value"] == 110.0
+
+
+def test_incremental_refresh_merges_new_and_restated_facts(fetcher):
+    facts_fetcher, db_path = fetcher
+    data = _companyfacts("0000000001", 100.0)
+    facts_fetcher.client._get.return_value.content = json.dumps(data).encode()
+    facts_fetcher.fetch_facts("1")
+
+    # Next day: a new 10-Q, and the 10-K's Assets restated by a later amendment
+    usd = data["facts"]["us-gaap"]
+    usd["Revenues"]["units"]["USD"].append(
+        {"start": "2024-01-01", "end": "2024-03-31", "val": 30.0, "accn": "0000000001-24-000002",
+         "fy": 2024, "fp": "Q1", "form": "10-Q", "filed": "2024-05-01", "frame": "CY2024Q1"})
+    usd["Assets"]["units"]["USD"].append(
+        {"end": "2023-12-31", "val": 310.0, "accn": "0000000001-24-000003",
+         "fy": 2023, "fp": "FY", "form": "10-K/A", "filed": "2024-05-01"})
+    facts_fetcher.client._get.return_value.content = json.dumps(data).encode()
+
+    with patch.object(facts_fetcher, "_merge_batch", wraps=facts_fetcher._merge_batch) as merge:
+        facts_fetcher.fetch_facts("1")
+        assert merge.call_count == 1
+
+    conn = duckdb.connect(db_path)
+    rows = conn.execute("SELECT tag, value, form FROM xbrl_facts ORDER BY tag, value").fetchall()
+    watermark = conn.execute("SELECT CAST(max_filed_date AS VARCHAR) FROM xbrl_watermarks WHERE cik = '0000000001'").fetchone()
+    ids = conn.execute("SELECT COUNT(DISTINCT id), COUNT(*) FROM xbrl_facts WHERE id IS NOT NULL").fetchone()
+    conn.close()
+    assert rows == [("Assets", 310.0, "10-K/A"), ("Revenues", 30.0, "10-Q"), ("Revenues", 100.0, "10-K")]
+    assert watermark == ("2024-05-01",)
+    assert ids == (3, 3)
+
+    # Unchanged payload: nothing new to insert
+    assert facts_fetcher._save_facts(iter_companyfacts(data, "0000000001"), ["0000000001"]) == 0
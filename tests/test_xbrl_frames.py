@@ -0,0 +1,56 @@
+import json
+import duckdb
+import httpx
+import pytest
+from pipelines.xbrl.frames import XbrlFramesFetcher, calendar_frames
+
+def _frame_response(url, rows):
+    body = {"taxonomy": "us-gaap", "tag": "Revenues", "uom": "USD", "ccp": "CY2023Q4", "pts": len(rows), "data": rows}
+    return httpx.Response(200, content=json.dumps(body).encode(), request=httpx.Request("GET", url))
+
+
+def _row(cik, val):
+    return {"accn": f"{cik:010d}-24-000001", "cik": cik, "entityName": f"Company {cik}", "loc": "US-CA",
+            "start": "2023-10-01", "end": "2023-12-31", "val": val}
+
+
+@pytest.fixture
+def fetcher(duckdb_lake):
+    db_path = duckdb_lake("pipelines.xbrl.frames", "xbrl_frames.sql")
+    return XbrlFramesFetcher(), db_path
+
+
+def test_calendar_frames():
+    assert calendar_frames(2023, 2023) == ["CY2023", "CY2023Q1", "CY2023Q2", "CY2023Q3", "CY2023Q4"]
+    assert calendar_frames(2022, 2023, quarterly=False) == ["CY2022", "CY2023"]
+
+
+def test_fetch_frames_upserts_snapshot(fetcher):
+    frames_fetcher, db_path = fetcher
+
+    def _get_many(urls, return_exceptions=False):
+        out = []
+        for url in urls:
+            if "/Revenues/" in url:
+                out.append(_frame_response(url, [_row(320193, 119.6e9), _row(789019, 62.0e9)]))
+            else:
+                not_found = httpx.Response(404, request=httpx.Request("GET", url))
+                out.append(httpx.HTTPStatusError("404", request=not_found.request, response=not_found))
+        return out
+
+    frames_fetcher.client.get_many.side_effect = _get_many
+    assert frames_fetcher.fetch_frames(["CY2023Q4"]) == 2
+    urls = frames_fetcher.client.get_many.call_args.args[0]
+    assert "https://data.sec.gov/api/xbrl/frames/us-gaap/Revenues/USD/CY2023Q4.json" in urls
+    assert len(urls) == 3  # one per concept
+
+    # Refresh: one value restated, one company dropped from the frame
+    frames_fetcher.client.get_many.side_effect = lambda urls, return_exceptions=False: [
+        _frame_response(u, [_row(320193, 119.5e9)]) if "/Revenues/" in u else _get_many([u])[0] for u in urls
+    ]
+    frames_fetcher.fetch_frames(["CY2023Q4"])
+
+    conn = duckdb.connect(db_path)
+    rows = conn.execute("SELECT frame, tag, cik, value, CAST(period_end AS VARCHAR) FROM xbrl_frames").fetchall()
+    conn.close()
+    assert rows == [("CY2023Q4", "Revenues", "0000320193", 119.5e9, "2023-12-31")]